@@ -0,0 +1,290 @@
+"""
+Стратегии назначения уборщиков на заказы.
+
+Каждая стратегия получает queryset доступных уборщиков и упорядочивает его
+одним агрегирующим запросом: первый уборщик в списке - лучший кандидат,
+остальные используются, если лучшего кандидата успел занять параллельный
+заказ. Вместе с кандидатами стратегия возвращает причину выбора каждого
+из них, которая сохраняется в заказе для аудита.
+"""
+
+from datetime import date, time
+from typing import NamedTuple, Optional
+
+from django.db.models import Count, F, Max, Q, QuerySet, Sum
+from django.db.models.functions import Coalesce
+
+from api.routing import (
+    CleanerRoute, RouteStop, get_route_stop, load_day_routes,
+    rank_booking_routes,
+)
+from api.utils import get_available_cleaners
+from cleanpro.app_data import (
+    CLEANER_ASSIGNMENT_STRATEGY, ORDER_CANCELLED_STATUS,
+)
+
+
+class AssignmentDecision(NamedTuple):
+    """
+    Результат выбора уборщиков стратегией.
+
+    Атрибуты:
+        - strategy (str) - название стратегии
+        - cleaners_ids (list[int]) - id уборщиков в порядке предпочтения
+        - reasons (dict[int, str]) - причина выбора каждого уборщика
+    """
+
+    strategy: str
+    cleaners_ids: list[int]
+    reasons: dict[int, str]
+
+
+class AssignmentStrategy:
+    """
+    Базовая стратегия назначения уборщиков.
+
+    Наследники переопределяют:
+        - name (str) - название стратегии для настроек и аудита
+        - order_cleaners - аннотирует и упорядочивает queryset уборщиков
+        - get_reason - формирует причину выбора по значению аннотации
+
+    Стратегии, выбирающие уборщика не запросом к базе данных,
+    переопределяют choose.
+    """
+
+    name: str = None
+
+    def order_cleaners(
+            self,
+            cleaners: QuerySet,
+            cleaning_date: date,
+            address_data: dict) -> QuerySet:
+        """
+        Возвращает queryset уборщиков с аннотацией score, упорядоченный
+        от лучшего кандидата к худшему.
+        """
+        raise NotImplementedError
+
+    def get_reason(self, score: any) -> str:
+        """Возвращает причину выбора уборщика по значению score."""
+        raise NotImplementedError
+
+    def choose(
+            self,
+            cleaning_date: date,
+            cleaning_time: time,
+            total_time: int,
+            address_data: dict = None,
+            cleaners: QuerySet = None) -> AssignmentDecision:
+        """
+        Возвращает доступных для уборки уборщиков в порядке предпочтения
+        и причины их выбора одним запросом к базе данных.
+
+        Если передан queryset cleaners, выбор производится из него вместо
+        уборщиков, свободных в указанное время.
+        """
+        if cleaners is None:
+            cleaners: QuerySet = get_available_cleaners(
+                cleaning_date=cleaning_date,
+                cleaning_time=cleaning_time,
+                total_time=total_time,
+            )
+        ordered: list[tuple[int, any]] = list(
+            self.order_cleaners(
+                cleaners=cleaners,
+                cleaning_date=cleaning_date,
+                address_data=address_data or {},
+            ).values_list('id', 'score')
+        )
+        return AssignmentDecision(
+            strategy=self.name,
+            cleaners_ids=[cleaner_id for cleaner_id, _ in ordered],
+            reasons={
+                cleaner_id: self.get_reason(score)
+                for cleaner_id, score in ordered
+            },
+        )
+
+
+def _day_orders_filter(cleaning_date: date) -> Q:
+    """Фильтр неотмененных заказов уборщика в указанный день."""
+    return Q(work_orders__cleaning_date=cleaning_date) & ~Q(
+        work_orders__order_status=ORDER_CANCELLED_STATUS
+    )
+
+
+class LeastBookedStrategy(AssignmentStrategy):
+    """
+    Выбирает уборщика с наименьшей суммарной продолжительностью
+    заказов в день уборки.
+    """
+
+    name: str = 'least_booked'
+
+    def order_cleaners(self, cleaners, cleaning_date, address_data):
+        return cleaners.annotate(
+            score=Coalesce(
+                Sum(
+                    'work_orders__total_time',
+                    filter=_day_orders_filter(cleaning_date),
+                ),
+                0,
+            ),
+        ).order_by('score', 'id')
+
+    def get_reason(self, score):
+        return f'Минут заказов в день уборки: {score}.'
+
+
+class RoundRobinStrategy(AssignmentStrategy):
+    """
+    Выбирает уборщика, которому заказ назначался раньше всех остальных:
+    уборщики без заказов выбираются в первую очередь.
+    """
+
+    name: str = 'round_robin'
+
+    def order_cleaners(self, cleaners, cleaning_date, address_data):
+        return cleaners.annotate(
+            score=Max('work_orders__id'),
+        ).order_by(F('score').asc(nulls_first=True), 'id')
+
+    def get_reason(self, score):
+        if score is None:
+            return 'Очередь: уборщику еще не назначались заказы.'
+        return f'Очередь: последний назначенный заказ № {score}.'
+
+
+class ProximityStrategy(AssignmentStrategy):
+    """
+    Выбирает уборщика, у которого больше всего заказов в день уборки
+    на той же улице того же города, затем - в том же городе.
+    При равенстве выбирает наименее загруженного уборщика.
+    """
+
+    name: str = 'proximity'
+
+    # INFO: вес заказа на той же улице должен превышать любое
+    #       количество заказов уборщика в городе за день.
+    STREET_WEIGHT: int = 1000
+
+    def order_cleaners(self, cleaners, cleaning_date, address_data):
+        day_orders: Q = _day_orders_filter(cleaning_date)
+        same_city: Q = day_orders & Q(
+            work_orders__address__city=address_data.get('city'),
+        )
+        same_street: Q = same_city & Q(
+            work_orders__address__street=address_data.get('street'),
+        )
+        return cleaners.annotate(
+            score=(
+                Count('work_orders', filter=same_street) *
+                self.STREET_WEIGHT +
+                Count('work_orders', filter=same_city)
+            ),
+            booked=Coalesce(
+                Sum('work_orders__total_time', filter=day_orders),
+                0,
+            ),
+        ).order_by('-score', 'booked', 'id')
+
+    def get_reason(self, score):
+        same_street, same_city = divmod(score, self.STREET_WEIGHT)
+        return (
+            f'Заказов в день уборки на той же улице: {same_street}, '
+            f'в том же городе: {same_city}.'
+        )
+
+
+class RouteAwareStrategy(AssignmentStrategy):
+    """
+    Выбирает уборщика, маршрут которого новый заказ удлиняет на наименьшее
+    время в пути (см. api.routing.rank_routes). Уборщики, которые
+    не успевают доехать до заказа или с него на следующий заказ,
+    исключаются. Если не успевает ни один уборщик, выбирается наименее
+    загруженный из свободных уборщиков (см. api.routing.rank_booking_routes).
+
+    Вместо агрегирующего запроса загружает заказы дня доступных уборщиков
+    одним запросом и выбирает уборщика в памяти.
+    """
+
+    name: str = 'route_aware'
+
+    def choose(
+            self,
+            cleaning_date: date,
+            cleaning_time: time,
+            total_time: int,
+            address_data: dict = None,
+            cleaners: QuerySet = None) -> AssignmentDecision:
+        if cleaners is None:
+            cleaners: QuerySet = get_available_cleaners(
+                cleaning_date=cleaning_date,
+                cleaning_time=cleaning_time,
+                total_time=total_time,
+            )
+        address_data: dict = address_data or {}
+        # INFO: у нового заказа еще нет id, 0 меньше id любого заказа.
+        stop: RouteStop = get_route_stop(
+            order_id=0,
+            cleaning_time=cleaning_time,
+            total_time=total_time,
+            city=address_data.get('city'),
+            street=address_data.get('street'),
+        )
+        ranked: list[tuple[CleanerRoute, Optional[int]]] = (
+            rank_booking_routes(
+                routes=load_day_routes(
+                    cleaning_date=cleaning_date,
+                    cleaners_ids=cleaners.values_list('id', flat=True),
+                ).values(),
+                stop=stop,
+            )
+        )
+        return AssignmentDecision(
+            strategy=self.name,
+            cleaners_ids=[route.cleaner_id for route, _ in ranked],
+            reasons={
+                route.cleaner_id: self.get_reason(cost)
+                for route, cost in ranked
+            },
+        )
+
+    def get_reason(self, score):
+        if score is None:
+            return (
+                'Маршрут не учтен: до заказа не успевает доехать ни один '
+                'уборщик, выбран наименее загруженный.'
+            )
+        return f'Дополнительное время в пути: {score} мин.'
+
+
+class RandomStrategy(AssignmentStrategy):
+    """Выбирает случайного уборщика из доступных."""
+
+    name: str = 'random'
+
+    def order_cleaners(self, cleaners, cleaning_date, address_data):
+        return cleaners.annotate(score=F('id')).order_by('?')
+
+    def get_reason(self, score):
+        return 'Случайный выбор.'
+
+
+ASSIGNMENT_STRATEGIES: dict[str, type[AssignmentStrategy]] = {
+    strategy.name: strategy for strategy in (
+        LeastBookedStrategy,
+        RoundRobinStrategy,
+        ProximityStrategy,
+        RouteAwareStrategy,
+        RandomStrategy,
+    )
+}
+
+
+def get_assignment_strategy(name: str = None) -> AssignmentStrategy:
+    """
+    Возвращает стратегию назначения уборщиков по названию.
+    По умолчанию - стратегию из CLEANER_ASSIGNMENT_STRATEGY.
+    """
+    return ASSIGNMENT_STRATEGIES[name or CLEANER_ASSIGNMENT_STRATEGY]()
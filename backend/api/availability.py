@@ -0,0 +1,495 @@
+"""
+Расчет доступного времени для бронирования уборок.
+
+Занятость каждого уборщика за день хранится в виде битовой маски, в которой
+каждый бит соответствует одной минуте суток. Интервалы занятости и уборщики
+за день загружаются фиксированным количеством запросов, после чего проверка
+любого слота выполняется побитовыми операциями в памяти, а при
+установленном NumPy - матричными операциями сразу для всех уборщиков.
+
+Для каждого дня кэшируется максимальная длительность свободного окна,
+начинающегося в каждом слоте: по ней ответ строится для любой
+продолжительности уборки. Кэш не имеет срока жизни и сбрасывается
+при изменении заказов и отпусков уборщиков через invalidate_available_time.
+"""
+
+from datetime import date, datetime, time, timedelta
+import math
+import sys
+from typing import Iterable, Iterator
+
+try:
+    import numpy as np
+except ImportError:
+    # INFO: без NumPy свободные окна рассчитываются на битовых масках.
+    np = None
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from cleanpro.app_data import (
+    AVAILABLE_TIME_CACHED_KEY, AVAILABLE_TIME_CACHE_TIMEOUT,
+    AVAILABLE_TIME_NUMPY_MIN_CLEANERS, ROUTE_TRAVEL_BUFFER_MIN,
+)
+from services.models import CleanerBusyInterval, Holiday
+from users.models import User
+
+MINUTES_IN_HOUR: int = 60
+MINUTES_IN_DAY: int = 24 * MINUTES_IN_HOUR
+# INFO: длительность свободного окна уборщика, у которого нет заказов
+#       после начала слота.
+FREE_RUN_UNLIMITED: int = sys.maxsize
+
+
+def time_to_minutes(value: time) -> int:
+    """Возвращает количество минут, прошедших с начала суток."""
+    return value.hour * MINUTES_IN_HOUR + value.minute
+
+
+def minutes_between(start: datetime, end: datetime) -> int:
+    """
+    Возвращает количество минут между start и end, округленное вверх.
+    Если end раньше start, результат отрицательный.
+    """
+    return math.ceil((end - start).total_seconds() / 60)
+
+
+def interval_mask(start: int, duration: int) -> int:
+    """
+    Возвращает битовую маску интервала длительностью duration минут,
+    начинающегося на минуте start от начала суток.
+    """
+    return ((1 << duration) - 1) << start
+
+
+def get_cleaners_vacations() -> list[tuple[int, date, date]]:
+    """
+    Возвращает список уборщиков в формате (id, начало отпуска, конец отпуска)
+    одним запросом к базе данных.
+    """
+    return list(
+        User.objects.filter(
+            is_cleaner=True,
+        ).values_list('id', 'on_vacation_from', 'on_vacation_to')
+    )
+
+
+def get_holidays(date_from: date, date_to: date) -> set[date]:
+    """
+    Возвращает нерабочие дни в диапазоне от date_from до date_to
+    включительно одним запросом к базе данных.
+    """
+    return set(
+        Holiday.objects.filter(
+            date__range=(date_from, date_to),
+        ).values_list('date', flat=True)
+    )
+
+
+def get_cleaners_ids(
+        cleaning_date: date,
+        cleaners: list[tuple[int, date, date]] = None) -> list[int]:
+    """
+    Возвращает список id уборщиков, которые не находятся в отпуске
+    в указанный день.
+
+    Если передан список cleaners, полученный из get_cleaners_vacations,
+    фильтрация производится в памяти без запроса к базе данных.
+    """
+    if cleaners is None:
+        return list(
+            User.objects.filter(
+                is_cleaner=True,
+            ).filter(
+                Q(on_vacation_from__isnull=True) |
+                Q(on_vacation_from__gt=cleaning_date) |
+                Q(on_vacation_to__lt=cleaning_date)
+            ).values_list('id', flat=True)
+        )
+    return [
+        cleaner_id for cleaner_id, vacation_from, vacation_to in cleaners
+        if vacation_from is None or
+        vacation_from > cleaning_date or
+        (vacation_to is not None and vacation_to < cleaning_date)
+    ]
+
+
+def get_busy_masks_range(
+        date_from: date, date_to: date) -> dict[date, dict[int, int]]:
+    """
+    Возвращает битовые маски занятости уборщиков для каждого дня
+    в диапазоне от date_from до date_to включительно
+    в формате {день: {id уборщика: маска}}.
+
+    Интервалы занятости за весь диапазон загружаются одним запросом.
+    Каждый интервал расширяется на ROUTE_TRAVEL_BUFFER_MIN минут в обе
+    стороны - время на дорогу между заказами.
+    Интервал, переходящий через полночь, учитывается в обоих днях.
+    """
+    busy_masks: dict[date, dict[int, int]] = {}
+    buffer: timedelta = timedelta(minutes=ROUTE_TRAVEL_BUFFER_MIN)
+    intervals = CleanerBusyInterval.objects.filter(
+        start__lt=timezone.make_aware(
+            datetime.combine(date_to + timedelta(days=1), time.min)
+        ) + buffer,
+        end__gt=timezone.make_aware(
+            datetime.combine(date_from, time.min)
+        ) - buffer,
+    ).values_list('cleaner_id', 'start', 'end')
+    for cleaner_id, start, end in intervals:
+        start: datetime = timezone.make_naive(start) - buffer
+        end: datetime = timezone.make_naive(end) + buffer
+        cleaning_date: date = max(start.date(), date_from)
+        while cleaning_date <= date_to:
+            day_start: datetime = datetime.combine(cleaning_date, time.min)
+            if day_start >= end:
+                break
+            start_minute: int = max(0, minutes_between(day_start, start))
+            end_minute: int = minutes_between(day_start, end)
+            day_masks: dict[int, int] = busy_masks.setdefault(
+                cleaning_date, {}
+            )
+            day_masks[cleaner_id] = day_masks.get(cleaner_id, 0) | (
+                interval_mask(
+                    start=start_minute,
+                    duration=end_minute - start_minute,
+                )
+            )
+            cleaning_date += timedelta(days=1)
+    return busy_masks
+
+
+def get_free_runs_bitmask(
+        masks: Iterable[int], starts: Iterable[int]) -> dict[int, int]:
+    """
+    Возвращает максимальную продолжительность свободного окна
+    для каждого слота в формате {минута начала слота: минуты},
+    перебирая битовые маски занятости уборщиков.
+    """
+    masks: list[int] = list(masks)
+    free_runs: dict[int, int] = {}
+    for start in starts:
+        free_run: int = 0
+        for mask in masks:
+            rest: int = mask >> start
+            if not rest:
+                free_run = FREE_RUN_UNLIMITED
+                break
+            free_run = max(free_run, (rest & -rest).bit_length() - 1)
+        free_runs[start] = free_run
+    return free_runs
+
+
+def get_busy_runs(mask: int) -> Iterator[tuple[int, int]]:
+    """
+    Последовательно возвращает интервалы занятости из битовой маски
+    в формате (минута начала, минута окончания).
+    """
+    while mask:
+        start: int = (mask & -mask).bit_length() - 1
+        rest: int = mask >> start
+        duration: int = ((rest + 1) & ~rest).bit_length() - 1
+        yield start, start + duration
+        mask = (rest >> duration) << (start + duration)
+
+
+def get_free_runs_matrix(
+        masks: Iterable[int], starts: Iterable[int]) -> dict[int, int]:
+    """
+    Возвращает то же, что get_free_runs_bitmask, рассчитывая свободные
+    окна матричными операциями NumPy.
+
+    Интервалы занятости всех уборщиков за один проход собираются
+    в массивы, после чего строится матрица (слоты x интервалы) с временем
+    от начала слота до начала интервала. Минимум по интервалам каждого
+    уборщика дает матрицу (слоты x уборщики) со свободными окнами,
+    максимум по уборщикам - ответ для каждого слота.
+    """
+    starts: list[int] = list(starts)
+    runs_starts: list[int] = []
+    runs_ends: list[int] = []
+    cleaners_offsets: list[int] = []
+    for mask in masks:
+        if not mask:
+            return {start: FREE_RUN_UNLIMITED for start in starts}
+        cleaners_offsets.append(len(runs_starts))
+        for run_start, run_end in get_busy_runs(mask):
+            runs_starts.append(run_start)
+            runs_ends.append(run_end)
+    if not cleaners_offsets or not starts:
+        return {start: 0 for start in starts}
+    slots = np.array(starts, dtype=np.int64)[:, None]
+    free_runs = np.where(
+        np.array(runs_ends, dtype=np.int64) > slots,
+        np.maximum(np.array(runs_starts, dtype=np.int64) - slots, 0),
+        FREE_RUN_UNLIMITED,
+    )
+    free_runs = np.minimum.reduceat(free_runs, cleaners_offsets, axis=1)
+    return dict(zip(starts, free_runs.max(axis=1).tolist()))
+
+
+def get_busy_masks(cleaning_date: date) -> dict[int, int]:
+    """
+    Возвращает битовые маски занятости уборщиков в указанный день
+    в формате {id уборщика: маска}.
+    """
+    return get_busy_masks_range(
+        date_from=cleaning_date,
+        date_to=cleaning_date,
+    ).get(cleaning_date, {})
+
+
+class DayAvailability:
+    """
+    Занятость всех доступных уборщиков в течение одного дня.
+
+    Атрибуты:
+        - cleaning_date (date) - день уборки
+        - masks (dict[int, int]) - битовые маски занятости уборщиков,
+                                   свободным уборщикам соответствует 0
+    """
+
+    def __init__(self, cleaning_date: date, masks: dict[int, int]):
+        self.cleaning_date: date = cleaning_date
+        self.masks: dict[int, int] = masks
+        self._distinct_masks: set[int] = set(masks.values())
+
+    @classmethod
+    def load(cls, cleaning_date: date) -> 'DayAvailability':
+        """
+        Загружает занятость уборщиков за день тремя запросами к базе данных.
+        """
+        return next(
+            cls.load_range(date_from=cleaning_date, date_to=cleaning_date)
+        )
+
+    @classmethod
+    def load_range(
+            cls,
+            date_from: date,
+            date_to: date) -> Iterator['DayAvailability']:
+        """
+        Последовательно возвращает занятость уборщиков для каждого дня
+        в диапазоне от date_from до date_to включительно.
+
+        Интервалы занятости за весь диапазон, список уборщиков с их отпусками
+        и нерабочие дни загружаются тремя запросами и переиспользуются
+        для всех дней. В нерабочий день доступных уборщиков нет.
+        """
+        cleaners: list[tuple[int, date, date]] = get_cleaners_vacations()
+        busy_masks: dict[date, dict[int, int]] = get_busy_masks_range(
+            date_from=date_from,
+            date_to=date_to,
+        )
+        holidays: set[date] = get_holidays(
+            date_from=date_from,
+            date_to=date_to,
+        )
+        cleaning_date: date = date_from
+        while cleaning_date <= date_to:
+            if cleaning_date in holidays:
+                yield cls(cleaning_date=cleaning_date, masks={})
+                cleaning_date += timedelta(days=1)
+                continue
+            day_masks: dict[int, int] = busy_masks.get(cleaning_date, {})
+            masks: dict[int, int] = {
+                cleaner_id: day_masks.get(cleaner_id, 0)
+                for cleaner_id in get_cleaners_ids(
+                    cleaning_date=cleaning_date,
+                    cleaners=cleaners,
+                )
+            }
+            yield cls(cleaning_date=cleaning_date, masks=masks)
+            cleaning_date += timedelta(days=1)
+
+    def is_available(self, start: int, duration: int) -> bool:
+        """
+        Проверяет, есть ли хотя бы один уборщик, свободный в течение
+        duration минут, начиная с минуты start.
+        """
+        if 0 in self._distinct_masks:
+            return True
+        window: int = interval_mask(start=start, duration=duration)
+        return any(not mask & window for mask in self._distinct_masks)
+
+    def get_free_cleaners(self, start: int, duration: int) -> list[int]:
+        """
+        Возвращает список id уборщиков, свободных в течение duration минут,
+        начиная с минуты start. Вне рабочих часов дня свободных уборщиков нет.
+        """
+        # INFO: api.work_calendar импортирует этот модуль.
+        from api.work_calendar import get_slot_grid
+        if not get_slot_grid().is_work_interval(
+            cleaning_date=self.cleaning_date, start=start, duration=duration,
+        ):
+            return []
+        window: int = interval_mask(start=start, duration=duration)
+        return [
+            cleaner_id for cleaner_id, mask in self.masks.items()
+            if not mask & window
+        ]
+
+    def book(self, cleaner_id: int, start: int, duration: int) -> None:
+        """
+        Отмечает уборщика занятым в течение duration минут, начиная
+        с минуты start, с учетом времени на дорогу до и после уборки.
+        """
+        busy_start: int = max(0, start - ROUTE_TRAVEL_BUFFER_MIN)
+        self.masks[cleaner_id] |= interval_mask(
+            start=busy_start,
+            duration=start + duration + ROUTE_TRAVEL_BUFFER_MIN - busy_start,
+        )
+        self._distinct_masks = set(self.masks.values())
+        return
+
+    def get_free_run(self, start: int) -> int:
+        """
+        Возвращает максимальную продолжительность в минутах, на которую
+        хотя бы один уборщик свободен, начиная с минуты start.
+        """
+        return self.get_free_runs(starts=(start,))[start]
+
+    def get_free_runs(self, starts: Iterable[int]) -> dict[int, int]:
+        """
+        Возвращает максимальную продолжительность свободного окна
+        для каждого слота в формате {минута начала слота: минуты}.
+
+        При большом количестве уборщиков с различной занятостью и
+        установленном NumPy расчет выполняется матричными операциями.
+        """
+        if np is not None and (
+            len(self._distinct_masks) >= AVAILABLE_TIME_NUMPY_MIN_CLEANERS
+        ):
+            return get_free_runs_matrix(
+                masks=self._distinct_masks, starts=starts
+            )
+        return get_free_runs_bitmask(
+            masks=self._distinct_masks, starts=starts
+        )
+
+
+def _generation_key() -> str:
+    return f'{AVAILABLE_TIME_CACHED_KEY}:generation'
+
+
+def _version_key(cleaning_date: date) -> str:
+    return f'{AVAILABLE_TIME_CACHED_KEY}:version:{cleaning_date.isoformat()}'
+
+
+def _free_runs_key(
+        cleaning_date: date,
+        generation: int,
+        version: int,
+        signature: str) -> str:
+    # INFO: время на дорогу и сетка слотов входят в ключ, чтобы после
+    #       их изменения не читались окна, рассчитанные по прежним.
+    return (
+        f'{AVAILABLE_TIME_CACHED_KEY}:{ROUTE_TRAVEL_BUFFER_MIN}:{signature}:'
+        f'{generation}:{version}:{cleaning_date.isoformat()}'
+    )
+
+
+def _get_free_runs_keys(
+        dates: list[date], signature: str) -> dict[date, str]:
+    """
+    Возвращает ключи кэша свободных окон для каждого дня для сетки слотов
+    с подписью signature.
+
+    Ключ включает общее поколение кэша и версию дня: после инвалидации
+    запись, рассчитанная по устаревшим данным, попадает под старый ключ
+    и никогда не будет прочитана.
+    """
+    versions_keys: dict[date, str] = {
+        cleaning_date: _version_key(cleaning_date) for cleaning_date in dates
+    }
+    versions: dict[str, int] = cache.get_many(
+        [_generation_key(), *versions_keys.values()]
+    )
+    generation: int = versions.get(_generation_key(), 0)
+    return {
+        cleaning_date: _free_runs_key(
+            cleaning_date=cleaning_date,
+            generation=generation,
+            version=versions.get(version_key, 0),
+            signature=signature,
+        )
+        for cleaning_date, version_key in versions_keys.items()
+    }
+
+
+def get_cached_free_runs(
+        dates: list[date],
+        starts: Iterable[int],
+        signature: str) -> dict[date, dict[int, int]]:
+    """
+    Возвращает максимальную продолжительность свободного окна для каждого
+    слота starts каждого дня из dates в формате {день: {минута: минуты}}.
+    signature - подпись сетки слотов starts, под которой окна хранятся
+    в кэше (см. api.work_calendar.SlotGrid).
+
+    Отсутствующие в кэше дни рассчитываются за один проход по диапазону
+    и сохраняются в кэш.
+    """
+    keys: dict[date, str] = _get_free_runs_keys(
+        dates=dates, signature=signature
+    )
+    cached: dict[str, dict[int, int]] = cache.get_many(keys.values())
+    free_runs: dict[date, dict[int, int]] = {
+        cleaning_date: cached[key]
+        for cleaning_date, key in keys.items() if key in cached
+    }
+    missed_dates: list[date] = [
+        cleaning_date for cleaning_date in dates
+        if cleaning_date not in free_runs
+    ]
+    if not missed_dates:
+        return free_runs
+    missed_runs: dict[str, dict[int, int]] = {}
+    for day in DayAvailability.load_range(
+        date_from=min(missed_dates),
+        date_to=max(missed_dates),
+    ):
+        if day.cleaning_date not in keys or day.cleaning_date in free_runs:
+            continue
+        day_runs: dict[int, int] = day.get_free_runs(starts)
+        free_runs[day.cleaning_date] = day_runs
+        missed_runs[keys[day.cleaning_date]] = day_runs
+    cache.set_many(missed_runs, timeout=AVAILABLE_TIME_CACHE_TIMEOUT)
+    return free_runs
+
+
+def _increment(key: str) -> None:
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+    return
+
+
+def invalidate_available_time(dates: Iterable[date] = None) -> None:
+    """
+    Сбрасывает кэш доступного времени для указанных дней, либо для всех
+    дней, если dates не указан, и запускает прогрев кэша.
+
+    Сброс выполняется после фиксации текущей транзакции, чтобы прогрев
+    и параллельные запросы не сохранили в кэш незафиксированные данные.
+    """
+    dates: set[date] = None if dates is None else set(dates) - {None}
+    if dates is not None and not dates:
+        return
+
+    def invalidate() -> None:
+        from services.tasks import warm_up_available_time
+
+        if dates is None:
+            _increment(_generation_key())
+        else:
+            for cleaning_date in dates:
+                _increment(_version_key(cleaning_date))
+        warm_up_available_time.delay()
+        return
+
+    transaction.on_commit(invalidate)
+    return
@@ -0,0 +1,426 @@
+"""
+Пакетное создание заказов для корпоративных клиентов.
+
+Все заказы пакета проверяются вместе, а объем работы не зависит
+от размера пакета:
+    - данные каждого заказа проверяются без запросов к базе данных
+    - наборы услуг, услуги, адреса и уже созданные на эти адреса заказы
+      загружаются по одному запросу на весь пакет
+    - уборщики назначаются по маршрутам (см. api.routing.rank_booking_routes)
+      в одном расписании в памяти: заказы пакета учитываются
+      при назначении следующих заказов
+    - адреса, заказы, интервалы занятости уборщиков и услуги заказов
+      сохраняются через bulk_create в одной транзакции
+
+Ошибка в заказе не прерывает обработку остальных заказов пакета:
+результат возвращается для каждого заказа отдельно.
+"""
+
+from datetime import date, time
+from typing import Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from api.assignment import RouteAwareStrategy
+from api.availability import (
+    get_cleaners_ids, get_cleaners_vacations, get_holidays,
+    invalidate_available_time,
+)
+from api.pricing import PriceTable, Quote, get_cleaning_types_queryset
+from api.routing import (
+    CleanerRoute, RouteStop, get_route_stop, rank_booking_routes,
+)
+from api.serializers import (
+    OrderBatchRowSerializer, get_services_ids, validate_order_services,
+)
+from api.work_calendar import is_work_time
+from cleanpro.app_data import ORDER_CANCELLED_STATUS
+from services.models import (
+    CleanerBusyInterval, CleaningType, Order, Service, ServicesInOrder,
+)
+from users.models import Address, User
+
+ADDRESS_FIELDS: tuple[str] = (
+    'city', 'street', 'house', 'entrance', 'floor', 'apartment',
+)
+
+AddressKey = tuple
+
+
+class BatchRow:
+    """
+    Заказ пакета.
+
+    Атрибуты:
+        - index (int) - номер заказа в пакете, начиная с 0
+        - data (dict) - проверенные данные заказа
+        - errors (any) - ошибки заказа, None для корректного заказа
+        - services (dict[int, int]) - количество каждой услуги по id
+        - quote (Quote) - стоимость и продолжительность заказа
+        - cleaner_id (int) - id назначенного уборщика
+        - reason (str) - причина выбора уборщика
+        - order (Order) - созданный заказ
+    """
+
+    def __init__(self, index: int, data: dict):
+        self.index: int = index
+        self.data: dict = data
+        self.errors: any = None
+        self.services: dict[int, int] = {}
+        self.quote: Quote = None
+        self.cleaner_id: int = None
+        self.reason: str = None
+        self.order: Order = None
+
+    @property
+    def address_key(self) -> AddressKey:
+        """Поля адреса заказа для поиска адреса."""
+        return tuple(
+            self.data['address'].get(field) for field in ADDRESS_FIELDS
+        )
+
+    @property
+    def is_valid(self) -> bool:
+        return self.errors is None
+
+    def get_result(self) -> dict[str, any]:
+        """Возвращает результат обработки заказа."""
+        if not self.is_valid:
+            return {'row': self.index, 'errors': self.errors}
+        return {
+            'row': self.index,
+            'id': self.order.id,
+            'total_sum': self.order.total_sum,
+            'total_time': self.order.total_time,
+        }
+
+
+def get_valid_rows(rows: list[BatchRow]) -> list[BatchRow]:
+    """Возвращает заказы пакета без ошибок."""
+    return [row for row in rows if row.is_valid]
+
+
+def validate_rows(orders_data: list[dict]) -> list[BatchRow]:
+    """Проверяет данные каждого заказа пакета."""
+    rows: list[BatchRow] = []
+    for index, order_data in enumerate(orders_data):
+        serializer: OrderBatchRowSerializer = OrderBatchRowSerializer(
+            data=order_data
+        )
+        row: BatchRow = BatchRow(
+            index=index,
+            data=serializer.validated_data if serializer.is_valid() else {},
+        )
+        if serializer.errors:
+            row.errors = serializer.errors
+        rows.append(row)
+    return rows
+
+
+def quote_rows(rows: list[BatchRow]) -> None:
+    """
+    Проверяет наборы услуг и услуги заказов пакета и рассчитывает
+    стоимость заказов. Загружает наборы услуг с их услугами и услуги
+    тремя запросами.
+    """
+    cleaning_types: dict[int, CleaningType] = (
+        get_cleaning_types_queryset().in_bulk(
+            {row.data['cleaning_type'] for row in rows}
+        )
+    )
+    services: dict[int, Service] = Service.objects.select_related(
+        'measure'
+    ).in_bulk(
+        {
+            service_id for row in rows
+            for service_id in get_services_ids(row.data['services'])
+        }
+    )
+    price_table: PriceTable = PriceTable.from_instances(
+        cleaning_types=cleaning_types.values(), services=services.values()
+    )
+    for row in rows:
+        if row.data['cleaning_type'] not in cleaning_types:
+            row.errors = {
+                'cleaning_type': ['Набор услуг с указанным id не существует.']
+            }
+            continue
+        try:
+            row.services = validate_order_services(
+                services_data=row.data['services'], services=services
+            )
+        except serializers.ValidationError as err:
+            row.errors = {'services': err.detail}
+            continue
+        row.quote = price_table.quote(
+            cleaning_type_id=row.data['cleaning_type'],
+            services=row.services,
+            rooms_number=row.data['rooms_number'],
+            bathrooms_number=row.data['bathrooms_number'],
+        )
+    return
+
+
+def get_addresses(keys: Iterable[AddressKey]) -> dict[AddressKey, Address]:
+    """Возвращает существующие адреса по их полям одним запросом."""
+    query: Q = Q()
+    for key in set(keys):
+        query |= Q(**dict(zip(ADDRESS_FIELDS, key)))
+    if not query:
+        return {}
+    return {
+        tuple(getattr(address, field) for field in ADDRESS_FIELDS): address
+        for address in Address.objects.filter(query)
+    }
+
+
+def check_duplicates(
+        rows: list[BatchRow], addresses: dict[AddressKey, Address]) -> None:
+    """
+    Отмечает ошибкой заказы, которые уже созданы на тот же адрес
+    и время, в том числе предыдущими заказами пакета.
+    """
+    booked: set[tuple[AddressKey, date, time]] = set()
+    keys: dict[int, AddressKey] = {
+        address.id: key for key, address in addresses.items()
+    }
+    for address_id, cleaning_date, cleaning_time in Order.objects.filter(
+        address__in=addresses.values(),
+        cleaning_date__in={row.data['cleaning_date'] for row in rows},
+    ).values_list('address_id', 'cleaning_date', 'cleaning_time'):
+        booked.add((keys[address_id], cleaning_date, cleaning_time))
+    for row in rows:
+        booking: tuple[AddressKey, date, time] = (
+            row.address_key, row.data['cleaning_date'],
+            row.data['cleaning_time'],
+        )
+        if booking in booked:
+            row.errors = {
+                'order': ['Заказ на указанный адрес и время уже создан.']
+            }
+            continue
+        booked.add(booking)
+    return
+
+
+def load_routes(
+        cleaning_dates: set[date]) -> dict[date, dict[int, CleanerRoute]]:
+    """
+    Возвращает маршруты доступных уборщиков на каждый день пакета:
+    отпуска уборщиков, нерабочие дни и заказы всех дней загружаются
+    тремя запросами. В нерабочий день доступных уборщиков нет.
+    """
+    vacations: list[tuple[int, date, date]] = get_cleaners_vacations()
+    holidays: set[date] = get_holidays(
+        date_from=min(cleaning_dates), date_to=max(cleaning_dates),
+    )
+    routes: dict[date, dict[int, CleanerRoute]] = {
+        cleaning_date: {
+            cleaner_id: CleanerRoute(cleaner_id=cleaner_id)
+            for cleaner_id in get_cleaners_ids(
+                cleaning_date=cleaning_date, cleaners=vacations
+            )
+        } if cleaning_date not in holidays else {}
+        for cleaning_date in cleaning_dates
+    }
+    orders = Order.objects.filter(
+        cleaning_date__in=cleaning_dates,
+        cleaner__isnull=False,
+    ).exclude(
+        order_status=ORDER_CANCELLED_STATUS,
+    ).values_list(
+        'id', 'cleaner_id', 'cleaning_date', 'cleaning_time', 'total_time',
+        'address__city', 'address__street',
+    )
+    for (order_id, cleaner_id, cleaning_date, cleaning_time, total_time,
+            city, street) in orders:
+        route: Optional[CleanerRoute] = routes[cleaning_date].get(cleaner_id)
+        if route is None:
+            continue
+        route.insert(
+            get_route_stop(
+                order_id=order_id,
+                cleaning_time=cleaning_time,
+                total_time=total_time,
+                city=city,
+                street=street,
+            )
+        )
+    return routes
+
+
+def assign_cleaners(rows: list[BatchRow]) -> None:
+    """
+    Назначает уборщиков заказам пакета в одном расписании в памяти.
+    Заказы обрабатываются по дате и времени начала, заказы на одно время -
+    в порядке пакета. Заказы вне рабочих часов отклоняются.
+    """
+    routes: dict[date, dict[int, CleanerRoute]] = load_routes(
+        cleaning_dates={row.data['cleaning_date'] for row in rows}
+    )
+    strategy: RouteAwareStrategy = RouteAwareStrategy()
+    stops: list[tuple[date, RouteStop, BatchRow]] = [
+        (
+            row.data['cleaning_date'],
+            # INFO: у новых заказов еще нет id, отрицательные номера
+            #       отличают их от существующих заказов.
+            get_route_stop(
+                order_id=-1 - row.index,
+                cleaning_time=row.data['cleaning_time'],
+                total_time=row.quote.total_time,
+                city=row.data['address']['city'],
+                street=row.data['address']['street'],
+            ),
+            row,
+        )
+        for row in rows
+    ]
+    stops.sort(key=lambda item: (item[0], item[1].start, item[2].index))
+    for cleaning_date, stop, row in stops:
+        if not is_work_time(
+            cleaning_date=cleaning_date,
+            cleaning_time=row.data['cleaning_time'],
+            total_time=row.quote.total_time,
+        ):
+            row.errors = {
+                'order': [
+                    'Уборка должна начинаться и заканчиваться '
+                    'в рабочие часы.'
+                ],
+            }
+            continue
+        ranked: list[tuple[CleanerRoute, Optional[int]]] = (
+            rank_booking_routes(
+                routes=routes[cleaning_date].values(), stop=stop
+            )
+        )
+        if not ranked:
+            row.errors = {
+                'order': [
+                    'Для указанного дня и времени нет доступных уборщиков.'
+                ],
+            }
+            continue
+        route, cost = ranked[0]
+        route.insert(stop)
+        row.cleaner_id = route.cleaner_id
+        row.reason = f'{strategy.name}: {strategy.get_reason(cost)}'
+    return
+
+
+def bulk_create_orders(
+        orders: list[Order], services: list[dict[int, int]]) -> None:
+    """
+    Сохраняет заказы с назначенными уборщиками, интервалы занятости
+    уборщиков и услуги заказов через bulk_create.
+    services - количество каждой услуги по id для каждого заказа
+    в порядке orders.
+
+    Сигналы post_save при bulk_create не отправляются, поэтому кэш
+    доступного времени дней заказов сбрасывается явно.
+    """
+    for order in orders:
+        order.cleaning_time_end = timezone.localtime(
+            order.get_cleaning_period()[1]
+        ).time()
+    Order.objects.bulk_create(orders)
+    intervals: list[CleanerBusyInterval] = []
+    for order in orders:
+        start, end = order.get_cleaning_period()
+        intervals.append(
+            CleanerBusyInterval(
+                order=order,
+                cleaner_id=order.cleaner_id,
+                start=start,
+                end=end,
+            )
+        )
+    CleanerBusyInterval.objects.bulk_create(intervals)
+    ServicesInOrder.objects.bulk_create(
+        ServicesInOrder(order=order, service_id=service_id, amount=amount)
+        for order, order_services in zip(orders, services)
+        for service_id, amount in order_services.items()
+    )
+    invalidate_available_time(
+        dates={order.cleaning_date for order in orders}
+    )
+    return
+
+
+@transaction.atomic
+def save_rows(
+        user: User,
+        rows: list[BatchRow],
+        addresses: dict[AddressKey, Address]) -> None:
+    """
+    Сохраняет новые адреса, заказы, интервалы занятости уборщиков
+    и услуги заказов через bulk_create в одной транзакции.
+    """
+    new_addresses: dict[AddressKey, Address] = {
+        row.address_key: Address(**row.data['address'])
+        for row in rows if row.address_key not in addresses
+    }
+    Address.objects.bulk_create(new_addresses.values())
+    addresses = {**addresses, **new_addresses}
+    for row in rows:
+        row.order = Order(
+            user=user,
+            cleaner_id=row.cleaner_id,
+            cleaner_assignment_reason=row.reason,
+            total_sum=row.quote.total_sum,
+            total_time=row.quote.total_time,
+            comment=row.data.get('comment'),
+            cleaning_type_id=row.data['cleaning_type'],
+            rooms_number=row.data['rooms_number'],
+            bathrooms_number=row.data['bathrooms_number'],
+            address=addresses[row.address_key],
+            cleaning_date=row.data['cleaning_date'],
+            cleaning_time=row.data['cleaning_time'],
+        )
+    bulk_create_orders(
+        orders=[row.order for row in rows],
+        services=[row.services for row in rows],
+    )
+    return
+
+
+def create_orders_batch(
+        user: User, orders_data: list[dict]) -> list[dict[str, any]]:
+    """
+    Создает заказы пакета от имени пользователя user.
+    Возвращает результат для каждого заказа в порядке пакета: id,
+    стоимость и продолжительность созданного заказа либо его ошибки.
+
+    Если во время сохранения параллельный заказ занял уборщика или адрес,
+    пакет не сохраняется и вызывается ValidationError.
+    """
+    rows: list[BatchRow] = validate_rows(orders_data=orders_data)
+    if get_valid_rows(rows):
+        quote_rows(rows=get_valid_rows(rows))
+    addresses: dict[AddressKey, Address] = get_addresses(
+        keys=(row.address_key for row in get_valid_rows(rows))
+    )
+    if get_valid_rows(rows):
+        check_duplicates(rows=get_valid_rows(rows), addresses=addresses)
+    if get_valid_rows(rows):
+        assign_cleaners(rows=get_valid_rows(rows))
+    if get_valid_rows(rows):
+        try:
+            save_rows(
+                user=user, rows=get_valid_rows(rows), addresses=addresses
+            )
+        except IntegrityError:
+            # INFO: параллельный запрос занял уборщика или создал заказ
+            #       на тот же адрес и время.
+            raise serializers.ValidationError(
+                {
+                    'orders': (
+                        'Расписание изменилось во время создания заказов, '
+                        'повторите запрос.'
+                    ),
+                },
+            )
+    return [row.get_result() for row in rows]
@@ -0,0 +1,107 @@
+"""
+Снимок каталога: услуги, наборы услуг и единицы измерения одним ответом.
+
+Снимок сериализуется один раз для ревизии каталога (см. api.pricing)
+и хранится в кэше в виде готового JSON и его gzip-копии. Ревизия
+увеличивается при любом изменении каталога, поэтому снимок никогда
+не сбрасывается явно: при смене ревизии строится снимок новой ревизии,
+а снимки старых ревизий удаляются по сроку жизни.
+
+ETag снимка зависит только от ревизии, поэтому запрос с актуальным
+заголовком If-None-Match получает ответ 304 после одного чтения ревизии
+из кэша, без обращения к базе данных и сериализаторам.
+"""
+
+from gzip import compress
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from api.serializers import (
+    GetCleaningTypeSerializer, GetServiceSerializer, MeasureSerializer,
+)
+from cleanpro.app_data import (
+    CATALOG_SNAPSHOT_CACHED_KEY, CATALOG_SNAPSHOT_CACHE_TIMEOUT,
+    CLEANPRO_BASE_URL, SERVICES_ADDITIONAL,
+)
+from services.models import CleaningType, Measure, Service
+
+
+class CatalogSnapshot(NamedTuple):
+    """
+    Снимок каталога.
+
+    Атрибуты:
+        - revision (int) - ревизия каталога
+        - content (bytes) - JSON каталога
+        - gzipped (bytes) - JSON каталога, сжатый gzip
+    """
+
+    revision: int
+    content: bytes
+    gzipped: bytes
+
+
+def get_catalog_etag(revision: int) -> str:
+    """Возвращает ETag снимка каталога ревизии revision."""
+    return f'"catalog-{revision}"'
+
+
+def is_catalog_not_modified(if_none_match: str, revision: int) -> bool:
+    """
+    Проверяет, что заголовок If-None-Match содержит ETag снимка каталога
+    ревизии revision.
+    """
+    etags: set[str] = {
+        etag.removeprefix('W/') for etag in parse_etags(if_none_match)
+    }
+    return '*' in etags or get_catalog_etag(revision) in etags
+
+
+def build_catalog_snapshot(revision: int) -> CatalogSnapshot:
+    """
+    Сериализует каталог в том же виде, в котором его возвращают списки
+    услуг, наборов услуг и единиц измерения для пользователей. Снимок
+    общий для всех запросов, поэтому ссылки на изображения строятся
+    по адресу сайта CLEANPRO_BASE_URL, а не по адресу запроса.
+    """
+    context: dict[str, str] = {'base_url': CLEANPRO_BASE_URL}
+    content: bytes = JSONRenderer().render(
+        {
+            'revision': revision,
+            'measures': MeasureSerializer(
+                Measure.objects.all(), many=True, context=context,
+            ).data,
+            'services': GetServiceSerializer(
+                Service.objects.select_related('measure').filter(
+                    service_type=SERVICES_ADDITIONAL,
+                ),
+                many=True,
+                context=context,
+            ).data,
+            'cleaning_types': GetCleaningTypeSerializer(
+                CleaningType.objects.prefetch_related('service__measure'),
+                many=True,
+                context=context,
+            ).data,
+        }
+    )
+    return CatalogSnapshot(
+        revision=revision, content=content, gzipped=compress(content)
+    )
+
+
+def get_catalog_snapshot(revision: int) -> CatalogSnapshot:
+    """
+    Возвращает снимок каталога ревизии revision из кэша, а при его
+    отсутствии строит снимок и сохраняет его в кэш.
+    """
+    key: str = f'{CATALOG_SNAPSHOT_CACHED_KEY}:{revision}'
+    snapshot: tuple = cache.get(key)
+    if snapshot is not None:
+        return CatalogSnapshot(*snapshot)
+    snapshot = build_catalog_snapshot(revision=revision)
+    cache.set(key, tuple(snapshot), timeout=CATALOG_SNAPSHOT_CACHE_TIMEOUT)
+    return snapshot
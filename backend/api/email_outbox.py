@@ -0,0 +1,141 @@
+"""
+Очередь исходящих электронных писем (см. OutboxEmail).
+
+Обработчик запроса только сохраняет письмо в очередь в своей транзакции,
+поэтому задержки SMTP-сервера не влияют на время ответа, а письмо
+не отправляется, если транзакция запроса отменена. После фиксации
+транзакции очередь разбирает задача send_queued_emails, а если брокер
+задач был недоступен - периодическая задача того же названия.
+
+Письма отправляются пакетами по EMAIL_OUTBOX_BATCH_SIZE через одно
+соединение с SMTP-сервером. Пакет блокируется для параллельных
+обработчиков очереди (SELECT ... FOR UPDATE SKIP LOCKED).
+"""
+
+from datetime import datetime, timedelta
+from smtplib import SMTPException
+from typing import Optional
+
+from django.core import mail
+from django.db import transaction
+from django.utils import timezone
+
+from cleanpro.app_data import (
+    DEFAULT_FROM_EMAIL, EMAIL_OUTBOX_BATCH_SIZE, EMAIL_OUTBOX_MAX_ATTEMPTS,
+    EMAIL_OUTBOX_RETRY_DELAY,
+)
+from services.models import OutboxEmail
+
+
+def queue_email(subject: str, message: str, to: tuple[str]) -> OutboxEmail:
+    """
+    Сохраняет письмо в очередь и запускает отправку очереди
+    после фиксации транзакции.
+    """
+    email: OutboxEmail = OutboxEmail.objects.create(
+        subject=subject, body=message, to=list(to),
+    )
+    transaction.on_commit(_send_queued_emails_delay)
+    return email
+
+
+def _send_queued_emails_delay() -> None:
+    # INFO: services.tasks импортирует этот модуль.
+    from services.tasks import send_queued_emails
+    send_queued_emails.delay()
+    return
+
+
+def get_retry_time(
+        attempts: int, now: datetime) -> Optional[datetime]:
+    """
+    Возвращает время следующей попытки отправки письма после attempts
+    неудачных попыток, либо None, если попытки исчерпаны.
+    """
+    if attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+        return None
+    return now + timedelta(
+        seconds=EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def deliver_emails(emails: list[OutboxEmail]) -> dict[int, str]:
+    """
+    Отправляет письма через одно соединение с SMTP-сервером.
+    Возвращает ошибки неотправленных писем по id письма.
+    """
+    sent: set[int] = set()
+    errors: dict[int, str] = {}
+    try:
+        with mail.get_connection(fail_silently=False) as connection:
+            for email in emails:
+                message = mail.EmailMessage(
+                    subject=email.subject,
+                    body=email.body,
+                    from_email=DEFAULT_FROM_EMAIL,
+                    to=email.to,
+                    connection=connection,
+                )
+                try:
+                    connection.send_messages([message])
+                except (SMTPException, OSError) as err:
+                    errors[email.pk] = repr(err)
+                else:
+                    sent.add(email.pk)
+    except (SMTPException, OSError) as err:
+        # INFO: соединение не открылось или оборвалось, письма,
+        #       до которых не дошла очередь, повторяются позже.
+        for email in emails:
+            if email.pk not in sent:
+                errors.setdefault(email.pk, repr(err))
+    return errors
+
+
+def send_email_batch() -> int:
+    """
+    Отправляет пакет писем, время попытки отправки которых наступило.
+    Отправленные письма удаляются из очереди, для остальных назначается
+    следующая попытка. Возвращает количество писем в пакете.
+    """
+    now: datetime = timezone.now()
+    with transaction.atomic():
+        emails: list[OutboxEmail] = list(
+            OutboxEmail.objects.select_for_update(
+                skip_locked=True
+            ).filter(next_attempt__lte=now)[:EMAIL_OUTBOX_BATCH_SIZE]
+        )
+        if not emails:
+            return 0
+        errors: dict[int, str] = deliver_emails(emails=emails)
+        failed: list[OutboxEmail] = []
+        for email in emails:
+            if email.pk not in errors:
+                continue
+            email.attempts += 1
+            email.next_attempt = get_retry_time(
+                attempts=email.attempts, now=now,
+            )
+            email.error = errors[email.pk]
+            failed.append(email)
+        OutboxEmail.objects.filter(
+            pk__in=[email.pk for email in emails if email.pk not in errors]
+        ).delete()
+        OutboxEmail.objects.bulk_update(
+            failed, fields=('attempts', 'next_attempt', 'error'),
+        )
+    return len(emails)
+
+
+def send_queued_emails() -> int:
+    """
+    Отправляет письма из очереди пакетами, пока в очереди есть письма,
+    время попытки отправки которых наступило.
+    Возвращает количество обработанных писем.
+    """
+    processed: int = 0
+    while True:
+        batch: int = send_email_batch()
+        processed += batch
+        if batch < EMAIL_OUTBOX_BATCH_SIZE:
+            break
+    return processed
@@ -0,0 +1,232 @@
+"""
+Идемпотентная обработка запросов с заголовком Idempotency-Key.
+
+Ответ на первый успешный запрос с ключом сохраняется в кэш и в базу
+данных (IdempotencyKey). Повторный запрос с тем же ключом получает
+сохраненный ответ из кэша без повторной обработки, а при отсутствии
+ответа в кэше - из базы данных. Ответ сохраняется в базу данных в одной
+транзакции с изменениями, которые выполнил запрос.
+
+Пока запрос с ключом обрабатывается, ключ заблокирован в кэше:
+параллельный запрос с тем же ключом сразу получает ответ 409
+и повторяет запрос позже.
+
+Ответы с ошибками не сохраняются, чтобы клиент мог исправить запрос
+и повторить его с тем же ключом.
+"""
+
+from contextlib import contextmanager
+from functools import wraps
+from hashlib import sha256
+import json
+from typing import Callable, Iterator, NamedTuple, Optional
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from cleanpro.app_data import (
+    IDEMPOTENCY_CACHED_KEY, IDEMPOTENCY_CACHE_TIMEOUT, IDEMPOTENCY_KEY_HEADER,
+    IDEMPOTENCY_KEY_MAX_LEN, IDEMPOTENCY_LOCK_TIMEOUT,
+)
+from services.models import IdempotencyKey
+
+IDEMPOTENCY_REPLAYED_HEADER: str = 'Idempotent-Replayed'
+
+
+class StoredResponse(NamedTuple):
+    """
+    Сохраненный ответ на запрос.
+
+    Атрибуты:
+        - fingerprint (str) - хэш тела запроса
+        - status_code (int) - код ответа
+        - data (any) - данные ответа
+    """
+
+    fingerprint: str
+    status_code: int
+    data: any
+
+
+def _hash(value: str) -> str:
+    return sha256(value.encode()).hexdigest()
+
+
+def _response_key(key: str) -> str:
+    return f'{IDEMPOTENCY_CACHED_KEY}:response:{key}'
+
+
+def _lock_key(key: str) -> str:
+    return f'{IDEMPOTENCY_CACHED_KEY}:lock:{key}'
+
+
+def get_request_key(request: Request, key: str) -> str:
+    """
+    Возвращает ключ запроса: хэш пользователя, метода и пути запроса
+    и значения заголовка Idempotency-Key.
+    """
+    return _hash(f'{request.user.pk}:{request.method}:{request.path}:{key}')
+
+
+def get_request_fingerprint(request: Request) -> str:
+    """Возвращает хэш тела запроса."""
+    return _hash(json.dumps(request.data, sort_keys=True, default=str))
+
+
+def get_stored_response(key: str) -> Optional[StoredResponse]:
+    """
+    Возвращает сохраненный ответ на запрос с ключом key из кэша,
+    а при его отсутствии в кэше - из базы данных.
+    """
+    stored: tuple = cache.get(_response_key(key))
+    if stored is not None:
+        return StoredResponse(*stored)
+    stored = IdempotencyKey.objects.filter(key=key).values_list(
+        'fingerprint', 'status_code', 'response'
+    ).first()
+    if stored is None:
+        return None
+    cache_response(key=key, stored=StoredResponse(*stored))
+    return StoredResponse(*stored)
+
+
+def store_response(key: str, stored: StoredResponse) -> bool:
+    """
+    Сохраняет ответ на запрос с ключом key в базу данных в текущей
+    транзакции. Возвращает False, если ответ на запрос с этим ключом
+    уже сохранен.
+    """
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(
+                key=key,
+                fingerprint=stored.fingerprint,
+                status_code=stored.status_code,
+                response=stored.data,
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def cache_response(key: str, stored: StoredResponse) -> None:
+    """Сохраняет ответ на запрос с ключом key в кэш."""
+    cache.set(
+        _response_key(key), tuple(stored), timeout=IDEMPOTENCY_CACHE_TIMEOUT
+    )
+    return
+
+
+@contextmanager
+def lock_request_key(key: str) -> Iterator[bool]:
+    """
+    Блокирует ключ запроса на время обработки запроса, но не дольше
+    IDEMPOTENCY_LOCK_TIMEOUT секунд. Не ожидает освобождения ключа,
+    заблокированного параллельным запросом.
+    Возвращает True, если блокировку удалось получить.
+    """
+    locked: bool = cache.add(
+        _lock_key(key), 1, timeout=IDEMPOTENCY_LOCK_TIMEOUT
+    )
+    try:
+        yield locked
+    finally:
+        if locked:
+            cache.delete(_lock_key(key))
+
+
+def get_conflict_response() -> Response:
+    """Возвращает ошибку 409 для запроса, ключ которого еще обрабатывается."""
+    return Response(
+        data={
+            IDEMPOTENCY_KEY_HEADER: 'Запрос с этим ключом еще обрабатывается.',
+        },
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
+def replay_response(stored: StoredResponse, fingerprint: str) -> Response:
+    """
+    Возвращает сохраненный ответ, если тело запроса совпадает
+    с телом первого запроса, иначе - ошибку 422.
+    """
+    if stored.fingerprint != fingerprint:
+        return Response(
+            data={
+                IDEMPOTENCY_KEY_HEADER: (
+                    'Ключ уже использован для запроса с другими данными.'
+                ),
+            },
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(
+        data=stored.data,
+        status=stored.status_code,
+        headers={IDEMPOTENCY_REPLAYED_HEADER: 'true'},
+    )
+
+
+def idempotent(view_method: Callable) -> Callable:
+    """
+    Декоратор метода представления, который делает запросы с заголовком
+    Idempotency-Key идемпотентными. Запросы без заголовка обрабатываются
+    без изменений.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request: Request, *args, **kwargs) -> Response:
+        header: str = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not header:
+            return view_method(self, request, *args, **kwargs)
+        if len(header) > IDEMPOTENCY_KEY_MAX_LEN:
+            return Response(
+                data={
+                    IDEMPOTENCY_KEY_HEADER: (
+                        'Длина ключа не может превышать '
+                        f'{IDEMPOTENCY_KEY_MAX_LEN} символов.'
+                    ),
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        key: str = get_request_key(request=request, key=header)
+        fingerprint: str = get_request_fingerprint(request=request)
+        stored: StoredResponse = get_stored_response(key=key)
+        if stored is not None:
+            return replay_response(stored=stored, fingerprint=fingerprint)
+        with lock_request_key(key=key) as locked:
+            if not locked:
+                return get_conflict_response()
+            # INFO: ответ мог сохранить запрос, который удерживал ключ.
+            stored = get_stored_response(key=key)
+            if stored is not None:
+                return replay_response(stored=stored, fingerprint=fingerprint)
+            with transaction.atomic():
+                response: Response = view_method(
+                    self, request, *args, **kwargs
+                )
+                if not status.is_success(response.status_code):
+                    return response
+                stored = StoredResponse(
+                    fingerprint=fingerprint,
+                    status_code=response.status_code,
+                    data=response.data,
+                )
+                is_stored: bool = store_response(key=key, stored=stored)
+                if not is_stored:
+                    # INFO: ответ успел сохранить параллельный запрос,
+                    #       изменения этого запроса отменяются.
+                    transaction.set_rollback(True)
+            if is_stored:
+                # INFO: ответ попадает в кэш только после фиксации
+                #       транзакции запроса.
+                cache_response(key=key, stored=stored)
+                return response
+            stored = get_stored_response(key=key)
+            if stored is None:
+                return get_conflict_response()
+            return replay_response(stored=stored, fingerprint=fingerprint)
+
+    return wrapper
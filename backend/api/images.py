@@ -0,0 +1,120 @@
+"""
+Уменьшенные копии изображений услуг.
+
+Для каждого изображения создаются копии размеров SERVICE_IMAGE_VARIANTS_SIZES
+в форматах SERVICE_IMAGE_VARIANTS_FORMATS, которые поддерживает Pillow.
+Имена файлов копий содержат хэш исходного изображения, поэтому файлы
+не перезаписываются при изменении изображения и кэшируются клиентами
+без проверки, а повторная обработка изображения не создает новых файлов.
+
+Подготовка копий (render_image_variants) не обращается к базе данных
+и хранилищу файлов, поэтому может выполняться в отдельных процессах.
+"""
+
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from api.pricing import invalidate_price_table
+from cleanpro.app_data import (
+    SERVICE_IMAGE_VARIANTS_FORMATS, SERVICE_IMAGE_VARIANTS_PATH,
+    SERVICE_IMAGE_VARIANTS_QUALITY, SERVICE_IMAGE_VARIANTS_SIZES,
+    SERVICE_IMAGE_VERSION_LEN,
+)
+from services.models import Service
+
+# INFO: размер -> формат -> имя файла копии в хранилище.
+ImageVariants = dict[str, dict[str, str]]
+
+
+def get_supported_formats() -> dict[str, str]:
+    """
+    Возвращает форматы копий, которые Pillow умеет сохранять:
+    расширение файла -> формат Pillow.
+    """
+    Image.init()
+    return {
+        extension: image_format
+        for extension, image_format in SERVICE_IMAGE_VARIANTS_FORMATS.items()
+        if image_format in Image.SAVE
+    }
+
+
+def get_variant_name(image_hash: str, size: str, extension: str) -> str:
+    """Возвращает имя файла копии изображения в хранилище."""
+    return (
+        f'{SERVICE_IMAGE_VARIANTS_PATH}'
+        f'{image_hash[:SERVICE_IMAGE_VERSION_LEN]}_{size}.{extension}'
+    )
+
+
+def render_image_variants(content: bytes) -> dict[str, dict[str, bytes]]:
+    """
+    Создает уменьшенные копии изображения content.
+    Возвращает содержимое копий по размерам и форматам.
+    """
+    variants: dict[str, dict[str, bytes]] = {}
+    formats: dict[str, str] = get_supported_formats()
+    with Image.open(BytesIO(content)) as original:
+        image: Image.Image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGB')
+        for size, max_side in SERVICE_IMAGE_VARIANTS_SIZES.items():
+            thumbnail: Image.Image = image.copy()
+            thumbnail.thumbnail((max_side, max_side))
+            for extension, image_format in formats.items():
+                variant: Image.Image = thumbnail
+                if image_format == 'JPEG' and variant.mode != 'RGB':
+                    variant = variant.convert('RGB')
+                buffer: BytesIO = BytesIO()
+                variant.save(
+                    buffer,
+                    format=image_format,
+                    quality=SERVICE_IMAGE_VARIANTS_QUALITY,
+                )
+                variants.setdefault(size, {})[extension] = buffer.getvalue()
+    return variants
+
+
+def save_image_variants(
+        image_hash: str,
+        variants: dict[str, dict[str, bytes]]) -> ImageVariants:
+    """
+    Сохраняет копии изображения с хэшем image_hash в хранилище, пропуская
+    уже существующие файлы. Возвращает имена файлов копий по размерам
+    и форматам.
+    """
+    names: ImageVariants = {}
+    for size, formats in variants.items():
+        for extension, content in formats.items():
+            name: str = get_variant_name(image_hash, size, extension)
+            if not default_storage.exists(name):
+                default_storage.save(name, ContentFile(content))
+            names.setdefault(size, {})[extension] = name
+    return names
+
+
+def read_image(service: Service) -> bytes:
+    """Возвращает содержимое изображения услуги."""
+    with service.image.open('rb') as image:
+        return image.read()
+
+
+def create_image_variants(service: Service) -> None:
+    """Создает уменьшенные копии изображения услуги."""
+    if not service.image:
+        return
+    service.image_variants = save_image_variants(
+        image_hash=service.image_hash,
+        variants=render_image_variants(content=read_image(service)),
+    )
+    # INFO: update не вызывает сигнал post_save; копии не сохраняются,
+    #       если изображение изменилось во время их создания.
+    Service.objects.filter(
+        pk=service.pk, image_hash=service.image_hash,
+    ).update(image_variants=service.image_variants)
+    # INFO: ссылки на копии входят в снимок каталога (см. api.catalog).
+    invalidate_price_table()
+    return
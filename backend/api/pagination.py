@@ -0,0 +1,304 @@
+"""
+Постраничный вывод по ключу (keyset/cursor pagination).
+
+Курсор страницы содержит значения полей сортировки последнего (для
+предыдущей страницы - первого) объекта страницы, а следующая страница
+выбирается условием на эти значения вместо OFFSET. При сортировке,
+совпадающей с индексом, любая страница читается из индекса так же быстро,
+как первая, а количество объектов (COUNT(*)) не рассчитывается.
+
+Сортировка берется из queryset, а при ее отсутствии - из Meta.ordering
+модели, и должна однозначно упорядочивать объекты: если в ней нет
+первичного ключа, он добавляется последним полем.
+
+По параметру ?count=approximate ответ содержит оценку количества
+объектов по статистике планировщика PostgreSQL без их подсчета.
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import json
+from typing import Callable, Optional
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Field, Model, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from cleanpro.app_data import (
+    PAGINATION_COUNT_APPROXIMATE, PAGINATION_COUNT_PARAM,
+    PAGINATION_CURSOR_PARAM, PAGINATION_LIMIT_PARAM, PAGINATION_MAX_LIMIT,
+)
+
+
+def get_ordering(queryset: QuerySet) -> tuple[str, ...]:
+    """
+    Возвращает сортировку queryset, которая однозначно упорядочивает
+    объекты: при отсутствии первичного ключа он добавляется последним
+    полем с направлением первого поля сортировки.
+    """
+    ordering: tuple[str, ...] = tuple(
+        queryset.query.order_by or queryset.model._meta.ordering
+    )
+    pk_name: str = queryset.model._meta.pk.name
+    if not {'pk', pk_name} & {field.lstrip('-') for field in ordering}:
+        descending: bool = bool(ordering) and ordering[0].startswith('-')
+        ordering += (f'-{pk_name}' if descending else pk_name,)
+    return ordering
+
+
+def get_ordering_field(model: type[Model], name: str) -> Field:
+    """
+    Возвращает поле модели model, по которому выполняется сортировка name,
+    в том числе поле связанной модели (address__city).
+    """
+    field: Field = None
+    for part in name.lstrip('-').split('__'):
+        field = (
+            model._meta.pk if part == 'pk' else model._meta.get_field(part)
+        )
+        model = field.related_model
+    return field
+
+
+def reverse_ordering(ordering: tuple[str, ...]) -> tuple[str, ...]:
+    """Возвращает обратную сортировку."""
+    return tuple(
+        field[1:] if field.startswith('-') else f'-{field}'
+        for field in ordering
+    )
+
+
+def get_position_filter(ordering: tuple[str, ...], position: list) -> Q:
+    """
+    Возвращает условие выбора объектов, которые следуют за позицией
+    position при сортировке ordering:
+    (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z).
+
+    Дополнительное условие a >= x на первое поле сортировки позволяет
+    планировщику ограничить диапазон чтения индекса.
+    """
+    query: Q = Q()
+    equal: dict[str, any] = {}
+    for field, value in zip(ordering, position):
+        name: str = field.lstrip('-')
+        lookup: str = 'lt' if field.startswith('-') else 'gt'
+        query |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    first: str = ordering[0]
+    lookup: str = 'lte' if first.startswith('-') else 'gte'
+    return Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & query
+
+
+def get_approximate_count(queryset: QuerySet) -> Optional[int]:
+    """
+    Возвращает оценку количества объектов queryset по статистике
+    планировщика PostgreSQL либо None для других баз данных.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan: list[dict] = json.loads(queryset.order_by().explain(format='json'))
+    return plan[0]['Plan']['Plan Rows']
+
+
+class KeysetPagination(BasePagination):
+    """
+    Постраничный вывод по ключу.
+
+    Ответ содержит ссылки на следующую и предыдущую страницы (next,
+    previous) и объекты страницы (results), а по параметру
+    ?count=approximate - также оценку количества объектов
+    (approximate_count).
+    """
+
+    page_size: int = api_settings.PAGE_SIZE
+
+    def get_limit(self, request: Request) -> int:
+        """Возвращает количество объектов на странице."""
+        try:
+            limit: int = int(request.query_params[PAGINATION_LIMIT_PARAM])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(limit, 1), PAGINATION_MAX_LIMIT)
+
+    def decode_cursor(
+            self,
+            request: Request,
+            model: type[Model]) -> Optional[tuple[list, bool]]:
+        """
+        Возвращает позицию курсора и признак движения к предыдущей
+        странице либо None для первой страницы. Значения позиции
+        приводятся к типам полей сортировки self.ordering модели model.
+
+        Если курсор не соответствует сортировке, вызывает NotFound.
+        """
+        cursor: str = request.query_params.get(PAGINATION_CURSOR_PARAM)
+        if not cursor:
+            return None
+        try:
+            data: dict = json.loads(urlsafe_b64decode(cursor.encode()))
+            position: list = data['p']
+            if (not isinstance(position, list) or
+                    len(position) != len(self.ordering) or None in position):
+                raise ValueError
+            return [
+                get_ordering_field(model=model, name=field).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ], bool(data.get('r'))
+        except (KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound('Неверный курсор страницы.')
+
+    def encode_cursor(self, position: list, reverse: bool) -> str:
+        """Возвращает ссылку на страницу после позиции position."""
+        cursor: str = urlsafe_b64encode(
+            json.dumps(
+                {'p': position, 'r': int(reverse)}, cls=DjangoJSONEncoder
+            ).encode()
+        ).decode()
+        return replace_query_param(
+            self.url, PAGINATION_CURSOR_PARAM, cursor
+        )
+
+    def get_position(self, instance: Model) -> list:
+        """Возвращает значения полей сортировки объекта."""
+        return [
+            getattr(instance, field.lstrip('-')) for field in self.ordering
+        ]
+
+    def paginate_queryset(
+            self,
+            queryset: QuerySet,
+            request: Request,
+            view=None) -> list[Model]:
+        self.url: str = remove_query_param(
+            request.build_absolute_uri(), PAGINATION_CURSOR_PARAM
+        )
+        self.ordering: tuple[str, ...] = get_ordering(queryset)
+        self.approximate_count: Optional[int] = None
+        self.is_count_requested: bool = request.query_params.get(
+            PAGINATION_COUNT_PARAM
+        ) == PAGINATION_COUNT_APPROXIMATE
+        if self.is_count_requested:
+            self.approximate_count = get_approximate_count(queryset)
+        limit: int = self.get_limit(request)
+        cursor: Optional[tuple[list, bool]] = self.decode_cursor(
+            request=request, model=queryset.model,
+        )
+        reverse: bool = cursor is not None and cursor[1]
+        ordering: tuple[str, ...] = (
+            reverse_ordering(self.ordering) if reverse else self.ordering
+        )
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(
+                get_position_filter(ordering=ordering, position=cursor[0])
+            )
+        page: list[Model] = list(queryset[:limit + 1])
+        has_more: bool = len(page) > limit
+        page = page[:limit]
+        if reverse:
+            page.reverse()
+        self.next: Optional[str] = None
+        self.previous: Optional[str] = None
+        if page and (has_more or reverse):
+            self.next = self.encode_cursor(
+                position=self.get_position(page[-1]), reverse=False
+            )
+        if page and (has_more if reverse else cursor is not None):
+            self.previous = self.encode_cursor(
+                position=self.get_position(page[0]), reverse=True
+            )
+        return page
+
+    def paginate_cached(
+            self,
+            request: Request,
+            model: type[Model],
+            ordering: tuple[str, ...],
+            get_page: Callable[[Optional[list], int], Optional[list[dict]]],
+            ) -> Optional[list[dict]]:
+        """
+        Возвращает страницу готовых представлений объектов модели model,
+        которую get_page(position, limit) выбирает из кэша после позиции
+        курсора position при сортировке ordering.
+
+        Возвращает None, если страницу нужно выбрать из базы данных:
+        при переходе к предыдущей странице, запросе количества объектов
+        или отсутствии страницы в кэше.
+        """
+        self.url: str = remove_query_param(
+            request.build_absolute_uri(), PAGINATION_CURSOR_PARAM
+        )
+        self.ordering: tuple[str, ...] = ordering
+        self.is_count_requested: bool = False
+        cursor: Optional[tuple[list, bool]] = self.decode_cursor(
+            request=request, model=model,
+        )
+        if (cursor is not None and cursor[1]) or request.query_params.get(
+                PAGINATION_COUNT_PARAM):
+            return None
+        limit: int = self.get_limit(request)
+        page: Optional[list[dict]] = get_page(
+            None if cursor is None else cursor[0], limit + 1
+        )
+        if page is None:
+            return None
+        has_more: bool = len(page) > limit
+        page = page[:limit]
+        self.next: Optional[str] = None
+        self.previous: Optional[str] = None
+        if page and has_more:
+            self.next = self.encode_cursor(
+                position=[page[-1][field.lstrip('-')] for field in ordering],
+                reverse=False,
+            )
+        if page and cursor is not None:
+            self.previous = self.encode_cursor(
+                position=[page[0][field.lstrip('-')] for field in ordering],
+                reverse=True,
+            )
+        return page
+
+    def get_paginated_response(self, data) -> Response:
+        response_data: dict[str, any] = {
+            'next': self.next,
+            'previous': self.previous,
+            'results': data,
+        }
+        if self.is_count_requested:
+            response_data['approximate_count'] = self.approximate_count
+        return Response(response_data)
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        example_url: str = (
+            f'http://api.example.org/accounts/?{PAGINATION_CURSOR_PARAM}='
+            'eyJwIjogWzRdLCAiciI6IDB9'
+        )
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                    'example': example_url,
+                },
+                'previous': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                    'example': example_url,
+                },
+                'approximate_count': {
+                    'type': 'integer',
+                    'nullable': True,
+                    'example': 123,
+                },
+                'results': schema,
+            },
+        }
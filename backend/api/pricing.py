@@ -0,0 +1,301 @@
+"""
+Расчет стоимости и продолжительности заказа.
+
+Стоимость заказа складывается из стоимости услуг набора услуг
+и стоимости выбранных дополнительных услуг, после чего умножается
+на коэффициент набора услуг. Услуга набора оплачивается за каждую
+комнату или санузел, если измеряется в комнатах (PRICE_MEASURE_ROOM)
+или санузлах (PRICE_MEASURE_BATHROOM), иначе - один раз за заказ.
+Дополнительная услуга оплачивается за каждую единицу выбранного
+количества. Продолжительность складывается так же из времени услуг.
+
+Цены услуг и наборы услуг хранятся в памяти процесса в таблице цен
+(PriceTable). Таблица помечена ревизией каталога, которая хранится
+в кэше и увеличивается при любом изменении услуг и наборов услуг:
+процесс перестраивает таблицу только при смене ревизии, поэтому
+расчет стоимости не выполняет запросов к базе данных.
+"""
+
+from time import time_ns
+from typing import Iterable, NamedTuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch, QuerySet
+
+from cleanpro.app_data import (
+    CATALOG_REVISION_CACHED_KEY, PRICE_MEASURE_BATHROOM, PRICE_MEASURE_ROOM,
+)
+from services.models import CleaningType, Service, ServicesInCleaningType
+
+
+class ServicePrice(NamedTuple):
+    """
+    Цена и время выполнения единицы услуги.
+
+    Атрибуты:
+        - price (float) - цена за единицу услуги
+        - cleaning_time (int) - время на единицу услуги в минутах
+        - measure (str) - единица измерения услуги
+    """
+
+    price: float
+    cleaning_time: int
+    measure: str
+
+    @classmethod
+    def from_service(cls, service: Service) -> 'ServicePrice':
+        """Возвращает цену услуги с загруженной единицей измерения."""
+        return cls(
+            price=service.price,
+            cleaning_time=service.cleaning_time,
+            measure=service.measure.title,
+        )
+
+
+class CleaningTypePrice(NamedTuple):
+    """
+    Коэффициент и услуги набора услуг.
+
+    Атрибуты:
+        - coefficient (float) - коэффициент повышения цены
+        - services (tuple[ServicePrice, ...]) - услуги набора
+    """
+
+    coefficient: float
+    services: tuple[ServicePrice, ...]
+
+    @classmethod
+    def from_cleaning_type(
+            cls, cleaning_type: CleaningType) -> 'CleaningTypePrice':
+        """
+        Возвращает цену набора услуг с загруженными услугами
+        и их единицами измерения.
+        """
+        return cls(
+            coefficient=cleaning_type.coefficient,
+            services=tuple(
+                ServicePrice.from_service(service)
+                for service in cleaning_type.service.all()
+            ),
+        )
+
+
+class Quote(NamedTuple):
+    """
+    Расчет заказа.
+
+    Атрибуты:
+        - total_sum (int) - стоимость заказа
+        - total_time (int) - продолжительность заказа в минутах
+    """
+
+    total_sum: int
+    total_time: int
+
+
+class PriceTable:
+    """
+    Таблица цен каталога услуг.
+
+    Атрибуты:
+        - revision (int) - ревизия каталога, по которой построена таблица
+        - cleaning_types (dict[int, CleaningTypePrice]) - наборы услуг по id
+        - services (dict[int, ServicePrice]) - цены услуг по id
+
+    Методы:
+        - load - строит таблицу тремя запросами к базе данных
+        - from_instances - строит таблицу по загруженным объектам
+        - quote - рассчитывает стоимость и продолжительность заказа
+    """
+
+    def __init__(
+            self,
+            revision: int,
+            cleaning_types: dict[int, CleaningTypePrice],
+            services: dict[int, ServicePrice]):
+        self.revision: int = revision
+        self.cleaning_types: dict[int, CleaningTypePrice] = cleaning_types
+        self.services: dict[int, ServicePrice] = services
+
+    @classmethod
+    def load(cls, revision: int) -> 'PriceTable':
+        """Строит таблицу цен для ревизии каталога revision."""
+        services: dict[int, ServicePrice] = {
+            service_id: ServicePrice(
+                price=price, cleaning_time=cleaning_time, measure=measure,
+            )
+            for service_id, price, cleaning_time, measure
+            in Service.objects.values_list(
+                'id', 'price', 'cleaning_time', 'measure__title'
+            )
+        }
+        included: dict[int, list[ServicePrice]] = {}
+        for cleaning_type_id, service_id in (
+                ServicesInCleaningType.objects.values_list(
+                    'cleaning_type_id', 'service_id'
+                )):
+            included.setdefault(cleaning_type_id, []).append(
+                services[service_id]
+            )
+        return cls(
+            revision=revision,
+            cleaning_types={
+                cleaning_type_id: CleaningTypePrice(
+                    coefficient=coefficient,
+                    services=tuple(included.get(cleaning_type_id, ())),
+                )
+                for cleaning_type_id, coefficient
+                in CleaningType.objects.values_list('id', 'coefficient')
+            },
+            services=services,
+        )
+
+    @classmethod
+    def from_instances(
+            cls,
+            cleaning_types: Iterable[CleaningType],
+            services: Iterable[Service]) -> 'PriceTable':
+        """
+        Строит таблицу цен по уже загруженным наборам услуг и услугам
+        без запросов к базе данных. Услуги наборов услуг и единицы
+        измерения услуг должны быть загружены заранее
+        (см. get_cleaning_types_queryset). Таблица не привязана
+        к ревизии каталога.
+        """
+        return cls(
+            revision=None,
+            cleaning_types={
+                cleaning_type.id: CleaningTypePrice.from_cleaning_type(
+                    cleaning_type
+                )
+                for cleaning_type in cleaning_types
+            },
+            services={
+                service.id: ServicePrice.from_service(service)
+                for service in services
+            },
+        )
+
+    @staticmethod
+    def get_units(
+            service: ServicePrice,
+            rooms_number: int,
+            bathrooms_number: int) -> int:
+        """Возвращает количество единиц услуги набора услуг в заказе."""
+        if service.measure == PRICE_MEASURE_ROOM:
+            return rooms_number
+        if service.measure == PRICE_MEASURE_BATHROOM:
+            return bathrooms_number
+        return 1
+
+    def quote(
+            self,
+            cleaning_type_id: int,
+            services: dict[int, int],
+            rooms_number: int,
+            bathrooms_number: int) -> Quote:
+        """
+        Рассчитывает стоимость и продолжительность заказа.
+        services - количество каждой дополнительной услуги заказа
+        по id услуги.
+
+        Если набор услуг или услуга отсутствуют в таблице, вызывает KeyError.
+        """
+        cleaning_type: CleaningTypePrice = self.cleaning_types[
+            cleaning_type_id
+        ]
+        amounts: list[tuple[ServicePrice, int]] = [
+            (
+                service,
+                self.get_units(
+                    service=service,
+                    rooms_number=rooms_number,
+                    bathrooms_number=bathrooms_number,
+                ),
+            )
+            for service in cleaning_type.services
+        ] + [
+            (self.services[service_id], amount)
+            for service_id, amount in services.items()
+        ]
+        total_sum: float = sum(
+            service.price * amount for service, amount in amounts
+        )
+        total_time: int = sum(
+            service.cleaning_time * amount for service, amount in amounts
+        )
+        return Quote(
+            total_sum=round(total_sum * cleaning_type.coefficient),
+            total_time=total_time,
+        )
+
+
+def get_cleaning_types_queryset() -> QuerySet:
+    """
+    Возвращает наборы услуг с услугами и их единицами измерения
+    для построения таблицы цен (см. PriceTable.from_instances).
+    """
+    return CleaningType.objects.prefetch_related(
+        Prefetch(
+            'service', queryset=Service.objects.select_related('measure'),
+        )
+    )
+
+
+_price_table: PriceTable = None
+
+
+def _initial_revision() -> int:
+    # INFO: после очистки кэша ревизия начинается с текущего времени
+    #       в миллисекундах и остается больше всех выданных ранее ревизий.
+    return time_ns() // 1_000_000
+
+
+def get_catalog_revision() -> int:
+    """Возвращает текущую ревизию каталога услуг."""
+    revision: int = cache.get(CATALOG_REVISION_CACHED_KEY)
+    if revision is None:
+        cache.add(
+            CATALOG_REVISION_CACHED_KEY, _initial_revision(), timeout=None
+        )
+        revision = cache.get(CATALOG_REVISION_CACHED_KEY, 0)
+    return revision
+
+
+def get_price_table() -> PriceTable:
+    """
+    Возвращает таблицу цен процесса, перестраивая ее при смене ревизии
+    каталога.
+
+    Ревизия читается до построения таблицы: если каталог изменится
+    во время построения, таблица будет перестроена при следующем обращении.
+    """
+    global _price_table
+    revision: int = get_catalog_revision()
+    if _price_table is None or _price_table.revision != revision:
+        _price_table = PriceTable.load(revision=revision)
+    return _price_table
+
+
+def invalidate_price_table() -> None:
+    """
+    Увеличивает ревизию каталога услуг после фиксации текущей транзакции,
+    чтобы процессы не построили таблицу цен и снимок каталога
+    (см. api.catalog) по незафиксированным данным.
+    """
+
+    def invalidate() -> None:
+        cache.add(
+            CATALOG_REVISION_CACHED_KEY, _initial_revision(), timeout=None
+        )
+        try:
+            cache.incr(CATALOG_REVISION_CACHED_KEY)
+        except ValueError:
+            cache.set(
+                CATALOG_REVISION_CACHED_KEY, _initial_revision(), timeout=None
+            )
+        return
+
+    transaction.on_commit(invalidate)
+    return
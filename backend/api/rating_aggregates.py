@@ -0,0 +1,153 @@
+"""
+Агрегаты оценок отзывов: количество отзывов с каждой оценкой по источнику
+отзывов (сайт или Я.Карты) и по уборщику заказа (см. RatingAggregate).
+
+Счетчики изменяются на разницу при каждой записи отзыва в той же
+транзакции, поэтому средняя оценка и распределение оценок читаются
+из нескольких записей без обхода отзывов. Уборщик отзыва определяется
+по заказу в момент записи отзыва; если уборщик заказа изменился позже,
+счетчики уборщиков пересчитываются командой rebuild_rating_aggregates.
+"""
+
+from collections import Counter
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from cleanpro.app_data import (
+    RATING_SCORES, RATING_SOURCE_CHOICES, RATING_SOURCE_MAPS,
+    RATING_SOURCE_SITE,
+)
+from services.models import Order, Rating, RatingAggregate
+
+# INFO: вклад отзыва в агрегаты: источник, id уборщика, оценка.
+Contribution = tuple[str, Optional[int], int]
+
+
+def get_rating_source(from_maps: bool) -> str:
+    """Возвращает источник отзыва."""
+    return RATING_SOURCE_MAPS if from_maps else RATING_SOURCE_SITE
+
+
+def get_contributions(
+        states: Iterable[tuple[bool, Optional[int], int]]
+        ) -> list[Contribution]:
+    """
+    Возвращает вклады отзывов в агрегаты по состояниям отзывов
+    (с Я.Карт ли отзыв, id заказа, оценка). Уборщики заказов
+    загружаются одним запросом.
+    """
+    states: list[tuple] = [state for state in states if state[2] is not None]
+    order_ids: set[int] = {state[1] for state in states} - {None}
+    cleaners: dict[int, Optional[int]] = dict(
+        Order.objects.filter(id__in=order_ids).values_list('id', 'cleaner_id')
+    ) if order_ids else {}
+    return [
+        (get_rating_source(from_maps), cleaners.get(order_id), score)
+        for from_maps, order_id, score in states
+    ]
+
+
+def update_rating_aggregates(
+        contributions: Iterable[Contribution], sign: int = 1) -> None:
+    """
+    Прибавляет (sign=1) или вычитает (sign=-1) вклады отзывов из агрегатов
+    источников и уборщиков. Каждая запись агрегата изменяется одним
+    запросом UPDATE. Оценки вне RATING_SCORES не учитываются.
+    """
+    changes: dict[tuple[str, Optional[int]], Counter] = {}
+    for source, cleaner_id, score in contributions:
+        if score not in RATING_SCORES:
+            continue
+        changes.setdefault((source, None), Counter())[score] += sign
+        if cleaner_id is not None:
+            changes.setdefault((source, cleaner_id), Counter())[score] += sign
+    if not changes:
+        return
+    with transaction.atomic():
+        for (source, cleaner_id), scores in changes.items():
+            aggregate, _ = RatingAggregate.objects.get_or_create(
+                source=source, cleaner_id=cleaner_id,
+            )
+            RatingAggregate.objects.filter(pk=aggregate.pk).update(**{
+                f'score_{score}': F(f'score_{score}') + amount
+                for score, amount in scores.items()
+            })
+    return
+
+
+def apply_rating_change(rating: Rating, deleted: bool = False) -> None:
+    """
+    Изменяет агрегаты на разницу между загруженным из базы данных
+    и текущим состоянием отзыва, либо вычитает удаленный отзыв.
+    """
+    loaded: Optional[tuple] = getattr(rating, '_loaded_rating', None)
+    state: Optional[tuple] = None if deleted else rating.get_aggregate_state()
+    if loaded == state:
+        return
+    if loaded is not None:
+        update_rating_aggregates(get_contributions((loaded,)), sign=-1)
+    if state is not None:
+        update_rating_aggregates(get_contributions((state,)))
+    rating._loaded_rating = state
+    return
+
+
+def rebuild_rating_aggregates() -> int:
+    """
+    Пересчитывает агрегаты оценок по всем отзывам.
+    Возвращает количество записей агрегатов.
+    """
+    histograms: dict[tuple[str, Optional[int]], dict[int, int]] = {}
+    rows = Rating.objects.values(
+        'from_maps', 'order__cleaner', 'score'
+    ).annotate(amount=Count('id')).order_by()
+    for row in rows:
+        source: str = get_rating_source(row['from_maps'])
+        keys: list[tuple] = [(source, None)]
+        if row['order__cleaner'] is not None:
+            keys.append((source, row['order__cleaner']))
+        for key in keys:
+            histogram: dict[int, int] = histograms.setdefault(key, {})
+            histogram[row['score']] = (
+                histogram.get(row['score'], 0) + row['amount']
+            )
+    for source, _ in RATING_SOURCE_CHOICES:
+        histograms.setdefault((source, None), {})
+    with transaction.atomic():
+        RatingAggregate.objects.all().delete()
+        RatingAggregate.objects.bulk_create(
+            RatingAggregate(
+                source=source,
+                cleaner_id=cleaner_id,
+                **{
+                    f'score_{score}': amount
+                    for score, amount in histogram.items()
+                    if score in RATING_SCORES
+                },
+            )
+            for (source, cleaner_id), histogram in histograms.items()
+        )
+    return len(histograms)
+
+
+def get_rating_summary() -> dict[str, RatingAggregate]:
+    """
+    Возвращает агрегаты оценок всех отзывов ('total') и каждого
+    источника отзывов.
+    """
+    summary: dict[str, RatingAggregate] = {
+        source: RatingAggregate(source=source)
+        for source, _ in RATING_SOURCE_CHOICES
+    }
+    for aggregate in RatingAggregate.objects.filter(cleaner__isnull=True):
+        summary[aggregate.source] = aggregate
+    summary['total'] = RatingAggregate(**{
+        f'score_{score}': sum(
+            getattr(summary[source], f'score_{score}')
+            for source, _ in RATING_SOURCE_CHOICES
+        )
+        for score in RATING_SCORES
+    })
+    return summary
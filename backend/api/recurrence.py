@@ -0,0 +1,250 @@
+"""
+Создание заказов регулярных уборок.
+
+Заказы создаются по образцу шаблонного заказа на RECURRENCE_MATERIALIZE_DAYS
+дней вперед. Поле next_date регулярной уборки хранит дату следующего
+еще не созданного заказа, поэтому каждый запуск обрабатывает только
+регулярные уборки, для которых наступил срок создания заказов,
+и продолжает их с места, на котором остановился предыдущий запуск.
+
+Объем работы не зависит от количества регулярных уборок:
+    - регулярные уборки с шаблонными заказами и их услугами, занятость
+      уборщиков на все дни и уже созданные заказы загружаются
+      фиксированным количеством запросов
+    - уборщики назначаются в одном расписании в памяти: созданные
+      заказы учитываются при назначении следующих заказов
+    - заказы, интервалы занятости уборщиков и услуги заказов сохраняются
+      через bulk_create в одной транзакции
+
+Стоимость и продолжительность каждого заказа рассчитываются заново
+по текущему каталогу услуг (см. api.pricing), поэтому изменения цен
+применяются к будущим заказам регулярной уборки.
+
+Даты, на которые нет свободного уборщика, на адрес и время уже создан
+заказ или услуги шаблонного заказа удалены из каталога, пропускаются
+и сохраняются в skipped_dates. Пропущенные даты раньше текущего дня
+удаляются. Регулярная уборка с отмененным шаблонным заказом
+отключается.
+"""
+
+from datetime import date, time, timedelta
+from typing import Optional
+
+from django.db import transaction
+
+from api.availability import DayAvailability, time_to_minutes
+from api.batch import bulk_create_orders
+from api.pricing import PriceTable, Quote, get_price_table
+from cleanpro.app_data import (
+    ORDER_CANCELLED_STATUS, RECURRENCE_MATERIALIZE_DAYS,
+)
+from services.models import Order, OrderRecurrence
+
+RECURRENCE_ASSIGNMENT: str = 'recurrence'
+
+
+def get_occurrences(
+        recurrence: OrderRecurrence,
+        date_from: date,
+        date_to: date) -> list[date]:
+    """
+    Возвращает даты заказов регулярной уборки от next_date до date_to
+    и сдвигает next_date на дату следующего заказа после date_to.
+    Даты раньше date_from пропускаются. После даты окончания
+    регулярная уборка отключается.
+    """
+    period: timedelta = timedelta(weeks=recurrence.interval_weeks)
+    occurrences: list[date] = []
+    cleaning_date: date = recurrence.next_date
+    while cleaning_date <= date_to:
+        if (recurrence.end_date is not None
+                and cleaning_date > recurrence.end_date):
+            break
+        if cleaning_date >= date_from:
+            occurrences.append(cleaning_date)
+        cleaning_date += period
+    recurrence.next_date = cleaning_date
+    if (recurrence.end_date is not None
+            and recurrence.next_date > recurrence.end_date):
+        recurrence.is_active = False
+    return occurrences
+
+
+def get_quote(
+        recurrence: OrderRecurrence,
+        price_table: PriceTable) -> Optional[Quote]:
+    """
+    Рассчитывает стоимость и продолжительность заказа регулярной уборки
+    по текущему каталогу услуг. Возвращает None, если набор услуг или
+    услуга шаблонного заказа отсутствуют в каталоге.
+    """
+    template: Order = recurrence.template
+    try:
+        return price_table.quote(
+            cleaning_type_id=template.cleaning_type_id,
+            services={
+                service.service_id: service.amount
+                for service in template.services_in_order.all()
+            },
+            rooms_number=template.rooms_number,
+            bathrooms_number=template.bathrooms_number,
+        )
+    except KeyError:
+        return None
+
+
+def choose_cleaner(
+        day: DayAvailability,
+        template: Order,
+        duration: int) -> Optional[tuple[int, str]]:
+    """
+    Возвращает id свободного уборщика для заказа продолжительностью
+    duration минут по шаблону template и причину его выбора либо None,
+    если свободных уборщиков нет. Предпочтение отдается уборщику
+    шаблонного заказа, иначе выбирается наименее загруженный за день
+    уборщик.
+    """
+    free_cleaners: list[int] = day.get_free_cleaners(
+        start=time_to_minutes(template.cleaning_time),
+        duration=duration,
+    )
+    if not free_cleaners:
+        return None
+    if template.cleaner_id in free_cleaners:
+        return template.cleaner_id, 'уборщик шаблонного заказа'
+    cleaner_id: int = min(
+        free_cleaners,
+        key=lambda cleaner_id: (
+            bin(day.masks[cleaner_id]).count('1'), cleaner_id
+        ),
+    )
+    return cleaner_id, 'наименее загруженный уборщик'
+
+
+@transaction.atomic
+def materialize_recurring_orders(today: date = None) -> tuple[int, int]:
+    """
+    Создает заказы регулярных уборок на RECURRENCE_MATERIALIZE_DAYS дней
+    вперед от today. Возвращает количество созданных и пропущенных заказов.
+
+    Если во время сохранения параллельный заказ занял уборщика, вызывается
+    IntegrityError и транзакция откатывается: next_date не сдвигается,
+    и заказы будут созданы при следующем запуске.
+
+    Регулярные уборки блокируются до конца транзакции, а уборки,
+    заблокированные параллельным запуском, пропускаются, поэтому
+    пересекающиеся запуски не создают заказы на одну дату дважды.
+    """
+    today = today or date.today()
+    date_to: date = today + timedelta(days=RECURRENCE_MATERIALIZE_DAYS)
+    recurrences: list[OrderRecurrence] = list(
+        OrderRecurrence.objects.select_for_update(
+            skip_locked=True, of=('self',),
+        ).filter(
+            is_active=True,
+            next_date__lte=date_to,
+        ).select_related(
+            'template',
+        ).prefetch_related(
+            'template__services_in_order',
+        )
+    )
+    for recurrence in recurrences:
+        recurrence.skipped_dates = [
+            skipped_date for skipped_date in recurrence.skipped_dates
+            if skipped_date >= today.isoformat()
+        ]
+        if recurrence.template.order_status == ORDER_CANCELLED_STATUS:
+            recurrence.is_active = False
+    price_table: PriceTable = get_price_table()
+    quotes: dict[int, Optional[Quote]] = {
+        recurrence.id: get_quote(
+            recurrence=recurrence, price_table=price_table
+        )
+        for recurrence in recurrences
+        if recurrence.is_active
+    }
+    occurrences: list[tuple[date, time, int, OrderRecurrence]] = [
+        (
+            cleaning_date, recurrence.template.cleaning_time,
+            recurrence.id, recurrence,
+        )
+        for recurrence in recurrences
+        if recurrence.is_active
+        for cleaning_date in get_occurrences(
+            recurrence=recurrence, date_from=today, date_to=date_to
+        )
+    ]
+    orders: list[Order] = []
+    services: list[dict[int, int]] = []
+    skipped: int = 0
+    if occurrences:
+        occurrences.sort(key=lambda item: item[:3])
+        days: dict[date, DayAvailability] = {
+            day.cleaning_date: day for day in DayAvailability.load_range(
+                date_from=occurrences[0][0], date_to=occurrences[-1][0],
+            )
+        }
+        booked: set[tuple[int, date, time]] = set(
+            Order.objects.filter(
+                address_id__in={
+                    recurrence.template.address_id
+                    for recurrence in recurrences
+                },
+                cleaning_date__in={item[0] for item in occurrences},
+            ).values_list('address_id', 'cleaning_date', 'cleaning_time')
+        )
+        for cleaning_date, cleaning_time, _, recurrence in occurrences:
+            template: Order = recurrence.template
+            quote: Optional[Quote] = quotes[recurrence.id]
+            booking: tuple[int, date, time] = (
+                template.address_id, cleaning_date, cleaning_time
+            )
+            chosen: Optional[tuple[int, str]] = None
+            if quote is not None and booking not in booked:
+                chosen = choose_cleaner(
+                    day=days[cleaning_date],
+                    template=template,
+                    duration=quote.total_time,
+                )
+            if chosen is None:
+                recurrence.skipped_dates.append(cleaning_date.isoformat())
+                skipped += 1
+                continue
+            cleaner_id, reason = chosen
+            days[cleaning_date].book(
+                cleaner_id=cleaner_id,
+                start=time_to_minutes(cleaning_time),
+                duration=quote.total_time,
+            )
+            booked.add(booking)
+            orders.append(
+                Order(
+                    user_id=template.user_id,
+                    cleaner_id=cleaner_id,
+                    cleaner_assignment_reason=(
+                        f'{RECURRENCE_ASSIGNMENT}: {reason}'
+                    ),
+                    total_sum=quote.total_sum,
+                    total_time=quote.total_time,
+                    comment=template.comment,
+                    cleaning_type_id=template.cleaning_type_id,
+                    rooms_number=template.rooms_number,
+                    bathrooms_number=template.bathrooms_number,
+                    address_id=template.address_id,
+                    cleaning_date=cleaning_date,
+                    cleaning_time=cleaning_time,
+                    recurrence=recurrence,
+                )
+            )
+            services.append(
+                {
+                    service.service_id: service.amount
+                    for service in template.services_in_order.all()
+                }
+            )
+        bulk_create_orders(orders=orders, services=services)
+    OrderRecurrence.objects.bulk_update(
+        recurrences, fields=('next_date', 'is_active', 'skipped_dates')
+    )
+    return len(orders), skipped
@@ -0,0 +1,404 @@
+"""
+Загрузка отзывов со сторонних площадок.
+
+Каждая площадка описывается источником отзывов (ReviewSource), который
+создает потоковый разборщик HTML страницы отзывов. Страницы всех
+источников и филиалов из REVIEW_SOURCE_PAGES загружаются параллельно
+в потоках через одну HTTP-сессию с общим пулом соединений и таймаутами,
+а разбор страницы выполняется по мере получения ответа, без построения
+дерева документа.
+
+Каждая страница запрашивается условным запросом с заголовками
+If-None-Match и If-Modified-Since, сохраненными после предыдущей
+загрузки, поэтому неизмененные страницы не скачиваются и не разбираются.
+
+Отзывы различаются по хэшу источника, имени автора и текста отзыва,
+который хранится в уникальном поле Rating.content_hash. Уже сохраненные
+отзывы определяются одним запросом по хэшам, а новые сохраняются одним
+bulk_create: повторная загрузка тех же страниц не создает дубликатов.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from hashlib import sha256
+from html.parser import HTMLParser
+from typing import Iterable, NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+
+from api.rating_aggregates import get_contributions, update_rating_aggregates
+from api.reviews import update_cached_reviews
+from cleanpro.app_data import (
+    REVIEW_IMPORT_LOCK_CACHED_KEY, REVIEW_IMPORT_LOCK_TIMEOUT,
+    REVIEW_SOURCE_CHUNK_SIZE, REVIEW_SOURCE_CONNECT_TIMEOUT,
+    REVIEW_SOURCE_MAX_WORKERS, REVIEW_SOURCE_PAGES,
+    REVIEW_SOURCE_READ_TIMEOUT, REVIEW_SOURCE_VALIDATORS_CACHED_KEY,
+)
+from services.models import Rating
+
+# INFO: заголовок ответа -> заголовок условного запроса.
+CONDITIONAL_HEADERS: dict[str, str] = {
+    'ETag': 'If-None-Match',
+    'Last-Modified': 'If-Modified-Since',
+}
+
+
+def get_review_hash(source: str, username: str, text: str) -> str:
+    """Возвращает хэш отзыва источника source."""
+    return sha256(f'{source}\n{username}\n{text}'.encode()).hexdigest()
+
+
+class ParsedReview(NamedTuple):
+    """
+    Отзыв со страницы отзывов.
+
+    Атрибуты:
+        - username (str) - имя автора отзыва
+        - text (str) - текст отзыва
+        - score (int) - оценка
+    """
+
+    username: str
+    text: str
+    score: int
+
+
+class ReviewsParser(HTMLParser):
+    """
+    Базовый потоковый разборщик страницы отзывов: получает страницу
+    частями через feed и складывает найденные отзывы в reviews.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.reviews: list[ParsedReview] = []
+
+
+class YandexMapsReviewsParser(ReviewsParser):
+    """
+    Разборщик виджета отзывов Я.Карт:
+
+        <div class="comment">
+            <p class="comment__name">Имя</p>
+            <ul class="stars-list">
+                <li class="stars-list__star"></li>
+                <li class="stars-list__star _empty"></li>
+            </ul>
+            <p class="comment__text">Текст</p>
+        </div>
+
+    Оценка - количество полных звезд: звезды с классами _empty и _half
+    не учитываются.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        # INFO: глубина вложенности div внутри текущего отзыва.
+        self.comment_depth: int = 0
+        self.field: Optional[str] = None
+        self.data: dict[str, list[str]] = {}
+        self.score: int = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple]) -> None:
+        classes: list[str] = (dict(attrs).get('class') or '').split()
+        if tag == 'div' and self.comment_depth:
+            self.comment_depth += 1
+        elif tag == 'div' and 'comment' in classes:
+            self.comment_depth = 1
+            self.data = {'username': [], 'text': []}
+            self.score = 0
+        elif not self.comment_depth:
+            return
+        elif tag == 'p' and 'comment__name' in classes:
+            self.field = 'username'
+        elif tag == 'p' and 'comment__text' in classes:
+            self.field = 'text'
+        elif tag == 'li' and 'stars-list__star' in classes:
+            if not {'_empty', '_half'} & set(classes):
+                self.score += 1
+        return
+
+    def handle_endtag(self, tag: str) -> None:
+        if not self.comment_depth:
+            return
+        if tag == 'p':
+            self.field = None
+        elif tag == 'div':
+            self.comment_depth -= 1
+            if not self.comment_depth:
+                self.reviews.append(
+                    ParsedReview(
+                        username=''.join(self.data['username']).strip(),
+                        text=''.join(self.data['text']).strip(),
+                        score=self.score,
+                    )
+                )
+        return
+
+    def handle_data(self, data: str) -> None:
+        if self.field is not None:
+            self.data[self.field].append(data)
+        return
+
+
+class ReviewSource:
+    """
+    Базовый источник отзывов.
+
+    Наследники переопределяют:
+        - name (str) - название источника для настроек и хэша отзывов
+        - parser_class (type) - потоковый разборщик страницы отзывов
+    """
+
+    name: str = None
+    parser_class: type[ReviewsParser] = None
+
+    def parse(self, chunks: Iterable[str]) -> list[ParsedReview]:
+        """Разбирает страницу отзывов по мере получения ее частей."""
+        parser: ReviewsParser = self.parser_class()
+        for chunk in chunks:
+            parser.feed(chunk)
+        parser.close()
+        return parser.reviews
+
+    def get_review_hash(self, review: ParsedReview) -> str:
+        """Возвращает хэш отзыва."""
+        return get_review_hash(self.name, review.username, review.text)
+
+    def create_rating(self, review: ParsedReview) -> Rating:
+        """Возвращает несохраненный отзыв."""
+        return Rating(
+            username=review.username,
+            from_maps=True,
+            # INFO: на картах просто указывается что-то вроде
+            #       "1 января" без указания года. Чтобы не
+            #       усложнять логику - загрузка запускается
+            #       раз в сутки в 00:00 (UTC+3) и записывает
+            #       "вчерашние" отзывы.
+            pub_date=datetime.now() - timedelta(days=1),
+            text=review.text,
+            score=review.score,
+            content_hash=self.get_review_hash(review),
+        )
+
+
+class YandexMapsSource(ReviewSource):
+    """Отзывы из виджета отзывов организации на Я.Картах."""
+
+    name: str = 'yandex_maps'
+    parser_class: type[ReviewsParser] = YandexMapsReviewsParser
+
+
+REVIEW_SOURCES: dict[str, type[ReviewSource]] = {
+    source.name: source for source in (
+        YandexMapsSource,
+    )
+}
+
+
+class ReviewsPage(NamedTuple):
+    """
+    Загруженная страница отзывов.
+
+    Атрибуты:
+        - source (ReviewSource) - источник отзывов
+        - url (str) - URL страницы
+        - reviews (list[ParsedReview]) - отзывы страницы
+        - validators (dict[str, str]) - заголовки ETag и Last-Modified
+    """
+
+    source: ReviewSource
+    url: str
+    reviews: list[ParsedReview]
+    validators: dict[str, str]
+
+
+def _validators_key(url: str) -> str:
+    url_hash: str = sha256(url.encode()).hexdigest()
+    return f'{REVIEW_SOURCE_VALIDATORS_CACHED_KEY}:{url_hash}'
+
+
+def fetch_reviews_page(
+        session: requests.Session,
+        source: ReviewSource,
+        url: str) -> Optional[ReviewsPage]:
+    """
+    Загружает и разбирает страницу отзывов условным запросом
+    с заголовками, сохраненными после прошлой загрузки.
+    Возвращает None, если страница не изменилась.
+    """
+    validators: dict[str, str] = cache.get(_validators_key(url), {})
+    with session.get(
+        url,
+        headers={
+            CONDITIONAL_HEADERS[header]: value
+            for header, value in validators.items()
+        },
+        timeout=(REVIEW_SOURCE_CONNECT_TIMEOUT, REVIEW_SOURCE_READ_TIMEOUT),
+        stream=True,
+    ) as response:
+        if response.status_code == status.HTTP_304_NOT_MODIFIED:
+            return None
+        if not response.status_code == status.HTTP_200_OK:
+            raise Exception(f'Указан неверный URL отзыва: "{url}"')
+        response.encoding = response.encoding or 'utf-8'
+        reviews: list[ParsedReview] = source.parse(
+            response.iter_content(
+                chunk_size=REVIEW_SOURCE_CHUNK_SIZE, decode_unicode=True,
+            )
+        )
+        return ReviewsPage(
+            source=source,
+            url=url,
+            reviews=reviews,
+            validators={
+                header: response.headers[header]
+                for header in CONDITIONAL_HEADERS
+                if header in response.headers
+            },
+        )
+
+
+def fetch_reviews_pages(
+        pages: Iterable[tuple[str, str]]
+        ) -> tuple[list[ReviewsPage], list[Exception]]:
+    """
+    Загружает страницы отзывов (источник, URL) параллельно.
+    Возвращает измененные страницы и ошибки загрузки остальных страниц:
+    ошибка загрузки одной страницы не прерывает загрузку остальных.
+    """
+    pages: list[tuple[str, str]] = list(pages)
+    workers: int = max(1, min(REVIEW_SOURCE_MAX_WORKERS, len(pages)))
+    with requests.Session() as session:
+        adapter: HTTPAdapter = HTTPAdapter(
+            pool_connections=workers, pool_maxsize=workers,
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    fetch_reviews_page, session, REVIEW_SOURCES[name](), url
+                )
+                for name, url in pages
+            ]
+    fetched: list[ReviewsPage] = []
+    errors: list[Exception] = []
+    for future in futures:
+        try:
+            page: Optional[ReviewsPage] = future.result()
+        except Exception as err:
+            errors.append(err)
+            continue
+        if page is not None:
+            fetched.append(page)
+    return fetched, errors
+
+
+def fill_missing_hashes() -> None:
+    """
+    Рассчитывает хэши отзывов с Я.Карт, сохраненных без хэша. Если у
+    нескольких отзывов одинаковый хэш, он сохраняется только у первого.
+    """
+    ratings: list[Rating] = list(
+        Rating.objects.filter(from_maps=True, content_hash__isnull=True)
+    )
+    if not ratings:
+        return
+    hashes: set[str] = set(
+        Rating.objects.filter(content_hash__isnull=False).values_list(
+            'content_hash', flat=True,
+        )
+    )
+    updated: list[Rating] = []
+    for rating in ratings:
+        content_hash: str = get_review_hash(
+            YandexMapsSource.name, rating.username, rating.text
+        )
+        if content_hash in hashes:
+            continue
+        hashes.add(content_hash)
+        rating.content_hash = content_hash
+        updated.append(rating)
+    Rating.objects.bulk_update(updated, fields=('content_hash',))
+    return
+
+
+@transaction.atomic
+def save_new_reviews(ratings: list[Rating]) -> list[Rating]:
+    """
+    Сохраняет отзывы, хэшей которых еще нет в базе данных, и добавляет
+    их в агрегаты оценок и кэш отзывов. Возвращает сохраненные отзывы.
+    """
+    fill_missing_hashes()
+    ratings: dict[str, Rating] = {
+        rating.content_hash: rating for rating in ratings
+    }
+    existing: set[str] = set(
+        Rating.objects.filter(content_hash__in=ratings).values_list(
+            'content_hash', flat=True,
+        )
+    )
+    new_hashes: list[str] = [
+        content_hash for content_hash in ratings
+        if content_hash not in existing
+    ]
+    if not new_hashes:
+        return []
+    # INFO: bulk_create не вызывает сигнал post_save, а при ignore_conflicts
+    #       не возвращает id, поэтому сохраненные отзывы загружаются заново.
+    Rating.objects.bulk_create(
+        [ratings[content_hash] for content_hash in new_hashes],
+        ignore_conflicts=True,
+    )
+    created: list[Rating] = list(
+        Rating.objects.filter(content_hash__in=new_hashes)
+    )
+    update_rating_aggregates(
+        get_contributions(rating.get_aggregate_state() for rating in created)
+    )
+    update_cached_reviews(ratings=created)
+    return created
+
+
+def import_reviews(
+        pages: Optional[Iterable[tuple[str, str]]] = None) -> Optional[int]:
+    """
+    Загружает новые отзывы со страниц отзывов (источник, URL), по умолчанию
+    - со страниц REVIEW_SOURCE_PAGES. Возвращает количество новых отзывов
+    либо None, если загрузка уже выполняется. Если часть страниц загрузить
+    не удалось, отзывы остальных страниц сохраняются, а затем возбуждается
+    ошибка загрузки первой из них.
+    """
+    if not cache.add(
+            REVIEW_IMPORT_LOCK_CACHED_KEY, 1,
+            timeout=REVIEW_IMPORT_LOCK_TIMEOUT):
+        return None
+    try:
+        fetched, errors = fetch_reviews_pages(
+            REVIEW_SOURCE_PAGES if pages is None else pages
+        )
+        created: list[Rating] = save_new_reviews(
+            [
+                page.source.create_rating(review)
+                for page in fetched for review in page.reviews
+            ]
+        )
+        # INFO: заголовки сохраняются только после сохранения отзывов,
+        #       чтобы при ошибке страницы были загружены повторно.
+        cache.set_many(
+            {
+                _validators_key(page.url): page.validators
+                for page in fetched
+            },
+            timeout=None,
+        )
+    finally:
+        cache.delete(REVIEW_IMPORT_LOCK_CACHED_KEY)
+    if errors:
+        raise errors[0]
+    return len(created)
@@ -0,0 +1,233 @@
+"""
+Кэш отзывов для списка отзывов на главной странице.
+
+Отзывы хранятся в кэше сегментами: сегмент с номером n содержит
+сериализованные отзывы с id от n * REVIEW_CACHE_SEGMENT_SIZE до
+(n + 1) * REVIEW_CACHE_SEGMENT_SIZE - 1 в порядке убывания id, а индекс
+содержит номера непустых сегментов. Создание, изменение или удаление
+отзыва перезаписывает только его сегмент, а страница отзывов читается
+из одного-двух сегментов без обращения к базе данных.
+
+Изменения кэша выполняются после фиксации транзакции под общей
+блокировкой. Сегмент, вытесненный из кэша, загружается из базы данных
+отдельно, а при отсутствии индекса кэш строится заново.
+"""
+
+from contextlib import contextmanager
+from time import monotonic, sleep
+from typing import Iterable, Iterator, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+
+from api.serializers import RatingSerializer
+from cleanpro.app_data import (
+    REVIEW_CACHED_KEY, REVIEW_CACHE_LOCK_POLL_INTERVAL,
+    REVIEW_CACHE_LOCK_TIMEOUT, REVIEW_CACHE_SEGMENT_SIZE, REVIEW_CACHE_TIMEOUT,
+)
+from services.models import Rating
+
+# INFO: поля, которые RatingSerializer возвращает в списке отзывов.
+REVIEW_FIELDS: tuple[str, ...] = (
+    'id', 'username', 'pub_date', 'text', 'score',
+)
+
+
+def _index_key() -> str:
+    return f'{REVIEW_CACHED_KEY}:index'
+
+
+def _segment_key(segment: int) -> str:
+    return f'{REVIEW_CACHED_KEY}:segment:{segment}'
+
+
+def _lock_key() -> str:
+    return f'{REVIEW_CACHED_KEY}:lock'
+
+
+def get_segment_number(rating_id: int) -> int:
+    """Возвращает номер сегмента отзыва."""
+    return rating_id // REVIEW_CACHE_SEGMENT_SIZE
+
+
+def serialize_reviews(ratings: Iterable[Rating]) -> list[dict]:
+    """Сериализует отзывы для списка отзывов."""
+    return list(
+        RatingSerializer(ratings, many=True, fields=REVIEW_FIELDS).data
+    )
+
+
+def load_segment(segment: int) -> list[dict]:
+    """Загружает отзывы сегмента из базы данных."""
+    queryset = RatingSerializer.optimize_queryset(
+        queryset=Rating.objects.filter(
+            id__gte=segment * REVIEW_CACHE_SEGMENT_SIZE,
+            id__lt=(segment + 1) * REVIEW_CACHE_SEGMENT_SIZE,
+        ),
+        fields=REVIEW_FIELDS,
+    )
+    return serialize_reviews(queryset.order_by('-id'))
+
+
+@contextmanager
+def lock_reviews_cache() -> Iterator[bool]:
+    """
+    Блокирует кэш отзывов для изменения. Ожидает освобождения блокировки
+    не дольше REVIEW_CACHE_LOCK_TIMEOUT секунд.
+    Возвращает True, если блокировку удалось получить.
+    """
+    deadline: float = monotonic() + REVIEW_CACHE_LOCK_TIMEOUT
+    locked: bool = cache.add(_lock_key(), 1, timeout=REVIEW_CACHE_LOCK_TIMEOUT)
+    while not locked and monotonic() < deadline:
+        sleep(REVIEW_CACHE_LOCK_POLL_INTERVAL)
+        locked = cache.add(
+            _lock_key(), 1, timeout=REVIEW_CACHE_LOCK_TIMEOUT
+        )
+    try:
+        yield locked
+    finally:
+        if locked:
+            cache.delete(_lock_key())
+
+
+def build_reviews_cache() -> bool:
+    """
+    Строит кэш отзывов заново.
+    Возвращает False, если кэш заблокирован.
+    """
+    with lock_reviews_cache() as locked:
+        if not locked:
+            return False
+        segments: dict[int, list[dict]] = {}
+        queryset = RatingSerializer.optimize_queryset(
+            queryset=Rating.objects.order_by('-id'), fields=REVIEW_FIELDS,
+        )
+        for review in serialize_reviews(queryset.iterator()):
+            segments.setdefault(
+                get_segment_number(review['id']), []
+            ).append(review)
+        cache.set_many(
+            {
+                _segment_key(segment): reviews
+                for segment, reviews in segments.items()
+            },
+            timeout=REVIEW_CACHE_TIMEOUT,
+        )
+        cache.set(_index_key(), list(segments), timeout=REVIEW_CACHE_TIMEOUT)
+    return True
+
+
+def apply_reviews_delta(
+        reviews: list[dict], deleted_ids: Iterable[int]) -> None:
+    """
+    Заменяет в сегментах кэша отзывы reviews, добавляя новые, и удаляет
+    отзывы с id из deleted_ids. Если кэш не построен, ничего не делает,
+    а если кэш заблокирован дольше REVIEW_CACHE_LOCK_TIMEOUT секунд,
+    сбрасывает индекс, чтобы кэш был построен заново.
+    """
+    changed: dict[int, dict[int, Optional[dict]]] = {}
+    for review in reviews:
+        changed.setdefault(
+            get_segment_number(review['id']), {}
+        )[review['id']] = review
+    for rating_id in deleted_ids:
+        changed.setdefault(get_segment_number(rating_id), {})[rating_id] = None
+    with lock_reviews_cache() as locked:
+        if not locked:
+            cache.delete(_index_key())
+            return
+        index: Optional[list[int]] = cache.get(_index_key())
+        if index is None:
+            return
+        index: set[int] = set(index)
+        for segment, segment_changes in changed.items():
+            cached: Optional[list[dict]] = cache.get(_segment_key(segment))
+            if cached is None:
+                # INFO: сегмент из базы данных уже содержит изменения.
+                segment_reviews: list[dict] = load_segment(segment)
+            else:
+                segment_reviews: list[dict] = sorted(
+                    [
+                        review for review in cached
+                        if review['id'] not in segment_changes
+                    ] + [
+                        review for review in segment_changes.values()
+                        if review is not None
+                    ],
+                    key=lambda review: review['id'],
+                    reverse=True,
+                )
+            cache.set(
+                _segment_key(segment),
+                segment_reviews,
+                timeout=REVIEW_CACHE_TIMEOUT,
+            )
+            if segment_reviews:
+                index.add(segment)
+            else:
+                index.discard(segment)
+        cache.set(
+            _index_key(),
+            sorted(index, reverse=True),
+            timeout=REVIEW_CACHE_TIMEOUT,
+        )
+    return
+
+
+def update_cached_reviews(ratings: Iterable[Rating]) -> None:
+    """
+    Добавляет или обновляет отзывы в кэше после фиксации транзакции.
+    """
+    reviews: list[dict] = serialize_reviews(ratings)
+    transaction.on_commit(
+        lambda: apply_reviews_delta(reviews=reviews, deleted_ids=())
+    )
+    return
+
+
+def delete_cached_reviews(rating_ids: Iterable[int]) -> None:
+    """Удаляет отзывы из кэша после фиксации транзакции."""
+    rating_ids: tuple[int, ...] = tuple(rating_ids)
+    transaction.on_commit(
+        lambda: apply_reviews_delta(reviews=[], deleted_ids=rating_ids)
+    )
+    return
+
+
+def get_cached_reviews_page(
+        position: Optional[list], limit: int) -> Optional[list[dict]]:
+    """
+    Возвращает до limit отзывов в порядке убывания id, начиная с отзыва,
+    следующего за позицией position ([id] последнего отзыва предыдущей
+    страницы), либо с первого отзыва, если позиция не указана.
+    Возвращает None, если кэш не построен и построить его не удалось.
+    """
+    index: Optional[list[int]] = cache.get(_index_key())
+    if index is None:
+        if not build_reviews_cache():
+            return None
+        index = cache.get(_index_key(), [])
+    before_id: Optional[int] = None if position is None else int(position[0])
+    page: list[dict] = []
+    for segment in index:
+        if before_id is not None and segment > get_segment_number(before_id):
+            continue
+        segment_reviews: Optional[list[dict]] = cache.get(
+            _segment_key(segment)
+        )
+        if segment_reviews is None:
+            segment_reviews = load_segment(segment)
+            # INFO: add не перезаписывает сегмент, сохраненный
+            #       параллельным изменением отзыва.
+            cache.add(
+                _segment_key(segment),
+                segment_reviews,
+                timeout=REVIEW_CACHE_TIMEOUT,
+            )
+        page += [
+            review for review in segment_reviews
+            if before_id is None or review['id'] < before_id
+        ]
+        if len(page) >= limit:
+            break
+    return page[:limit]
@@ -0,0 +1,363 @@
+"""
+Планирование маршрутов уборщиков с учетом адресов заказов.
+
+Координат у адресов нет, поэтому близость адресов определяется по городу
+и улице: время в пути между заказами берется из ROUTE_TRAVEL_BUFFER_*.
+Маршрут уборщика за день - последовательность заказов (остановок),
+между которыми должно оставаться время на дорогу.
+
+Решатель работает с заказами дня в памяти и детерминирован:
+при одинаковых входных данных результат всегда одинаков.
+    - rank_routes - онлайн-планирование: упорядочивает маршруты
+      уборщиков для нового заказа так, чтобы заказы одной улицы, затем
+      одного города, попадали в маршрут одного уборщика
+    - rank_booking_routes - то же для бронирования заказа: если маршрутов
+      нет, выбирает уборщиков, свободных по графику доступного времени
+    - schedule_day - офлайн-планирование: распределяет все заказы дня
+      по времени начала с помощью rank_routes
+"""
+
+from bisect import bisect_left
+from datetime import date, time
+from typing import Iterable, NamedTuple, Optional
+
+from cleanpro.app_data import (
+    ORDER_CANCELLED_STATUS, ROUTE_TRAVEL_BUFFER_MIN,
+    ROUTE_TRAVEL_BUFFER_OTHER_CITY, ROUTE_TRAVEL_BUFFER_SAME_CITY,
+    ROUTE_TRAVEL_BUFFER_SAME_STREET,
+)
+from services.models import Order
+
+# INFO: стоимость назначения заказа уборщику без заказов рядом по времени.
+#       Равна переезду в пределах города, поэтому заказ на той же улице
+#       выгоднее отдать уже работающему там уборщику.
+NEW_ROUTE_COST: int = ROUTE_TRAVEL_BUFFER_SAME_CITY
+# INFO: столько минут простоя уборщика перед заказом равноценны одной
+#       минуте в пути. Учет простоя плотнее заполняет маршруты и оставляет
+#       больше свободных уборщиков для следующих заказов.
+IDLE_MINUTES_PER_TRAVEL_MINUTE: int = 5
+
+Location = tuple[str, str]
+
+
+class RouteStop(NamedTuple):
+    """
+    Заказ как остановка маршрута уборщика.
+    Остановки упорядочиваются по времени начала.
+
+    Атрибуты:
+        - start (int) - минута начала уборки от начала суток
+        - end (int) - минута окончания уборки от начала суток
+        - order_id (int) - id заказа
+        - location (Location) - нормализованные город и улица
+    """
+
+    start: int
+    end: int
+    order_id: int
+    location: Location
+
+
+def get_location(city: str, street: str) -> Location:
+    """Возвращает нормализованные город и улицу для сравнения адресов."""
+    return (
+        (city or '').strip().lower(),
+        (street or '').strip().lower(),
+    )
+
+
+def get_travel_buffer(origin: Location, destination: Location) -> int:
+    """Возвращает время в пути между адресами в минутах."""
+    if origin[0] != destination[0]:
+        return ROUTE_TRAVEL_BUFFER_OTHER_CITY
+    if origin[1] != destination[1]:
+        return ROUTE_TRAVEL_BUFFER_SAME_CITY
+    return ROUTE_TRAVEL_BUFFER_SAME_STREET
+
+
+def get_route_stop(
+        order_id: int,
+        cleaning_time: time,
+        total_time: int,
+        city: str,
+        street: str) -> RouteStop:
+    """Возвращает остановку маршрута по данным заказа."""
+    start: int = cleaning_time.hour * 60 + cleaning_time.minute
+    return RouteStop(
+        order_id=order_id,
+        start=start,
+        end=start + total_time,
+        location=get_location(city=city, street=street),
+    )
+
+
+class CleanerRoute:
+    """
+    Маршрут уборщика за день: остановки, упорядоченные по времени начала.
+
+    Методы:
+        - get_insertion_cost - дополнительное время в пути при добавлении
+          остановки или None, если на дорогу не хватает времени
+        - fits - проверка остановки на пересечение с маршрутом
+          при заданном времени на дорогу
+        - insert - добавляет остановку в маршрут
+    """
+
+    def __init__(self, cleaner_id: int, stops: Iterable[RouteStop] = ()):
+        self.cleaner_id: int = cleaner_id
+        self.stops: list[RouteStop] = sorted(stops)
+        self.busy_minutes: int = sum(
+            stop.end - stop.start for stop in self.stops
+        )
+
+    def __repr__(self):
+        return f'CleanerRoute({self.cleaner_id}, {self.stops})'
+
+    def _get_neighbours(
+            self, stop: RouteStop
+            ) -> tuple[Optional[RouteStop], Optional[RouteStop], int]:  # noqa E125
+        """
+        Возвращает предыдущую и следующую остановки маршрута для stop
+        и позицию, на которую stop будет вставлена.
+        """
+        index: int = bisect_left(self.stops, stop)
+        previous: Optional[RouteStop] = (
+            self.stops[index - 1] if index else None
+        )
+        following: Optional[RouteStop] = (
+            self.stops[index] if index < len(self.stops) else None
+        )
+        return previous, following, index
+
+    def get_insertion_cost(self, stop: RouteStop) -> Optional[int]:
+        """
+        Возвращает дополнительное время в пути в минутах при добавлении
+        остановки в маршрут или None, если уборщик не успевает доехать
+        до нее или со следующей остановки.
+        """
+        previous, following, _ = self._get_neighbours(stop)
+        cost: int = 0
+        if previous is not None:
+            to_stop: int = get_travel_buffer(previous.location, stop.location)
+            if previous.end + to_stop > stop.start:
+                return None
+            cost += to_stop
+        if following is not None:
+            from_stop: int = get_travel_buffer(
+                stop.location, following.location
+            )
+            if stop.end + from_stop > following.start:
+                return None
+            cost += from_stop
+        if previous is None and following is None:
+            return NEW_ROUTE_COST
+        if previous is not None and following is not None:
+            cost -= get_travel_buffer(previous.location, following.location)
+        return cost
+
+    def fits(self, stop: RouteStop, buffer: int) -> bool:
+        """
+        Проверяет, что между остановкой и соседними остановками маршрута
+        остается не менее buffer минут на дорогу.
+        """
+        previous, following, _ = self._get_neighbours(stop)
+        return (
+            (previous is None or previous.end + buffer <= stop.start) and
+            (following is None or stop.end + buffer <= following.start)
+        )
+
+    def get_idle_minutes(self, stop: RouteStop) -> int:
+        """
+        Возвращает время простоя уборщика перед остановкой: от прибытия
+        с предыдущей остановки, а если ее нет - от начала суток.
+        """
+        previous, _, _ = self._get_neighbours(stop)
+        if previous is None:
+            return stop.start
+        return stop.start - previous.end - get_travel_buffer(
+            previous.location, stop.location
+        )
+
+    def insert(self, stop: RouteStop) -> None:
+        """Добавляет остановку в маршрут."""
+        _, _, index = self._get_neighbours(stop)
+        self.stops.insert(index, stop)
+        self.busy_minutes += stop.end - stop.start
+        return
+
+    @property
+    def travel_minutes(self) -> int:
+        """Суммарное время в пути между остановками маршрута."""
+        return sum(
+            get_travel_buffer(previous.location, following.location)
+            for previous, following in zip(self.stops, self.stops[1:])
+        )
+
+
+def rank_routes(
+        routes: Iterable[CleanerRoute],
+        stop: RouteStop) -> list[tuple[CleanerRoute, int]]:
+    """
+    Возвращает маршруты, в которые можно добавить остановку, с
+    дополнительным временем в пути, начиная с лучшего.
+
+    Лучший маршрут - с наименьшей суммой дополнительного времени в пути
+    и времени простоя перед остановкой (с весом
+    1 / IDLE_MINUTES_PER_TRAVEL_MINUTE), затем с наименьшей загрузкой
+    уборщика.
+    """
+    ranked: list[tuple[tuple[int, int, int], CleanerRoute, int]] = []
+    for route in routes:
+        cost: Optional[int] = route.get_insertion_cost(stop)
+        if cost is None:
+            continue
+        score: int = (
+            cost * IDLE_MINUTES_PER_TRAVEL_MINUTE +
+            route.get_idle_minutes(stop)
+        )
+        ranked.append(
+            ((score, route.busy_minutes, route.cleaner_id), route, cost)
+        )
+    ranked.sort(key=lambda item: item[0])
+    return [(route, cost) for _, route, cost in ranked]
+
+
+def rank_booking_routes(
+        routes: Iterable[CleanerRoute],
+        stop: RouteStop) -> list[tuple[CleanerRoute, Optional[int]]]:
+    """
+    Возвращает маршруты для бронирования заказа по rank_routes. Если
+    время в пути между адресами не позволяет добавить остановку ни в один
+    маршрут, возвращает маршруты, в которых между остановками остается
+    ROUTE_TRAVEL_BUFFER_MIN минут, начиная с наименее загруженного
+    уборщика, без дополнительного времени в пути (None).
+
+    График доступного времени и подбор свободных уборщиков рассчитываются
+    без адреса заказа с единым временем на дорогу ROUTE_TRAVEL_BUFFER_MIN,
+    поэтому заказ на время, показанное свободным, не отклоняется.
+    """
+    routes: list[CleanerRoute] = list(routes)
+    ranked: list[tuple[CleanerRoute, Optional[int]]] = rank_routes(
+        routes=routes, stop=stop
+    )
+    if ranked:
+        return ranked
+    return [
+        (route, None) for route in sorted(
+            (
+                route for route in routes
+                if route.fits(stop=stop, buffer=ROUTE_TRAVEL_BUFFER_MIN)
+            ),
+            key=lambda route: (route.busy_minutes, route.cleaner_id),
+        )
+    ]
+
+
+class DaySchedule(NamedTuple):
+    """
+    Результат планирования маршрутов за день.
+
+    Атрибуты:
+        - routes (dict[int, CleanerRoute]) - маршруты по id уборщиков
+        - unassigned (list[RouteStop]) - остановки, не попавшие в маршруты
+    """
+
+    routes: dict[int, CleanerRoute]
+    unassigned: list[RouteStop]
+
+    @property
+    def assignments(self) -> dict[int, int]:
+        """Назначения в формате {id заказа: id уборщика}."""
+        return {
+            stop.order_id: route.cleaner_id
+            for route in self.routes.values()
+            for stop in route.stops
+        }
+
+    @property
+    def travel_minutes(self) -> int:
+        """Суммарное время в пути всех уборщиков."""
+        return sum(route.travel_minutes for route in self.routes.values())
+
+
+def schedule_day(
+        stops: Iterable[RouteStop],
+        cleaners_ids: Iterable[int]) -> DaySchedule:
+    """
+    Распределяет остановки дня по маршрутам уборщиков.
+
+    Остановки обрабатываются по времени начала, каждая добавляется
+    в лучший маршрут по rank_routes. Остановки, до которых не успевает
+    доехать ни один уборщик, возвращаются в unassigned.
+    """
+    routes: dict[int, CleanerRoute] = {
+        cleaner_id: CleanerRoute(cleaner_id=cleaner_id)
+        for cleaner_id in sorted(cleaners_ids)
+    }
+    unassigned: list[RouteStop] = []
+    for stop in sorted(stops):
+        ranked: list[tuple[CleanerRoute, int]] = rank_routes(
+            routes=routes.values(), stop=stop
+        )
+        if not ranked:
+            unassigned.append(stop)
+            continue
+        ranked[0][0].insert(stop)
+    return DaySchedule(routes=routes, unassigned=unassigned)
+
+
+def load_day_stops(
+        cleaning_date: date,
+        cleaners_ids: Iterable[int] = None,
+        ) -> list[tuple[RouteStop, Optional[int]]]:  # noqa E125
+    """
+    Возвращает остановки неотмененных заказов дня вместе с id
+    назначенных уборщиков одним запросом.
+    Если передан cleaners_ids - только заказы указанных уборщиков.
+    """
+    orders = Order.objects.filter(
+        cleaning_date=cleaning_date,
+    ).exclude(
+        order_status=ORDER_CANCELLED_STATUS,
+    )
+    if cleaners_ids is not None:
+        orders = orders.filter(cleaner_id__in=cleaners_ids)
+    return [
+        (
+            get_route_stop(
+                order_id=order_id,
+                cleaning_time=cleaning_time,
+                total_time=total_time,
+                city=city,
+                street=street,
+            ),
+            cleaner_id,
+        )
+        for order_id, cleaner_id, cleaning_time, total_time, city, street in (
+            orders.values_list(
+                'id', 'cleaner_id', 'cleaning_time', 'total_time',
+                'address__city', 'address__street',
+            ).order_by('id')
+        )
+    ]
+
+
+def load_day_routes(
+        cleaning_date: date,
+        cleaners_ids: Iterable[int]) -> dict[int, CleanerRoute]:
+    """
+    Возвращает текущие маршруты указанных уборщиков за день
+    одним запросом.
+    """
+    cleaners_ids: list[int] = list(cleaners_ids)
+    stops: dict[int, list[RouteStop]] = {
+        cleaner_id: [] for cleaner_id in cleaners_ids
+    }
+    for stop, cleaner_id in load_day_stops(
+        cleaning_date=cleaning_date, cleaners_ids=cleaners_ids
+    ):
+        stops[cleaner_id].append(stop)
+    return {
+        cleaner_id: CleanerRoute(cleaner_id=cleaner_id, stops=cleaner_stops)
+        for cleaner_id, cleaner_stops in stops.items()
+    }
@@ -4,6 +4,8 @@ ORDER_POST_SERIALIZER_SCHEMA: dict[str, any] = {
     'exclude_fields': (
         'creation_date',
         'creation_time',
+        'total_sum',
+        'total_time',
     ),
     'examples': [
         OpenApiExample(
@@ -16,8 +18,6 @@ ORDER_POST_SERIALIZER_SCHEMA: dict[str, any] = {
                     "phone": "+7 777 777 77 77",
                 },
                 "comment": "Дома много шерсти, у меня собака.",
-                "total_sum": 1000000,
-                "total_time": 80,
                 "cleaning_type": 1,
                 "services": [
                     {
@@ -3,15 +3,21 @@ from drf_spectacular.utils import inline_serializer, extend_schema
 
 from api.serializers import (
     AdminOrderPatchSerializer,
+    CleanerRatingAggregateSerializer,
+    CleaningGetCalendarSerializer,
     CleaningGetTimeSerializer,
     CreateCleaningTypeSerializer,
     CreateServiceSerializer,
     GetCleaningTypeSerializer,
     GetServiceSerializer,
     MeasureSerializer,
+    OrderBatchSerializer,
     OrderGetSerializer,
+    OrderListSerializer,
     OrderPostSerializer,
+    OrderQuoteSerializer,
     OrderRatingSerializer,
+    RatingAggregateSerializer,
     RatingSerializer,
     UserRegisterSerializer,
     UserSerializer,
@@ -24,6 +30,29 @@ DEFAULT_404: str = 'Страница не найдена.'
 DEFAULT_REQUIRED: str = 'Обязательное поле.'
 
 
+CATALOG_SCHEMA = {
+    'list': extend_schema(
+        description=(
+            'Возвращает снимок каталога: единицы измерения, дополнительные '
+            'услуги и наборы услуг. Ответ содержит заголовок ETag, запрос '
+            'с актуальным заголовком If-None-Match получает ответ 304.'
+        ),
+        summary='Получить снимок каталога.',
+        responses={
+            status.HTTP_200_OK: inline_serializer(
+                name='catalog_list_200',
+                fields={
+                    'revision': serializers.IntegerField(),
+                    'measures': MeasureSerializer(many=True),
+                    'services': GetServiceSerializer(many=True),
+                    'cleaning_types': GetCleaningTypeSerializer(many=True),
+                },
+            ),
+            status.HTTP_304_NOT_MODIFIED: None,
+        },
+    ),
+}
+
 CLEANING_TYPES_SCHEMA = {
     'list': extend_schema(
         description='Возвращает список типов уборки.',
@@ -241,7 +270,7 @@ ORDER_SCHEMA = {
         description='Возвращает список заказов.',
         summary='Получить список заказов.',
         responses={
-            status.HTTP_200_OK: OrderGetSerializer,
+            status.HTTP_200_OK: OrderListSerializer,
             status.HTTP_401_UNAUTHORIZED: inline_serializer(
                 name='orders_list_error_401',
                 fields={
@@ -268,12 +297,6 @@ ORDER_SCHEMA = {
                     'user': serializers.ListField(
                         default=[DEFAULT_REQUIRED],
                     ),
-                    'total_sum': serializers.ListField(
-                        default=[DEFAULT_REQUIRED],
-                    ),
-                    'total_time': serializers.ListField(
-                        default=[DEFAULT_REQUIRED],
-                    ),
                     'cleaning_type': serializers.ListField(
                         default=[DEFAULT_REQUIRED],
                     ),
@@ -507,6 +530,118 @@ ORDER_SCHEMA = {
             ),
         },
     ),
+    'get_available_calendar': extend_schema(
+        description=(
+            'Получает доступное время для заказа на каждый день из '
+            'указанного диапазона дат. При указании stream=true ответ '
+            'отдается построчно в формате NDJSON: по одной строке на день.'
+        ),
+        summary='Получить доступное время для заказа на диапазон дат.',
+        request=CleaningGetCalendarSerializer,
+        responses={
+            status.HTTP_200_OK: inline_serializer(
+                name='orders_get_available_calendar_200',
+                fields={
+                    '2023-11-12': serializers.DictField(
+                        child=serializers.BooleanField(),
+                        default={'09:00': True, '09:30': False},
+                    ),
+                },
+            ),
+            status.HTTP_400_BAD_REQUEST: inline_serializer(
+                name='orders_get_available_calendar_error_400',
+                fields={
+                    'date_from': serializers.ListField(
+                        default=[DEFAULT_REQUIRED],
+                    ),
+                    'date_to': serializers.ListField(
+                        default=[DEFAULT_REQUIRED],
+                    ),
+                    'total_time': serializers.ListField(
+                        default=[DEFAULT_REQUIRED],
+                    ),
+                },
+            ),
+        },
+    ),
+    'batch': extend_schema(
+        description=(
+            'Создает пакет заказов от имени текущего пользователя. '
+            'Заказы проверяются и распределяются между уборщиками вместе, '
+            'формат каждого заказа совпадает с созданием заказа '
+            'без поля user. Заказы с ошибками не создаются и не прерывают '
+            'создание остальных заказов. Поддерживает заголовок '
+            'Idempotency-Key.'
+        ),
+        summary='Создать пакет заказов.',
+        request=OrderBatchSerializer,
+        responses={
+            status.HTTP_201_CREATED: inline_serializer(
+                name='orders_batch_201',
+                fields={
+                    'created': serializers.IntegerField(default=1),
+                    'results': serializers.ListField(
+                        default=[
+                            {
+                                'row': 0,
+                                'id': 1,
+                                'total_sum': 3500,
+                                'total_time': 150,
+                            },
+                            {
+                                'row': 1,
+                                'errors': {
+                                    'cleaning_date': [DEFAULT_REQUIRED],
+                                },
+                            },
+                        ],
+                    ),
+                },
+            ),
+            status.HTTP_400_BAD_REQUEST: inline_serializer(
+                name='orders_batch_error_400',
+                fields={
+                    'orders': serializers.ListField(
+                        default=[DEFAULT_REQUIRED],
+                    ),
+                },
+            ),
+        },
+    ),
+    'quote': extend_schema(
+        description=(
+            'Рассчитывает стоимость и продолжительность заказа по каталогу '
+            'услуг. При создании заказа используется тот же расчет.'
+        ),
+        summary='Рассчитать стоимость заказа.',
+        request=OrderQuoteSerializer,
+        responses={
+            status.HTTP_200_OK: inline_serializer(
+                name='orders_quote_200',
+                fields={
+                    'total_sum': serializers.IntegerField(default=3500),
+                    'total_time': serializers.IntegerField(default=150),
+                },
+            ),
+            status.HTTP_400_BAD_REQUEST: inline_serializer(
+                name='orders_quote_error_400',
+                fields={
+                    'cleaning_type': serializers.ListField(
+                        default=[DEFAULT_REQUIRED],
+                    ),
+                    'services': serializers.ListField(
+                        default=[DEFAULT_REQUIRED],
+                    ),
+                    'rooms_number': serializers.ListField(
+                        default=[DEFAULT_REQUIRED],
+                    ),
+                    'bathrooms_number': serializers.ListField(
+                        default=[DEFAULT_REQUIRED],
+                    ),
+                },
+            ),
+        },
+    ),
 }
 
 RATING_SCHEMA = {
@@ -558,6 +693,48 @@ RATING_SCHEMA = {
             ),
         },
     ),
+    'summary': extend_schema(
+        description=(
+            'Возвращает количество отзывов, среднюю оценку и количество '
+            'отзывов с каждой оценкой: всего и по источникам отзывов '
+            '(site - сайт, maps - Я.Карты).'
+        ),
+        summary='Получить сводку оценок отзывов.',
+        responses={
+            status.HTTP_200_OK: inline_serializer(
+                name='ratings_summary_200',
+                fields={
+                    'total': RatingAggregateSerializer(),
+                    'site': RatingAggregateSerializer(),
+                    'maps': RatingAggregateSerializer(),
+                },
+            ),
+        },
+    ),
+    'cleaners': extend_schema(
+        description=(
+            'Возвращает количество отзывов на сайте, среднюю оценку '
+            'и количество отзывов с каждой оценкой по каждому уборщику.'
+        ),
+        summary='Получить оценки уборщиков.',
+        responses={
+            status.HTTP_200_OK: CleanerRatingAggregateSerializer(many=True),
+            status.HTTP_401_UNAUTHORIZED: inline_serializer(
+                name='ratings_cleaners_error_401',
+                fields={
+                    'detail': serializers.CharField(
+                        default=DEFAULT_401)
+                },
+            ),
+            status.HTTP_403_FORBIDDEN: inline_serializer(
+                name='ratings_cleaners_error_403',
+                fields={
+                    'detail': serializers.CharField(
+                        default=DEFAULT_403)
+                },
+            ),
+        },
+    ),
 }
 
 SERVICE_SCHEMA = {
@@ -799,7 +976,7 @@ USER_SCHEMA = {
         ),
         summary='Получить список заказов пользователя.',
         responses={
-            status.HTTP_200_OK: OrderGetSerializer,
+            status.HTTP_200_OK: OrderListSerializer,
             status.HTTP_401_UNAUTHORIZED: inline_serializer(
                 name='users_orders_list_error_401',
                 fields={
@@ -1,9 +1,13 @@
+import base64
 from datetime import datetime, date, time
-import random
+import mimetypes
 import re
+from typing import Container
+from urllib.parse import urljoin
 
 from djoser.serializers import UserCreateSerializer as DjoserUserCreateSerializer  # noqa (E501)
-from django.db import transaction
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
 from django.db.models import QuerySet
 from django.shortcuts import get_object_or_404
 from drf_base64.fields import Base64ImageField
@@ -12,16 +16,26 @@ from phonenumber_field.phonenumber import PhoneNumber
 from rest_framework import serializers, status
 from rest_framework.validators import UniqueValidator
 
+from api.assignment import AssignmentDecision, get_assignment_strategy
+from api.pricing import (
+    PriceTable, Quote, get_cleaning_types_queryset, get_price_table,
+)
 from api.schemas_serializer import (
     ORDER_POST_SERIALIZER_SCHEMA, ORDER_RATING_SERIALIZER_SCHEMA,
     RATING_SERIALIZER_SCHEMA,
 )
+from api.sparse_fields import Relation, SparseFieldsSerializerMixin
 from api.utils import (
-    get_or_create_address, get_available_cleaners,
+    get_available_cleaners, get_or_create_address, is_busy_interval_conflict,
+)
+from cleanpro.app_data import (
+    ORDER_BATCH_MAX_SIZE, ORDER_CANCELLED_STATUS, ORDER_COMMENT_MAX_LEN,
+    SCHEDULE_CALENDAR_MAX_DAYS, SERVICE_IMAGE_BASE64_PARAM,
+    SERVICE_IMAGE_VERSION_LEN,
 )
-from cleanpro.app_data import ORDER_CANCELLED_STATUS
 from services.models import (
-    Address, CleaningType, Measure, Order, Rating, Service, ServicesInOrder
+    Address, CleaningType, Measure, Order, Rating, RatingAggregate, Service,
+    ServicesInOrder,
 )
 from users.models import User
 from users.validators import (
@@ -47,6 +61,39 @@ class AddressSerializer(serializers.ModelSerializer):
         )
 
 
+class CleaningGetCalendarSerializer(serializers.Serializer):
+    """
+    Сериализатор для запроса проверки доступного времени записи
+    на диапазон дат.
+    """
+
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    total_time = serializers.IntegerField()
+    stream = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        days: int = (data['date_to'] - data['date_from']).days + 1
+        if days < 1:
+            raise serializers.ValidationError(
+                {
+                    'date_to': (
+                        'Дата окончания не может быть раньше даты начала.'
+                    ),
+                },
+            )
+        if days > SCHEDULE_CALENDAR_MAX_DAYS:
+            raise serializers.ValidationError(
+                {
+                    'date_to': (
+                        'Диапазон дат не может превышать '
+                        f'{SCHEDULE_CALENDAR_MAX_DAYS} дней.'
+                    ),
+                },
+            )
+        return data
+
+
 class CleaningGetTimeSerializer(serializers.Serializer):
     """Сериализатор для запроса проверки доступного времени записи."""
 
@@ -54,7 +101,8 @@ class CleaningGetTimeSerializer(serializers.Serializer):
     total_time = serializers.IntegerField()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(
+        SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Сериализатор пользователей."""
     address = AddressSerializer()
 
@@ -67,6 +115,9 @@ class UserSerializer(serializers.ModelSerializer):
             'phone',
             'address',
         )
+        relations = {
+            'address': Relation(select_related=('address',)),
+        }
 
     def update(self, instance, validated_data):
         """Производит обновление данных о пользователе и его адресе."""
@@ -157,7 +208,8 @@ class PasswordConfirmSerializer(serializers.ModelSerializer):
         return value
 
 
-class MeasureSerializer(serializers.ModelSerializer):
+class MeasureSerializer(
+        SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Сериализатор единиц измерения"""
 
     class Meta:
@@ -168,10 +220,72 @@ class MeasureSerializer(serializers.ModelSerializer):
         )
 
 
-class GetServiceSerializer(serializers.ModelSerializer):
+def build_absolute_url(context: dict, url: str) -> str:
+    """
+    Возвращает абсолютную ссылку: по запросу из context, а если запроса
+    нет - по адресу сайта из context['base_url'].
+    """
+    request = context.get('request')
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return urljoin(context.get('base_url', ''), url)
+
+
+class ServiceImageField(Base64ImageField):
+    """
+    Поле изображения услуги. Принимает изображение в base64, а возвращает
+    ссылку на файл в /media/, которую отдает nginx. Ссылка содержит хэш
+    изображения, поэтому ответ кэшируется клиентом до изменения файла.
+
+    Изображение возвращается в base64 только при параметре запроса
+    ?base64=true: файл читается с диска при каждом таком запросе.
+    """
+
+    def is_base64_requested(self) -> bool:
+        request = self.context.get('request')
+        return request is not None and request.query_params.get(
+            SERVICE_IMAGE_BASE64_PARAM, ''
+        ).lower() in ('true', '1')
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        if self.is_base64_requested():
+            content_type, _ = mimetypes.guess_type(value.name)
+            with value.open('rb') as image:
+                data: str = base64.b64encode(image.read()).decode()
+            return f'data:{content_type};base64,{data}'
+        url: str = build_absolute_url(
+            context=self.context, url=super().to_representation(value),
+        )
+        image_hash: str = getattr(value.instance, 'image_hash', '')
+        if not image_hash:
+            return url
+        return f'{url}?v={image_hash[:SERVICE_IMAGE_VERSION_LEN]}'
+
+
+class ServiceImageVariantsField(serializers.ReadOnlyField):
+    """
+    Поле ссылок на уменьшенные копии изображения услуги по размерам
+    и форматам (см. api.images).
+    """
+
+    def to_representation(self, value):
+        variants: dict[str, dict[str, str]] = {}
+        for size, formats in (value or {}).items():
+            for extension, name in formats.items():
+                variants.setdefault(size, {})[extension] = build_absolute_url(
+                    context=self.context, url=default_storage.url(name),
+                )
+        return variants
+
+
+class GetServiceSerializer(
+        SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Сериализатор услуг"""
 
-    image = Base64ImageField(read_only=True)
+    image = ServiceImageField(read_only=True)
+    image_variants = ServiceImageVariantsField()
     measure = serializers.ReadOnlyField(
         source='measure.title',
         read_only=True,
@@ -185,14 +299,21 @@ class GetServiceSerializer(serializers.ModelSerializer):
             'price',
             'measure',
             'image',
+            'image_size',
+            'image_hash',
+            'image_variants',
             'cleaning_time',
         )
+        relations = {
+            'measure': Relation(select_related=('measure',)),
+        }
 
 
 class CreateServiceSerializer(serializers.ModelSerializer):
     """Сериализатор создания и изменения услуг"""
 
-    image = Base64ImageField(allow_null=True)
+    image = ServiceImageField(allow_null=True)
+    image_variants = ServiceImageVariantsField()
     measure = serializers.PrimaryKeyRelatedField(
         queryset=Measure.objects.all()
     )
@@ -205,9 +326,16 @@ class CreateServiceSerializer(serializers.ModelSerializer):
             'price',
             'measure',
             'image',
+            'image_size',
+            'image_hash',
+            'image_variants',
             'service_type',
             'cleaning_time',
         )
+        read_only_fields = (
+            'image_size',
+            'image_hash',
+        )
 
     def to_representation(self, value):
         representation = super().to_representation(value)
@@ -216,7 +344,8 @@ class CreateServiceSerializer(serializers.ModelSerializer):
         return representation
 
 
-class GetCleaningTypeSerializer(serializers.ModelSerializer):
+class GetCleaningTypeSerializer(
+        SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Сериализатор набора услуг."""
 
     service = GetServiceSerializer(
@@ -232,6 +361,9 @@ class GetCleaningTypeSerializer(serializers.ModelSerializer):
             'coefficient',
             'service',
         )
+        relations = {
+            'service': Relation(prefetch_related=('service__measure',)),
+        }
 
 
 class CreateCleaningTypeSerializer(serializers.ModelSerializer):
@@ -280,7 +412,12 @@ class ServicesInOrderSerializer(serializers.ModelSerializer):
     title = serializers.ReadOnlyField(source='service.title')
     measure = serializers.ReadOnlyField(source='service.measure.title')
     price = serializers.ReadOnlyField(source='service.price')
-    image = Base64ImageField(source='service.image')
+    image = ServiceImageField(source='service.image', read_only=True)
+    image_size = serializers.ReadOnlyField(source='service.image_size')
+    image_hash = serializers.ReadOnlyField(source='service.image_hash')
+    image_variants = ServiceImageVariantsField(
+        source='service.image_variants'
+    )
 
     class Meta:
         model = ServicesInOrder
@@ -290,11 +427,15 @@ class ServicesInOrderSerializer(serializers.ModelSerializer):
             'measure',
             'price',
             'image',
+            'image_size',
+            'image_hash',
+            'image_variants',
             'amount',
         )
 
 
-class OrderGetSerializer(serializers.ModelSerializer):
+class OrderGetSerializer(
+        SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для представления заказа."""
 
     user = UserSerializer(read_only=True)
@@ -327,6 +468,201 @@ class OrderGetSerializer(serializers.ModelSerializer):
             'cleaning_date',
             'cleaning_time',
         )
+        relations = {
+            'user': Relation(select_related=('user__address',)),
+            'address': Relation(select_related=('address',)),
+            'cleaning_type': Relation(
+                select_related=('cleaning_type',),
+                prefetch_related=('cleaning_type__service__measure',),
+            ),
+            'services': Relation(
+                prefetch_related=('services_in_order__service__measure',),
+            ),
+        }
+
+
+class OrderListSerializer(
+        SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    """
+    Сериализатор для представления заказа в списке заказов: пользователь
+    и набор услуг передаются по id (целиком - при ?expand=user,cleaning_type),
+    услуги - без вложенного каталога.
+    """
+
+    address = AddressSerializer(read_only=True)
+    services = ServicesInOrderSerializer(
+        source='services_in_order',
+        many=True,
+        read_only=True,
+    )
+
+    class Meta:
+        model = Order
+        fields = OrderGetSerializer.Meta.fields
+        relations = {
+            'address': Relation(select_related=('address',)),
+            'services': Relation(
+                prefetch_related=('services_in_order__service__measure',),
+            ),
+        }
+        expandable_fields = {
+            'user': (
+                UserSerializer,
+                OrderGetSerializer.Meta.relations['user'],
+            ),
+            'cleaning_type': (
+                GetCleaningTypeSerializer,
+                OrderGetSerializer.Meta.relations['cleaning_type'],
+            ),
+        }
+
+
+def get_services_ids(services_data: list[dict[str, str]]) -> set[int]:
+    """Возвращает корректные id услуг из данных заказа."""
+    return {
+        int(service['id']) for service in services_data
+        if str(service.get('id')).isdigit()
+    }
+
+
+def validate_order_services(
+        services_data: list[dict[str, str]],
+        services: Container[int]) -> dict[int, int]:
+    """
+    Производит валидацию услуг и их количества в заказе: id услуг должны
+    содержаться в services. Возвращает количество каждой услуги по id,
+    количество повторяющихся в заказе услуг суммируется.
+    """
+    amounts: dict[int, int] = {}
+    invalidated_services: list[str] = []
+    for service in services_data:
+        service_id: str = service.get('id')
+        amount: str = service.get('amount')
+        if service_id is None or amount is None:
+            raise serializers.ValidationError(
+                'Укажите id и amount сервиса.'
+            )
+        if (not service_id.isdigit() or not amount.isdigit() or
+                int(service_id) not in services or int(amount) <= 0):
+            invalidated_services.append(service_id)
+            continue
+        service_id: int = int(service_id)
+        amounts[service_id] = amounts.get(service_id, 0) + int(amount)
+    if invalidated_services:
+        raise serializers.ValidationError(
+            'Убедитесь, что услуги со следующими id существуют, '
+            'и для них указано валидное значение поля amount: '
+            f'{", ".join(id for id in invalidated_services)}.'
+        )
+    return amounts
+
+
+class OrderQuoteSerializer(serializers.Serializer):
+    """Сериализатор для запроса расчета стоимости заказа."""
+
+    cleaning_type = serializers.IntegerField()
+    services = serializers.ListField(
+        child=serializers.DictField(
+            child=serializers.CharField()
+        )
+    )
+    rooms_number = serializers.IntegerField(min_value=1)
+    bathrooms_number = serializers.IntegerField(min_value=1)
+
+    def validate_cleaning_type(self, value):
+        """Производит валидацию набора услуг."""
+        if value not in get_price_table().cleaning_types:
+            raise serializers.ValidationError(
+                'Набор услуг с указанным id не существует.'
+            )
+        return value
+
+    def validate_services(self, services_data):
+        """Производит валидацию сервисов и их количества в заказе."""
+        return validate_order_services(
+            services_data=services_data,
+            services=get_price_table().services,
+        )
+
+    def to_representation(self, instance):
+        try:
+            quote: Quote = get_price_table().quote(
+                cleaning_type_id=instance['cleaning_type'],
+                services=instance['services'],
+                rooms_number=instance['rooms_number'],
+                bathrooms_number=instance['bathrooms_number'],
+            )
+        except KeyError:
+            # INFO: каталог изменился после валидации запроса.
+            raise serializers.ValidationError(
+                'Каталог услуг изменился, повторите расчет заказа.'
+            )
+        return quote._asdict()
+
+
+class OrderBatchRowSerializer(serializers.Serializer):
+    """
+    Сериализатор заказа в пакетном создании заказов.
+    Проверяет данные заказа без запросов к базе данных.
+    """
+
+    cleaning_type = serializers.IntegerField()
+    services = serializers.ListField(
+        child=serializers.DictField(
+            child=serializers.CharField()
+        )
+    )
+    rooms_number = serializers.IntegerField(min_value=1)
+    bathrooms_number = serializers.IntegerField(min_value=1)
+    address = AddressSerializer()
+    cleaning_date = serializers.DateField()
+    cleaning_time = serializers.TimeField()
+    comment = serializers.CharField(
+        max_length=ORDER_COMMENT_MAX_LEN,
+        required=False,
+        allow_null=True,
+    )
+
+
+class OrderBatchSerializer(serializers.Serializer):
+    """Сериализатор для запроса пакетного создания заказов."""
+
+    orders = serializers.ListField(
+        child=serializers.DictField(),
+        min_length=1,
+        max_length=ORDER_BATCH_MAX_SIZE,
+    )
+
+
+def save_order_with_cleaner(
+        order: Order, decision: AssignmentDecision) -> None:
+    """
+    Сохраняет заказ с первым из выбранных стратегией уборщиков,
+    интервал занятости которого удалось сохранить, и причиной его выбора.
+
+    Если уборщика успел занять параллельный заказ, база данных отклоняет
+    пересекающийся интервал и назначается следующий уборщик.
+    Если свободных уборщиков не осталось, вызывает ValidationError.
+    """
+    is_new: bool = order.pk is None
+    for cleaner_id in decision.cleaners_ids:
+        order.cleaner_id = cleaner_id
+        order.cleaner_assignment_reason = (
+            f'{decision.strategy}: {decision.reasons[cleaner_id]}'
+        )
+        try:
+            order.save()
+        except IntegrityError as err:
+            if not is_busy_interval_conflict(err):
+                raise
+            if is_new:
+                # INFO: вставка заказа откатилась вместе с интервалом.
+                order.pk = None
+            continue
+        return
+    raise serializers.ValidationError(
+        'Для указанного дня и времени нет доступных уборщиков.'
+    )
 
 
 @extend_schema_serializer(**ORDER_POST_SERIALIZER_SCHEMA)
@@ -343,6 +679,13 @@ class OrderPostSerializer(serializers.ModelSerializer):
         )
     )
     address = AddressSerializer()
+    # INFO: услуги набора услуг загружаются вместе с набором услуг
+    #       для расчета стоимости заказа.
+    cleaning_type = serializers.PrimaryKeyRelatedField(
+        queryset=get_cleaning_types_queryset(),
+    )
+    total_sum = serializers.IntegerField(required=False)
+    total_time = serializers.IntegerField(required=False)
 
     class Meta:
         model = Order
@@ -383,34 +726,43 @@ class OrderPostSerializer(serializers.ModelSerializer):
         return user_data
 
     def validate_services(self, services_data):
-        """Производит валидацию сервисов и их количества в заказе."""
-        all_services_id: list[int] = [
-            service.id for service in Service.objects.all()
-        ]
-        invalidated_services: list[int] = []
-        for service in services_data:
-            service_id: str = service.get('id')
-            amount: str = service.get('amount')
-            if service_id is None or amount is None:
-                raise serializers.ValidationError(
-                    'Укажите id и amount сервиса.'
-                )
-            if int(service_id) not in all_services_id or int(amount) <= 0:
-                invalidated_services.append(service_id)
-        if invalidated_services:
-            raise serializers.ValidationError(
-                'Убедитесь, что услуги со следующими id существуют, '
-                'и для них указано валидное значение поля amount: '
-                f'{", ".join(id for id in invalidated_services)}.'
-            )
-        return services_data
-
-    def validate_total_sum(self, total_sum_data):
-        # TODO: добавить проверку валидности стоимости заказа,
-        #       чтобы его не подменили.
-        return total_sum_data
+        """
+        Производит валидацию сервисов и их количества в заказе.
+        Возвращает количество каждой услуги заказа: услуги загружаются
+        одним запросом и используются для расчета стоимости и создания
+        перечня услуг заказа.
+        """
+        services: dict[int, Service] = Service.objects.select_related(
+            'measure'
+        ).in_bulk(get_services_ids(services_data=services_data))
+        amounts: dict[int, int] = validate_order_services(
+            services_data=services_data, services=services
+        )
+        return {
+            services[service_id]: amount
+            for service_id, amount in amounts.items()
+        }
 
     def validate(self, data):
+        """
+        Рассчитывает стоимость и продолжительность заказа по каталогу
+        услуг, переданные клиентом значения не используются.
+        """
+        cleaning_type: CleaningType = data.get('cleaning_type')
+        services: dict[Service, int] = data.get('services')
+        quote: Quote = PriceTable.from_instances(
+            cleaning_types=(cleaning_type,),
+            services=services,
+        ).quote(
+            cleaning_type_id=cleaning_type.id,
+            services={
+                service.id: amount for service, amount in services.items()
+            },
+            rooms_number=data.get('rooms_number'),
+            bathrooms_number=data.get('bathrooms_number'),
+        )
+        data['total_sum'] = quote.total_sum
+        data['total_time'] = quote.total_time
         address_data: dict[str, any] = data.get('address')
         cleaning_date: date = data.get('cleaning_date')
         cleaning_time: time = data.get('cleaning_time')
@@ -439,7 +791,7 @@ class OrderPostSerializer(serializers.ModelSerializer):
         Если адрес отсутствует в базе данных - создает новый.
         Если заказ уже был создан - возвращает ошибку 400.
         """
-        random_cleaner: User = self.__get_random_cleaner(data=data)
+        decision: AssignmentDecision = self.__choose_cleaners(data=data)
         address: Address = get_or_create_address(
             address_data=data.get('address')
         )
@@ -448,7 +800,7 @@ class OrderPostSerializer(serializers.ModelSerializer):
         self.__check_user_data(
             address=address, user=user, user_data=user_data
         )
-        order, is_created = Order.objects.get_or_create(
+        order: Order = Order(
             user=user,
             total_sum=data.get('total_sum'),
             total_time=data.get('total_time'),
@@ -460,12 +812,14 @@ class OrderPostSerializer(serializers.ModelSerializer):
             cleaning_date=data.get('cleaning_date'),
             cleaning_time=data.get('cleaning_time'),
         )
-        if not is_created:
+        try:
+            save_order_with_cleaner(order=order, decision=decision)
+        except IntegrityError:
+            # INFO: параллельный запрос успел создать заказ на тот же
+            #       адрес и время.
             raise serializers.ValidationError(
                 {"Статус": "Заказ уже был создан."}
             )
-        order.cleaner: User = random_cleaner
-        order.save()
         self.__services_bulk_create(order, data.get('services'))
         return order
 
@@ -489,39 +843,34 @@ class OrderPostSerializer(serializers.ModelSerializer):
         user.save()
         return
 
-    def __get_random_cleaner(self, data) -> User:
+    def __choose_cleaners(self, data) -> AssignmentDecision:
         """
         Проверяет наличие доступных уборщиков для указанного дня и времени
-        заказа. Возвращает случайного из всех доступных.
+        заказа. Возвращает их id в порядке предпочтения стратегии назначения
+        уборщиков и причины выбора каждого из них.
 
         Если доступных уборщиков нет, вызывает ValidationError.
         """
-        cleaner: QuerySet = get_available_cleaners(
+        decision: AssignmentDecision = get_assignment_strategy().choose(
             cleaning_date=data.get('cleaning_date'),
             cleaning_time=data.get('cleaning_time'),
             total_time=data.get('total_time'),
+            address_data=data.get('address'),
         )
-        if cleaner.count() == 0:
+        if not decision.cleaners_ids:
             raise serializers.ValidationError(
                 'Для указанного дня и времени нет доступных уборщиков.'
             )
-        return random.choice(list(cleaner))
+        return decision
 
-    def __services_bulk_create(self, order, services) -> None:
+    def __services_bulk_create(
+            self, order: Order, services: dict[Service, int]
+            ) -> None:  # noqa E125
         """Добавляет сервисы в заказ."""
-        ing_objs = []
-        for item in services:
-            id: str = item.get('id')
-            amount: str = item.get('amount')
-            service = Service.objects.get(id=int(id))
-            ing_objs.append(
-                ServicesInOrder(
-                    order=order,
-                    service=service,
-                    amount=int(amount)
-                )
-            )
-        ServicesInOrder.objects.bulk_create(ing_objs)
+        ServicesInOrder.objects.bulk_create(
+            ServicesInOrder(order=order, service=service, amount=amount)
+            for service, amount in services.items()
+        )
         return
 
     def __validate_phone(self, phone_data) -> PhoneNumber:
@@ -556,7 +905,7 @@ class OwnerOrderPatchSerializer(serializers.ModelSerializer):
     def validate(self, data):
         order_status: str = data.get('order_status')
         if order_status is None:
-            data.pop('comment_cancel')
+            data.pop('comment_cancel', None)
             return data
         if order_status != ORDER_CANCELLED_STATUS:
             raise serializers.ValidationError(
@@ -578,13 +927,83 @@ class OwnerOrderPatchSerializer(serializers.ModelSerializer):
         return data
 
     def update(self, instance, validated_data):
-        super().update(instance, validated_data)
+        """
+        Изменяет заказ. При переносе заказа на другие день или время
+        и при возобновлении отмененного заказа проверяет, что уборщик
+        свободен, либо назначает другого уборщика.
+        Если свободных уборщиков нет или на адрес уже есть заказ
+        на это время, вызывает ValidationError.
+        """
+        is_rescheduled: bool = any(
+            field in validated_data and
+            validated_data[field] != getattr(instance, field)
+            for field in ('cleaning_date', 'cleaning_time')
+        )
+        was_cancelled: bool = instance.order_status == ORDER_CANCELLED_STATUS
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        self.update_cancel_fields(
+            instance=instance, validated_data=validated_data
+        )
+        try:
+            if (instance.order_status != ORDER_CANCELLED_STATUS and
+                    (is_rescheduled or was_cancelled)):
+                self.reschedule(order=instance)
+            else:
+                instance.save()
+        except IntegrityError as err:
+            if is_busy_interval_conflict(err):
+                raise serializers.ValidationError(
+                    'Для указанного дня и времени нет доступных уборщиков.'
+                )
+            # INFO: на тот же адрес и время уже есть другой заказ.
+            raise serializers.ValidationError(
+                {'cleaning_time': 'На указанные адрес и время уже есть заказ.'}
+            )
+        return instance
+
+    def update_cancel_fields(self, instance, validated_data) -> None:
+        """Заполняет дату и время отмены при отмене заказа."""
         order_status: str = validated_data.get('order_status')
         if order_status == ORDER_CANCELLED_STATUS:
             instance.cancel_date: datetime = datetime.today().date()
             instance.cancel_time: datetime = datetime.today().time()
-        instance.save()
-        return instance
+        return
+
+    def reschedule(self, order: Order) -> None:
+        """
+        Сохраняет перенесенный или возобновленный заказ. Уборщик заказа
+        остается, если он свободен в это время, иначе назначается уборщик,
+        выбранный стратегией назначения. Пересечение с параллельным
+        заказом уборщика обрабатывается так же, как при создании заказа.
+        """
+        cleaners: QuerySet = get_available_cleaners(
+            cleaning_date=order.cleaning_date,
+            cleaning_time=order.cleaning_time,
+            total_time=order.total_time,
+            order_id=order.pk,
+        )
+        if (order.cleaner_id is not None and
+                cleaners.filter(pk=order.cleaner_id).exists()):
+            try:
+                order.save()
+            except IntegrityError as err:
+                if not is_busy_interval_conflict(err):
+                    raise
+            else:
+                return
+        decision: AssignmentDecision = get_assignment_strategy().choose(
+            cleaning_date=order.cleaning_date,
+            cleaning_time=order.cleaning_time,
+            total_time=order.total_time,
+            address_data={
+                'city': order.address.city,
+                'street': order.address.street,
+            },
+            cleaners=cleaners.exclude(pk=order.cleaner_id),
+        )
+        save_order_with_cleaner(order=order, decision=decision)
+        return
 
     def to_representation(self, value):
         return OrderGetSerializer(
@@ -610,20 +1029,26 @@ class AdminOrderPatchSerializer(OwnerOrderPatchSerializer):
             'cleaning_time',
         )
 
-    def update(self, instance, validated_data):
-        super().update(instance, validated_data)
+    def update_cancel_fields(self, instance, validated_data) -> None:
+        """
+        Заполняет дату и время отмены при отмене заказа, иначе
+        сбрасывает данные отмены заказа.
+        """
+        super().update_cancel_fields(
+            instance=instance, validated_data=validated_data
+        )
         if ('comment_cancel' not in validated_data and
                 not validated_data.get('order_status') ==
                 ORDER_CANCELLED_STATUS):
             instance.comment_cancel = None
             instance.cancel_date = None
             instance.cancel_time = None
-        instance.save()
-        return instance
+        return
 
 
 @extend_schema_serializer(**RATING_SERIALIZER_SCHEMA)
-class RatingSerializer(serializers.ModelSerializer):
+class RatingSerializer(
+        SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """
     Сериализатор для представления отзыва на уборку на главной странице.
     """
@@ -645,6 +1070,9 @@ class RatingSerializer(serializers.ModelSerializer):
             'id',
             'username',
         )
+        relations = {
+            'user': Relation(select_related=('user__address',)),
+        }
 
     def to_representation(self, instance):
         data: dict[str, any] = super().to_representation(instance)
@@ -693,3 +1121,34 @@ class OrderRatingSerializer(RatingSerializer):
         rating.order: Order = order
         rating.save()
         return rating
+
+
+class RatingAggregateSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для представления агрегата оценок: количества отзывов,
+    средней оценки и количества отзывов с каждой оценкой.
+    """
+
+    count = serializers.IntegerField(read_only=True)
+    average = serializers.FloatField(read_only=True, allow_null=True)
+    histogram = serializers.DictField(
+        child=serializers.IntegerField(), read_only=True,
+    )
+
+    class Meta:
+        fields = (
+            'count',
+            'average',
+            'histogram',
+        )
+        model = RatingAggregate
+
+
+class CleanerRatingAggregateSerializer(RatingAggregateSerializer):
+    """
+    Сериализатор для представления агрегата оценок отзывов на сайте
+    по заказам уборщика.
+    """
+
+    class Meta(RatingAggregateSerializer.Meta):
+        fields = ('cleaner',) + RatingAggregateSerializer.Meta.fields
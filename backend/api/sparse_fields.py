@@ -0,0 +1,175 @@
+"""
+Выбор полей ответа параметрами запроса ?fields= и ?expand=.
+
+    - ?fields=id,order_status - ответ содержит только перечисленные поля
+    - ?expand=user,cleaning_type - связанные объекты, которые по умолчанию
+      передаются по id, возвращаются целиком
+
+Выбор полей ограничивает не только ответ, но и запрос к базе данных:
+загружаются только столбцы выбранных полей (only), а связанные объекты
+присоединяются (select_related) или загружаются отдельным запросом
+(prefetch_related), только если их поля есть в ответе. Связи, которые
+нужны полю сериализатора, описываются в Meta.relations, а поля, которые
+можно развернуть, - в Meta.expandable_fields.
+"""
+
+from typing import Iterable, NamedTuple, Optional
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from rest_framework.request import Request
+from rest_framework.serializers import ModelSerializer
+
+from cleanpro.app_data import SPARSE_EXPAND_PARAM, SPARSE_FIELDS_PARAM
+
+
+class Relation(NamedTuple):
+    """
+    Связанные объекты, которые нужны полю сериализатора.
+
+    Атрибуты:
+        - select_related (tuple[str]) - связи для select_related
+        - prefetch_related (tuple[str]) - связи для prefetch_related
+    """
+
+    select_related: tuple[str, ...] = ()
+    prefetch_related: tuple[str, ...] = ()
+
+
+def parse_fields_param(value: Optional[str]) -> Optional[set[str]]:
+    """
+    Возвращает множество полей из значения параметра запроса вида
+    "id,order_status" либо None, если параметр не указан.
+    """
+    if value is None:
+        return None
+    return {field.strip() for field in value.split(',') if field.strip()}
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Миксин сериализатора модели, который принимает аргументы fields
+    (поля ответа) и expand (разворачиваемые связи).
+
+    Атрибуты Meta:
+        - relations (dict[str, Relation]) - связи, которые нужны полям
+        - expandable_fields (dict[str, tuple[type, Relation]]) -
+            сериализатор развернутого поля и нужные ему связи
+    """
+
+    def __init__(
+            self,
+            *args,
+            fields: Optional[Iterable[str]] = None,
+            expand: Optional[Iterable[str]] = None,
+            **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable: dict[str, tuple[type, Relation]] = getattr(
+            self.Meta, 'expandable_fields', {}
+        )
+        self.expanded: set[str] = set(expand or ()) & set(expandable)
+        for field in self.expanded:
+            serializer_class, _ = expandable[field]
+            self.fields[field] = serializer_class(read_only=True)
+        if fields is not None:
+            for field in set(self.fields) - set(fields):
+                self.fields.pop(field)
+
+    def get_relation(self, field: str) -> Optional[Relation]:
+        """Возвращает связи, которые нужны полю field."""
+        if field in self.expanded:
+            return self.Meta.expandable_fields[field][1]
+        return getattr(self.Meta, 'relations', {}).get(field)
+
+    @classmethod
+    def optimize_queryset(
+            cls,
+            queryset: QuerySet,
+            fields: Optional[Iterable[str]] = None,
+            expand: Optional[Iterable[str]] = None) -> QuerySet:
+        """
+        Ограничивает queryset столбцами и связями, которые нужны полям
+        ответа. Если источник поля не является полем модели и для него
+        не описаны связи (например, свойство модели), загружаются
+        все столбцы модели. Поля сортировки модели загружаются всегда.
+        """
+        serializer: ModelSerializer = cls(fields=fields, expand=expand)
+        # INFO: поля сортировки нужны для постраничного вывода по ключу.
+        only: set[str] = {
+            queryset.model._meta.pk.name,
+            *(
+                field.lstrip('-') for field in queryset.model._meta.ordering
+                if '__' not in field
+            ),
+        }
+        can_defer: bool = True
+        for name, field in serializer.fields.items():
+            relation: Optional[Relation] = serializer.get_relation(name)
+            if relation is not None:
+                queryset = queryset.select_related(
+                    *relation.select_related
+                ).prefetch_related(*relation.prefetch_related)
+            source: str = field.source.split('.')[0]
+            try:
+                model_field = queryset.model._meta.get_field(source)
+            except FieldDoesNotExist:
+                model_field = None
+            if model_field is not None and model_field.concrete:
+                only.add(source)
+            elif relation is None:
+                can_defer = False
+        if can_defer:
+            queryset = queryset.only(*only)
+        return queryset
+
+
+class SparseFieldsViewMixin:
+    """
+    Миксин представления, который передает сериализатору поля из
+    параметров запроса ?fields= и ?expand= и ограничивает queryset
+    для GET запросов.
+    """
+
+    def get_sparse_fields(
+            self, serializer_class: type = None) -> dict[str, set[str]]:
+        """
+        Возвращает аргументы fields и expand для сериализатора
+        serializer_class, если он поддерживает выбор полей.
+        """
+        request: Request = self.request
+        serializer_class = serializer_class or self.get_serializer_class()
+        if (request.method != 'GET' or not issubclass(
+                serializer_class, SparseFieldsSerializerMixin)):
+            return {}
+        return {
+            'fields': parse_fields_param(
+                request.query_params.get(SPARSE_FIELDS_PARAM)
+            ),
+            'expand': parse_fields_param(
+                request.query_params.get(SPARSE_EXPAND_PARAM)
+            ),
+        }
+
+    def optimize_queryset(
+            self,
+            queryset: QuerySet,
+            serializer_class: type = None) -> QuerySet:
+        """Ограничивает queryset полями ответа сериализатора."""
+        serializer_class = serializer_class or self.get_serializer_class()
+        sparse_fields: dict[str, set[str]] = self.get_sparse_fields(
+            serializer_class=serializer_class
+        )
+        if not sparse_fields:
+            return queryset
+        return serializer_class.optimize_queryset(
+            queryset=queryset, **sparse_fields
+        )
+
+    def filter_queryset(self, queryset: QuerySet) -> QuerySet:
+        return self.optimize_queryset(
+            queryset=super().filter_queryset(queryset)
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.update(self.get_sparse_fields())
+        return super().get_serializer(*args, **kwargs)
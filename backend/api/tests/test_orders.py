@@ -0,0 +1,1428 @@
+from base64 import urlsafe_b64encode
+import csv
+from datetime import date, time, timedelta
+import json
+import random
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import idempotency
+from api.assignment import AssignmentDecision, get_assignment_strategy
+from api.availability import (
+    DayAvailability, get_free_runs_bitmask, get_free_runs_matrix,
+    interval_mask,
+)
+from api.idempotency import (
+    StoredResponse, get_request_fingerprint, get_request_key,
+    lock_request_key,
+)
+from api.rating_aggregates import (
+    rebuild_rating_aggregates, update_rating_aggregates,
+)
+from api.recurrence import materialize_recurring_orders
+from api.routing import (
+    CleanerRoute, get_route_stop, rank_booking_routes, rank_routes,
+)
+from api.serializers import AdminOrderPatchSerializer
+from api.utils import (
+    get_available_calendar_json, get_available_time_json,
+    stream_available_calendar_json,
+)
+from api.work_calendar import get_slot_grid
+from cleanpro.app_data import (
+    BASE_DIR, BUSY_INTERVAL_EXCLUSION_CONSTRAINT, CLEANER_ASSIGNMENT_STRATEGY,
+    ORDER_CANCELLED_STATUS, ORDER_CREATED_STATUS, RATING_SOURCE_MAPS,
+    RECURRENCE_MATERIALIZE_DAYS, SCHEDULE_CALENDAR_MAX_DAYS,
+    SCHEDULE_CALENDAR_STREAM_CHUNK_DAYS,
+)
+from services.models import (
+    CleanerBusyInterval, CleaningType, Holiday, IdempotencyKey, Measure,
+    Order, OrderRecurrence, Rating, RatingAggregate, Service,
+    ServicesInCleaningType, ServicesInOrder,
+)
+from users.models import Address, User
+
+CATALOG_CSV_PATH = (
+    BASE_DIR / 'services' / 'management' / 'commands' / 'csv_import'
+)
+# INFO: запросы к базе данных при создании заказа пользователем с заполненными
+#       данными на новый адрес, включая точки сохранения транзакций,
+#       загрузку услуг набора услуг для расчета стоимости и запись письма
+#       пользователю в очередь исходящих писем.
+ORDER_CREATE_QUERIES: int = 24
+# INFO: запросы к базе данных при расчете доступного времени без кэша:
+#       отпуска уборщиков, интервалы занятости и нерабочие дни.
+AVAILABLE_TIME_QUERIES: int = 3
+ORDER_USER_DATA: dict[str, str] = {
+    'username': 'Иван Иванович',
+    'email': 'ivanstar@email.com',
+    'phone': '+79991234567',
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> None:
+    cache.clear()
+    return
+
+
+@pytest.fixture
+def client() -> APIClient:
+    user: User = User.objects.create(email=ORDER_USER_DATA['email'])
+    User.objects.create(email='cleaner@email.com', is_cleaner=True)
+    client: APIClient = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def services() -> list[Service]:
+    measure: Measure = Measure.objects.create(title='шт')
+    return Service.objects.bulk_create(
+        Service(
+            title=f'Услуга {number}',
+            price=100 * number,
+            measure=measure,
+            cleaning_time=10,
+        )
+        for number in range(1, 11)
+    )
+
+
+@pytest.fixture
+def cleaning_type() -> CleaningType:
+    cleaning_type: CleaningType = CleaningType.objects.create(
+        title='Генеральная', coefficient=1.5,
+    )
+    ServicesInCleaningType.objects.bulk_create(
+        ServicesInCleaningType(cleaning_type=cleaning_type, service=service)
+        for service in Service.objects.bulk_create((
+            Service(
+                title='Выезд уборщиков',
+                price=800,
+                measure=Measure.objects.create(title='выезд'),
+                cleaning_time=60,
+            ),
+            Service(
+                title='Пылесосим',
+                price=400,
+                measure=Measure.objects.create(title='комната'),
+                cleaning_time=15,
+            ),
+        ))
+    )
+    return cleaning_type
+
+
+def read_catalog_csv(name: str) -> list[dict[str, str]]:
+    """Читает csv-файл импорта каталога услуг."""
+    path = CATALOG_CSV_PATH / name / f'{name}.csv'
+    with open(path, encoding='utf-8') as file:
+        return list(csv.DictReader(file, delimiter=';'))
+
+
+@pytest.fixture
+def catalog() -> dict[str, CleaningType]:
+    """
+    Создает каталог услуг из csv-файлов импорта каталога.
+    Возвращает наборы услуг по названию.
+    """
+    measures: dict[str, Measure] = {}
+    services: dict[str, Service] = {}
+    for row in read_catalog_csv('services'):
+        if row['measure'] not in measures:
+            measures[row['measure']] = Measure.objects.create(
+                title=row['measure']
+            )
+        services[row['title']] = Service(
+            title=row['title'],
+            price=float(row['price']),
+            measure=measures[row['measure']],
+            service_type=row['service_type'],
+            cleaning_time=int(row['cleaning_time']),
+        )
+    Service.objects.bulk_create(services.values())
+    cleaning_types: dict[str, CleaningType] = {}
+    for row in read_catalog_csv('cleaning_types'):
+        cleaning_types[row['title']] = CleaningType.objects.create(
+            title=row['title'], coefficient=float(row['coefficient']),
+        )
+        ServicesInCleaningType.objects.bulk_create(
+            ServicesInCleaningType(
+                cleaning_type=cleaning_types[row['title']],
+                service=services[title],
+            )
+            for title in row['services'].split('/')
+        )
+    return cleaning_types
+
+
+def get_order_data(
+        cleaning_type: CleaningType,
+        services: list[Service],
+        house: int) -> dict[str, any]:
+    """Возвращает данные нового заказа с указанными услугами."""
+    return {
+        'user': ORDER_USER_DATA,
+        'cleaning_type': cleaning_type.id,
+        'services': [
+            {'id': service.id, 'amount': 2} for service in services
+        ],
+        'rooms_number': 2,
+        'bathrooms_number': 1,
+        'address': {'city': 'Москва', 'street': 'Тверская', 'house': house},
+        'cleaning_date': str(date.today() + timedelta(days=1)),
+        'cleaning_time': f'{9 + house * 3:02}:00',
+    }
+
+
+@pytest.mark.django_db
+class TestOrderCreate():
+    """Производит тест создания заказа."""
+
+    def create_order(self, client: APIClient, data: dict) -> int:
+        """Создает заказ и возвращает количество выполненных запросов."""
+        with CaptureQueriesContext(connection) as context:
+            response = client.post('/api/orders/', data, format='json')
+        assert response.status_code == 201, response.content
+        return len(context.captured_queries)
+
+    def test_queries_count_does_not_depend_on_services(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что количество запросов при создании заказа
+        не зависит от количества услуг в заказе.
+        """
+        # INFO: первый заказ дополняет данные пользователя.
+        self.create_order(
+            client=client,
+            data=get_order_data(cleaning_type, services[:1], house=0),
+        )
+        one_service_queries: int = self.create_order(
+            client=client,
+            data=get_order_data(cleaning_type, services[:1], house=1),
+        )
+        all_services_queries: int = self.create_order(
+            client=client,
+            data=get_order_data(cleaning_type, services, house=2),
+        )
+        assert one_service_queries == ORDER_CREATE_QUERIES
+        assert all_services_queries == ORDER_CREATE_QUERIES
+        assert ServicesInOrder.objects.count() == 1 + 1 + len(services)
+        return
+
+    def test_total_is_calculated_by_server(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что стоимость и продолжительность заказа рассчитываются
+        по каталогу услуг, а не берутся из запроса.
+        """
+        data: dict[str, any] = get_order_data(
+            cleaning_type, services[:2], house=1
+        )
+        self.create_order(
+            client=client,
+            data={**data, 'total_sum': 1, 'total_time': 1},
+        )
+        order: Order = Order.objects.get()
+        # INFO: выезд оплачивается один раз, уборка пылесосом - за каждую
+        #       из двух комнат, дополнительные услуги - за две единицы.
+        assert order.total_sum == round(
+            (800 + 2 * 400 + 2 * 100 + 2 * 200) * 1.5
+        )
+        assert order.total_time == 60 + 2 * 15 + 2 * 10 + 2 * 10
+        return
+
+    def test_quote_matches_order(
+            self, client, services, cleaning_type) -> None:
+        """Проверяет, что расчет стоимости совпадает с заказом."""
+        data: dict[str, any] = get_order_data(
+            cleaning_type, services[:3], house=1
+        )
+        response = client.post('/api/orders/quote/', data, format='json')
+        assert response.status_code == 200, response.content
+        self.create_order(client=client, data=data)
+        order: Order = Order.objects.get()
+        assert response.json() == {
+            'total_sum': order.total_sum,
+            'total_time': order.total_time,
+        }
+        return
+
+    def test_busy_interval_follows_order(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что интервал занятости уборщика сохраняется вместе
+        с заказом и удаляется при отмене заказа.
+        """
+        self.create_order(
+            client=client,
+            data=get_order_data(cleaning_type, services[:1], house=1),
+        )
+        order: Order = Order.objects.get()
+        interval: CleanerBusyInterval = order.busy_interval
+        assert interval.cleaner_id == order.cleaner_id
+        assert timezone.localtime(interval.start).time() == order.cleaning_time
+        assert timezone.localtime(interval.end).time() == (
+            order.cleaning_time_end
+        )
+        response = client.put(
+            f'/api/orders/{order.id}/',
+            {
+                'order_status': ORDER_CANCELLED_STATUS,
+                'comment_cancel': 'Планы изменились.',
+            },
+            format='json',
+        )
+        assert response.status_code == 200, response.content
+        assert not CleanerBusyInterval.objects.exists()
+        return
+
+    def test_busy_interval_conflict_is_retried(
+            self, client, services, cleaning_type, monkeypatch) -> None:
+        """
+        Проверяет, что если уборщика успел занять параллельный заказ,
+        заказ сохраняется со следующим уборщиком.
+        """
+        User.objects.create(email='cleaner2@email.com', is_cleaner=True)
+        update_busy_interval = Order.update_busy_interval
+        attempts: list[int] = []
+
+        def conflict_once(order: Order, **kwargs) -> None:
+            attempts.append(order.cleaner_id)
+            if len(attempts) == 1:
+                raise IntegrityError(
+                    f'conflicting key value violates exclusion constraint '
+                    f'"{BUSY_INTERVAL_EXCLUSION_CONSTRAINT}"'
+                )
+            update_busy_interval(order, **kwargs)
+            return
+
+        monkeypatch.setattr(Order, 'update_busy_interval', conflict_once)
+        self.create_order(
+            client=client,
+            data=get_order_data(cleaning_type, services[:1], house=1),
+        )
+        order: Order = Order.objects.get()
+        assert len(attempts) == 2
+        assert order.cleaner_id == attempts[1] != attempts[0]
+        assert order.busy_interval.cleaner_id == order.cleaner_id
+        return
+
+    @pytest.mark.parametrize(
+        ('cleaning_time', 'is_holiday'),
+        (('09:00', True), ('08:30', False), ('20:00', False)),
+    )
+    def test_work_calendar_is_enforced(
+            self, client, services, cleaning_type,
+            cleaning_time, is_holiday) -> None:
+        """
+        Проверяет, что заказ нельзя оформить в нерабочий день, до начала
+        рабочего дня и с окончанием уборки после конца рабочего дня.
+        """
+        data: dict[str, any] = {
+            **get_order_data(cleaning_type, services[:1], house=1),
+            'cleaning_time': cleaning_time,
+        }
+        if is_holiday:
+            Holiday.objects.create(
+                date=data['cleaning_date'], title='Праздник',
+            )
+        response = client.post('/api/orders/', data, format='json')
+        assert response.status_code == 400, response.content
+        assert not Order.objects.exists()
+        return
+
+
+@pytest.mark.django_db
+class TestAvailableTime():
+    """Производит тест расчета доступного для бронирования времени."""
+
+    def get_available_time(
+            self, cleaning_date: date, total_time: int = 60) -> dict:
+        """Возвращает доступное время через API."""
+        response = APIClient().post(
+            '/api/orders/get_available_time/',
+            {'cleaning_date': str(cleaning_date), 'total_time': total_time},
+            format='json',
+        )
+        assert response.status_code == 200, response.content
+        return response.json()
+
+    def test_queries_count_does_not_depend_on_cleaners(
+            self, client, services, cleaning_type,
+            django_assert_num_queries) -> None:
+        """
+        Проверяет, что количество запросов при расчете доступного времени
+        не зависит от количества уборщиков и заказов, а повторный запрос
+        читает кэш.
+        """
+        cleaning_date: date = date.today() + timedelta(days=1)
+        with django_assert_num_queries(AVAILABLE_TIME_QUERIES):
+            self.get_available_time(cleaning_date=cleaning_date)
+        User.objects.bulk_create(
+            User(email=f'cleaner{number}@email.com', is_cleaner=True)
+            for number in range(10)
+        )
+        for house in range(3):
+            response = client.post(
+                '/api/orders/',
+                get_order_data(cleaning_type, services[:1], house=house),
+                format='json',
+            )
+            assert response.status_code == 201, response.content
+        cache.clear()
+        with django_assert_num_queries(AVAILABLE_TIME_QUERIES):
+            get_available_time_json(
+                cleaning_date=cleaning_date, total_time=60,
+            )
+        with django_assert_num_queries(0):
+            self.get_available_time(cleaning_date=cleaning_date)
+        return
+
+    def test_cache_is_invalidated_on_commit(
+            self, client, services, cleaning_type,
+            django_capture_on_commit_callbacks) -> None:
+        """
+        Проверяет, что кэш доступного времени сбрасывается после фиксации
+        транзакции создания заказа и изменения отпуска уборщика.
+        """
+        cleaning_date: date = date.today() + timedelta(days=1)
+        assert self.get_available_time(cleaning_date=cleaning_date)['12:00']
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post(
+                '/api/orders/',
+                get_order_data(cleaning_type, services[:1], house=1),
+                format='json',
+            )
+        assert response.status_code == 201, response.content
+        schedule: dict[str, bool] = self.get_available_time(
+            cleaning_date=cleaning_date
+        )
+        assert not schedule['12:00']
+        assert schedule['17:00']
+        cleaner: User = User.objects.get(is_cleaner=True)
+        cleaner.on_vacation_from = cleaning_date
+        cleaner.on_vacation_to = cleaning_date
+        with django_capture_on_commit_callbacks(execute=True):
+            cleaner.save()
+        assert not any(
+            self.get_available_time(cleaning_date=cleaning_date).values()
+        )
+        return
+
+    def test_calendar_stream_is_computed_in_chunks(
+            self, client, django_assert_num_queries) -> None:
+        """
+        Проверяет, что потоковый график отдает первые дни до расчета
+        остальных дней и совпадает с графиком, рассчитанным целиком.
+        """
+        date_from: date = date.today()
+        date_to: date = date_from + timedelta(
+            days=SCHEDULE_CALENDAR_MAX_DAYS - 1
+        )
+        stream = stream_available_calendar_json(
+            date_from=date_from, date_to=date_to, total_time=60,
+        )
+        with django_assert_num_queries(AVAILABLE_TIME_QUERIES):
+            lines: list[str] = [
+                next(stream)
+                for _ in range(SCHEDULE_CALENDAR_STREAM_CHUNK_DAYS)
+            ]
+        chunks: int = -(
+            -SCHEDULE_CALENDAR_MAX_DAYS // SCHEDULE_CALENDAR_STREAM_CHUNK_DAYS
+        )
+        with django_assert_num_queries(AVAILABLE_TIME_QUERIES * (chunks - 1)):
+            lines += list(stream)
+        calendar: dict[str, dict[str, bool]] = {}
+        for line in lines:
+            calendar.update(json.loads(line))
+        cache.clear()
+        assert calendar == get_available_calendar_json(
+            date_from=date_from, date_to=date_to, total_time=60,
+        )
+        return
+
+    def test_holidays_and_work_hours(self, client) -> None:
+        """
+        Проверяет, что в нерабочий день доступного времени нет, а в рабочий
+        день уборка должна начинаться и заканчиваться в рабочие часы.
+        """
+        cleaning_date: date = date.today() + timedelta(days=1)
+        schedule: dict[str, bool] = self.get_available_time(
+            cleaning_date=cleaning_date, total_time=60,
+        )
+        assert {
+            label for label, available in schedule.items() if available
+        } == {
+            f'{hour:02}:{minute:02}'
+            for hour in range(9, 20) for minute in (0, 30)
+        } | {'20:00'}
+        assert get_slot_grid().is_work_interval(
+            cleaning_date=cleaning_date, start=20 * 60, duration=60,
+        )
+        assert not get_slot_grid().is_work_interval(
+            cleaning_date=cleaning_date, start=20 * 60 + 30, duration=60,
+        )
+        Holiday.objects.create(date=cleaning_date, title='Праздник')
+        cache.clear()
+        assert not any(
+            get_available_time_json(
+                cleaning_date=cleaning_date, total_time=60,
+            ).values()
+        )
+        day: DayAvailability = DayAvailability.load(cleaning_date)
+        assert day.masks == {}
+        assert day.get_free_cleaners(start=12 * 60, duration=60) == []
+        return
+
+    def test_free_runs_bitmask_matches_matrix(self) -> None:
+        """
+        Проверяет, что расчет свободных окон перебором битовых масок
+        совпадает с расчетом матричными операциями.
+        """
+        pytest.importorskip('numpy')
+        generator: random.Random = random.Random(0)
+        starts: list[int] = list(get_slot_grid().starts) + [1, 59, 1439]
+        for _ in range(50):
+            masks: list[int] = []
+            for _ in range(generator.randint(1, 6)):
+                mask: int = 0
+                for _ in range(generator.randint(1, 4)):
+                    mask |= interval_mask(
+                        start=generator.randrange(0, 1440),
+                        duration=generator.randint(1, 300),
+                    )
+                masks.append(mask)
+            assert get_free_runs_bitmask(
+                masks=masks, starts=starts
+            ) == get_free_runs_matrix(masks=masks, starts=starts)
+        for masks in ([], [0], [0, interval_mask(start=60, duration=60)]):
+            assert get_free_runs_bitmask(
+                masks=masks, starts=starts
+            ) == get_free_runs_matrix(masks=masks, starts=starts)
+        return
+
+
+@pytest.mark.django_db
+class TestCleanerAssignment():
+    """Производит тест выбора уборщика для заказа."""
+
+    def test_least_booked_strategy(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что стратегия least_booked первым выбирает уборщика
+        с наименьшей продолжительностью заказов в день уборки, а причина
+        выбора уборщика сохраняется в заказе.
+        """
+        response = client.post(
+            '/api/orders/',
+            get_order_data(cleaning_type, services[:1], house=1),
+            format='json',
+        )
+        assert response.status_code == 201, response.content
+        order: Order = Order.objects.get()
+        assert order.cleaner_assignment_reason.startswith(
+            f'{CLEANER_ASSIGNMENT_STRATEGY}: '
+        )
+        cleaner: User = User.objects.create(
+            email='cleaner2@email.com', is_cleaner=True,
+        )
+        decision: AssignmentDecision = get_assignment_strategy(
+            'least_booked'
+        ).choose(
+            cleaning_date=order.cleaning_date,
+            cleaning_time=time(17),
+            total_time=60,
+        )
+        assert decision.cleaners_ids == [cleaner.id, order.cleaner_id]
+        assert decision.reasons[order.cleaner_id] == (
+            f'Минут заказов в день уборки: {order.total_time}.'
+        )
+        return
+
+    def test_route_ranking_is_deterministic(self) -> None:
+        """
+        Проверяет, что порядок уборщиков не зависит от порядка маршрутов:
+        первым выбирается уборщик с заказом на той же улице, уборщики
+        без заказов с одинаковой стоимостью упорядочиваются по id.
+        """
+        stop = get_route_stop(
+            order_id=0,
+            cleaning_time=time(12),
+            total_time=60,
+            city='Москва',
+            street='Тверская',
+        )
+        routes: list[CleanerRoute] = [
+            CleanerRoute(cleaner_id=cleaner_id) for cleaner_id in range(1, 6)
+        ]
+        routes[3].insert(
+            get_route_stop(
+                order_id=1,
+                cleaning_time=time(9),
+                total_time=60,
+                city='Москва',
+                street='Тверская',
+            )
+        )
+        ranked: list[int] = [
+            route.cleaner_id for route, _ in rank_routes(routes, stop)
+        ]
+        for seed in range(5):
+            shuffled: list[CleanerRoute] = routes.copy()
+            random.Random(seed).shuffle(shuffled)
+            assert [
+                route.cleaner_id for route, _ in rank_routes(shuffled, stop)
+            ] == ranked
+        assert ranked == [4, 1, 2, 3, 5]
+        return
+
+    def test_route_fallback_keeps_free_cleaners(self) -> None:
+        """
+        Проверяет, что если до заказа в другом городе не успевает доехать
+        ни один уборщик, выбираются уборщики, свободные с единым временем
+        на дорогу, начиная с наименее загруженного.
+        """
+        stop = get_route_stop(
+            order_id=0,
+            cleaning_time=time(12),
+            total_time=60,
+            city='Казань',
+            street='Баумана',
+        )
+        routes: list[CleanerRoute] = [
+            CleanerRoute(cleaner_id=cleaner_id) for cleaner_id in range(1, 4)
+        ]
+        for route, start, total_time in (
+                (routes[0], time(10), 105),
+                (routes[1], time(10), 90),
+                (routes[2], time(11), 60)):
+            route.insert(
+                get_route_stop(
+                    order_id=route.cleaner_id,
+                    cleaning_time=start,
+                    total_time=total_time,
+                    city='Москва',
+                    street='Тверская',
+                )
+            )
+        assert rank_routes(routes, stop) == []
+        assert [
+            (route.cleaner_id, cost)
+            for route, cost in rank_booking_routes(routes, stop)
+        ] == [(2, None), (1, None)]
+        return
+
+    def test_route_aware_accepts_free_slot(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что заказ в другом городе на время, которое график
+        доступного времени показывает свободным, не отклоняется стратегией
+        route_aware.
+        """
+        response = client.post(
+            '/api/orders/',
+            get_order_data(cleaning_type, services[:1], house=1),
+            format='json',
+        )
+        assert response.status_code == 201, response.content
+        order: Order = Order.objects.get()
+        data: dict[str, any] = get_order_data(
+            cleaning_type, services[:1], house=1
+        )
+        data['address']['city'] = 'Казань'
+        data['cleaning_time'] = '15:00'
+        response = client.post('/api/orders/', data, format='json')
+        assert response.status_code == 201, response.content
+        other: Order = Order.objects.exclude(id=order.id).get()
+        assert other.cleaner_id == order.cleaner_id
+        assert other.cleaner_assignment_reason == (
+            f'{CLEANER_ASSIGNMENT_STRATEGY}: Маршрут не учтен: до заказа '
+            'не успевает доехать ни один уборщик, выбран наименее загруженный.'
+        )
+        return
+
+
+@pytest.mark.django_db
+class TestOrderReschedule():
+    """Производит тест переноса заказа на другие день или время."""
+
+    def update_order(self, client: APIClient, order: Order, data: dict):
+        """Изменяет заказ и возвращает ответ."""
+        return client.put(f'/api/orders/{order.id}/', data, format='json')
+
+    def test_busy_cleaner_is_reassigned(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что заказ нельзя перенести на время, когда уборщик
+        занят, а других свободных уборщиков нет, и что при наличии
+        свободного уборщика он назначается заказу.
+        """
+        for house in (1, 2):
+            response = client.post(
+                '/api/orders/',
+                get_order_data(cleaning_type, services[:1], house=house),
+                format='json',
+            )
+            assert response.status_code == 201, response.content
+        first, second = Order.objects.order_by('cleaning_time')
+        assert first.cleaner_id == second.cleaner_id
+        response = self.update_order(
+            client=client, order=second, data={'cleaning_time': '12:30'},
+        )
+        assert response.status_code == 400, response.content
+        second.refresh_from_db()
+        assert str(second.cleaning_time) == '15:00:00'
+        cleaner: User = User.objects.create(
+            email='cleaner2@email.com', is_cleaner=True,
+        )
+        response = self.update_order(
+            client=client, order=second, data={'cleaning_time': '12:30'},
+        )
+        assert response.status_code == 200, response.content
+        second.refresh_from_db()
+        assert second.cleaner == cleaner
+        assert second.busy_interval.cleaner == cleaner
+        return
+
+    def test_interval_conflict_is_bad_request(
+            self, client, services, cleaning_type, monkeypatch) -> None:
+        """
+        Проверяет, что отклоненный базой данных интервал занятости
+        при изменении заказа возвращает ошибку 400.
+        """
+        response = client.post(
+            '/api/orders/',
+            get_order_data(cleaning_type, services[:1], house=1),
+            format='json',
+        )
+        assert response.status_code == 201, response.content
+
+        def conflict(order: Order, **kwargs) -> None:
+            raise IntegrityError(
+                f'conflicting key value violates exclusion constraint '
+                f'"{BUSY_INTERVAL_EXCLUSION_CONSTRAINT}"'
+            )
+
+        monkeypatch.setattr(Order, 'update_busy_interval', conflict)
+        response = self.update_order(
+            client=client,
+            order=Order.objects.get(),
+            data={'comment': 'Позвонить за час.'},
+        )
+        assert response.status_code == 400, response.content
+        return
+
+    def test_cancelled_order_is_reassigned(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что возобновленному заказу назначается свободный
+        уборщик, если прежнего уборщика успел занять другой заказ.
+        """
+        for house in (1, 2):
+            response = client.post(
+                '/api/orders/',
+                {
+                    **get_order_data(cleaning_type, services[:1], house=house),
+                    'cleaning_time': '12:00',
+                },
+                format='json',
+            )
+            assert response.status_code == 201, response.content
+            if house == 1:
+                order: Order = Order.objects.get()
+                response = self.update_order(
+                    client=client,
+                    order=order,
+                    data={
+                        'order_status': ORDER_CANCELLED_STATUS,
+                        'comment_cancel': 'Планы изменились.',
+                    },
+                )
+                assert response.status_code == 200, response.content
+        cleaner: User = User.objects.create(
+            email='cleaner2@email.com', is_cleaner=True,
+        )
+        order.refresh_from_db()
+        # INFO: API позволяет установить только статус отмены заказа.
+        AdminOrderPatchSerializer().update(
+            instance=order,
+            validated_data={'order_status': ORDER_CREATED_STATUS},
+        )
+        order.refresh_from_db()
+        assert order.cleaner == cleaner
+        assert order.busy_interval.cleaner == cleaner
+        return
+
+    def test_cleaner_is_kept(self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что при переносе заказа уборщик остается, если его
+        занимает только сам переносимый заказ, и что заказ нельзя
+        перенести за пределы рабочих часов.
+        """
+        response = client.post(
+            '/api/orders/',
+            get_order_data(cleaning_type, services[:1], house=1),
+            format='json',
+        )
+        assert response.status_code == 201, response.content
+        order: Order = Order.objects.get()
+        cleaner_id: int = order.cleaner_id
+        response = self.update_order(
+            client=client, order=order, data={'cleaning_time': '12:30'},
+        )
+        assert response.status_code == 200, response.content
+        order.refresh_from_db()
+        assert order.cleaner_id == cleaner_id
+        assert order.busy_interval.cleaner_id == cleaner_id
+        response = self.update_order(
+            client=client, order=order, data={'cleaning_time': '08:00'},
+        )
+        assert response.status_code == 400, response.content
+        return
+
+
+@pytest.mark.django_db
+class TestOrderQuote():
+    """Производит тест расчета стоимости заказа по каталогу услуг."""
+
+    @pytest.mark.parametrize(
+        ('title', 'additional', 'total_sum', 'total_time'),
+        (
+            # INFO: выезд 800 руб. и 60 мин. один раз, услуги набора
+            #       за каждую из двух комнат, затем коэффициент набора.
+            ('Поддерживающая', {}, 800 + 2 * 3600, 60 + 2 * 110),
+            ('Генеральная', {}, 800 + 2 * 4800, 60 + 2 * 150),
+            ('После ремонта', {}, (800 + 2 * 4000) * 2, 60 + 2 * 130),
+            (
+                'Поддерживающая', {'Мытье окон': 3},
+                800 + 2 * 3600 + 3 * 450, 60 + 2 * 110 + 3 * 15,
+            ),
+        ),
+    )
+    def test_catalog_prices(
+            self, client, catalog, title, additional, total_sum,
+            total_time) -> None:
+        """
+        Проверяет стоимость и продолжительность заказов по наборам услуг
+        каталога: услуги набора оплачиваются по единице измерения.
+        """
+        services: dict[str, int] = dict(
+            Service.objects.filter(
+                title__in=additional
+            ).values_list('title', 'id')
+        )
+        response = client.post(
+            '/api/orders/quote/',
+            {
+                'cleaning_type': catalog[title].id,
+                'services': [
+                    {'id': services[service], 'amount': amount}
+                    for service, amount in additional.items()
+                ],
+                'rooms_number': 2,
+                'bathrooms_number': 1,
+            },
+            format='json',
+        )
+        assert response.status_code == 200, response.content
+        assert response.json() == {
+            'total_sum': total_sum,
+            'total_time': total_time,
+        }
+        return
+
+
+@pytest.mark.django_db
+class TestOrderIdempotency():
+    """Производит тест создания заказа с заголовком Idempotency-Key."""
+
+    def post_order(self, client: APIClient, data: dict, key: str):
+        """Отправляет запрос создания заказа с ключом идемпотентности."""
+        return client.post(
+            '/api/orders/', data, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_replay_returns_first_response(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что повторный запрос с тем же ключом получает ответ
+        первого запроса без запросов к базе данных.
+        """
+        data: dict[str, any] = get_order_data(
+            cleaning_type, services[:1], house=1
+        )
+        response = self.post_order(client=client, data=data, key='order-1')
+        assert response.status_code == 201, response.content
+        with CaptureQueriesContext(connection) as context:
+            replay = self.post_order(client=client, data=data, key='order-1')
+        assert replay.status_code == 201
+        assert replay.json() == response.json()
+        assert replay['Idempotent-Replayed'] == 'true'
+        assert not context.captured_queries
+        assert Order.objects.count() == 1
+        return
+
+    def test_replay_without_cache(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что при отсутствии ответа в кэше он берется
+        из базы данных.
+        """
+        data: dict[str, any] = get_order_data(
+            cleaning_type, services[:1], house=1
+        )
+        self.post_order(client=client, data=data, key='order-1')
+        cache.clear()
+        replay = self.post_order(client=client, data=data, key='order-1')
+        assert replay.status_code == 201
+        assert replay['Idempotent-Replayed'] == 'true'
+        assert Order.objects.count() == 1
+        return
+
+    def test_key_reuse_with_other_data(
+            self, client, services, cleaning_type) -> None:
+        """Проверяет, что ключ нельзя использовать для другого заказа."""
+        self.post_order(
+            client=client,
+            data=get_order_data(cleaning_type, services[:1], house=1),
+            key='order-1',
+        )
+        response = self.post_order(
+            client=client,
+            data=get_order_data(cleaning_type, services[:1], house=2),
+            key='order-1',
+        )
+        assert response.status_code == 422
+        assert Order.objects.count() == 1
+        return
+
+    def test_locked_key_returns_conflict(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что запрос с ключом, который обрабатывается параллельным
+        запросом, сразу получает ошибку 409.
+        """
+        data: dict[str, any] = get_order_data(
+            cleaning_type, services[:1], house=1
+        )
+        request = SimpleNamespace(
+            user=User.objects.get(email=ORDER_USER_DATA['email']),
+            method='POST',
+            path='/api/orders/',
+        )
+        key: str = get_request_key(request=request, key='order-1')
+        with lock_request_key(key=key):
+            response = self.post_order(client=client, data=data, key='order-1')
+        assert response.status_code == 409, response.content
+        assert not Order.objects.exists()
+        response = self.post_order(client=client, data=data, key='order-1')
+        assert response.status_code == 201, response.content
+        return
+
+    def test_concurrently_stored_response_is_replayed(
+            self, client, services, cleaning_type, monkeypatch) -> None:
+        """
+        Проверяет, что если ответ на запрос с тем же ключом успел сохранить
+        параллельный запрос, изменения запроса отменяются и возвращается
+        сохраненный ответ.
+        """
+        data: dict[str, any] = get_order_data(
+            cleaning_type, services[:1], house=1
+        )
+        request = SimpleNamespace(
+            user=User.objects.get(email=ORDER_USER_DATA['email']),
+            method='POST',
+            path='/api/orders/',
+            data=data,
+        )
+        IdempotencyKey.objects.create(
+            key=get_request_key(request=request, key='order-1'),
+            fingerprint=get_request_fingerprint(request=request),
+            status_code=201,
+            response={'Статус': 'Заказ создан.'},
+        )
+        get_stored_response = idempotency.get_stored_response
+        calls: list[str] = []
+
+        def stored_after_view(key: str) -> Optional[StoredResponse]:
+            # INFO: параллельный запрос сохраняет ответ, пока выполняется
+            #       представление этого запроса.
+            calls.append(key)
+            if len(calls) <= 2:
+                return None
+            return get_stored_response(key=key)
+
+        monkeypatch.setattr(
+            idempotency, 'get_stored_response', stored_after_view
+        )
+        response = self.post_order(client=client, data=data, key='order-1')
+        assert response.status_code == 201, response.content
+        assert response['Idempotent-Replayed'] == 'true'
+        assert response.json() == {'Статус': 'Заказ создан.'}
+        assert not Order.objects.exists()
+        return
+
+
+@pytest.mark.django_db
+class TestOrderBatch():
+    """Производит тест пакетного создания заказов."""
+
+    def post_batch(self, client: APIClient, orders: list[dict]):
+        """Отправляет пакет заказов и возвращает ответ и число запросов."""
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(
+                '/api/orders/batch/', {'orders': orders}, format='json'
+            )
+        return response, len(context.captured_queries)
+
+    def get_orders(
+            self,
+            cleaning_type: CleaningType,
+            services: list[Service],
+            count: int) -> list[dict]:
+        """Возвращает пакет заказов на разные адреса одного дня."""
+        orders: list[dict] = []
+        for number in range(count):
+            order: dict[str, any] = get_order_data(
+                cleaning_type, services[:number % 3 + 1], house=number
+            )
+            order['cleaning_time'] = f'{9 + number % 4 * 3:02}:00'
+            order.pop('user')
+            orders.append(order)
+        return orders
+
+    def test_rows_errors_do_not_abort_batch(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что заказы с ошибками не прерывают создание остальных
+        заказов, а уборщики назначаются без пересечений.
+        """
+        User.objects.bulk_create(
+            User(email=f'cleaner{number}@email.com', is_cleaner=True)
+            for number in range(3)
+        )
+        orders: list[dict] = self.get_orders(cleaning_type, services, 8)
+        orders[1]['cleaning_type'] = 0
+        orders[2]['services'] = [{'id': '0', 'amount': '1'}]
+        orders[3]['address'] = orders[0]['address']
+        orders[3]['cleaning_time'] = orders[0]['cleaning_time']
+        del orders[4]['cleaning_date']
+        response, _ = self.post_batch(client=client, orders=orders)
+        assert response.status_code == 201, response.content
+        results: list[dict] = response.json()['results']
+        assert response.json()['created'] == 4
+        assert [result['row'] for result in results] == list(range(8))
+        assert {
+            index for index, result in enumerate(results)
+            if 'errors' in result
+        } == {1, 2, 3, 4}
+        assert Order.objects.count() == 4
+        assert not Order.objects.filter(cleaner__isnull=True).exists()
+        for order in Order.objects.all():
+            assert not Order.objects.filter(
+                cleaner=order.cleaner,
+                cleaning_date=order.cleaning_date,
+                cleaning_time__lt=order.cleaning_time_end,
+                cleaning_time_end__gt=order.cleaning_time,
+            ).exclude(pk=order.pk).exists()
+        return
+
+    def test_work_calendar_is_enforced(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что заказы пакета в нерабочий день и вне рабочих часов
+        отклоняются.
+        """
+        orders: list[dict] = self.get_orders(cleaning_type, services, 3)
+        orders[0]['cleaning_time'] = '08:00'
+        orders[1]['cleaning_date'] = str(date.today() + timedelta(days=2))
+        Holiday.objects.create(
+            date=orders[1]['cleaning_date'], title='Праздник',
+        )
+        response, _ = self.post_batch(client=client, orders=orders)
+        assert response.status_code == 201, response.content
+        assert response.json()['created'] == 1
+        assert {
+            index for index, result in enumerate(response.json()['results'])
+            if 'errors' in result
+        } == {0, 1}
+        return
+
+    def test_queries_count_does_not_depend_on_batch_size(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что количество запросов при создании пакета заказов
+        не зависит от количества заказов в пакете.
+        """
+        User.objects.bulk_create(
+            User(email=f'cleaner{number}@email.com', is_cleaner=True)
+            for number in range(15)
+        )
+        orders: list[dict] = self.get_orders(cleaning_type, services, 24)
+        _, small_batch_queries = self.post_batch(
+            client=client, orders=orders[:2]
+        )
+        _, large_batch_queries = self.post_batch(
+            client=client, orders=orders[2:]
+        )
+        assert small_batch_queries == large_batch_queries
+        assert Order.objects.count() == len(orders)
+        return
+
+
+@pytest.mark.django_db
+class TestOrderRecurrence():
+    """Производит тест создания заказов регулярных уборок."""
+
+    def create_recurrence(
+            self,
+            client: APIClient,
+            services: list[Service],
+            cleaning_type: CleaningType) -> OrderRecurrence:
+        """Создает еженедельную уборку по новому заказу."""
+        response = client.post(
+            '/api/orders/',
+            get_order_data(cleaning_type, services[:2], house=1),
+            format='json',
+        )
+        assert response.status_code == 201, response.content
+        return OrderRecurrence.objects.create(
+            template=Order.objects.get(), interval_weeks=1
+        )
+
+    def test_orders_are_created_incrementally(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что заказы создаются на заданное количество дней вперед
+        с услугами шаблонного заказа, а повторный запуск не создает
+        дубликатов.
+        """
+        recurrence: OrderRecurrence = self.create_recurrence(
+            client=client, services=services, cleaning_type=cleaning_type
+        )
+        template: Order = recurrence.template
+        created, skipped = materialize_recurring_orders()
+        # INFO: шаблонный заказ создан на завтра.
+        assert created == (RECURRENCE_MATERIALIZE_DAYS - 1) // 7
+        assert skipped == 0
+        assert materialize_recurring_orders() == (0, 0)
+        orders = Order.objects.filter(recurrence=recurrence)
+        assert orders.count() == created
+        assert not orders.exclude(cleaner=template.cleaner).exists()
+        assert ServicesInOrder.objects.filter(
+            order__recurrence=recurrence
+        ).count() == created * 2
+        recurrence.refresh_from_db()
+        assert recurrence.next_date == template.cleaning_date + timedelta(
+            weeks=created + 1
+        )
+        return
+
+    def test_busy_dates_are_skipped(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что даты без свободных уборщиков пропускаются
+        и сохраняются в skipped_dates.
+        """
+        recurrence: OrderRecurrence = self.create_recurrence(
+            client=client, services=services, cleaning_type=cleaning_type
+        )
+        busy_date: date = recurrence.next_date
+        response = client.post(
+            '/api/orders/',
+            {
+                **get_order_data(cleaning_type, services[:2], house=2),
+                'cleaning_date': str(busy_date),
+                'cleaning_time': str(recurrence.template.cleaning_time),
+            },
+            format='json',
+        )
+        assert response.status_code == 201, response.content
+        created, skipped = materialize_recurring_orders()
+        assert skipped == 1
+        recurrence.refresh_from_db()
+        assert recurrence.skipped_dates == [busy_date.isoformat()]
+        assert not recurrence.orders.filter(cleaning_date=busy_date).exists()
+        return
+
+    def test_work_calendar_is_enforced(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что даты, на которые уборка выходит за рабочие часы
+        или приходится на нерабочий день, пропускаются.
+        """
+        recurrence: OrderRecurrence = self.create_recurrence(
+            client=client, services=services, cleaning_type=cleaning_type
+        )
+        Holiday.objects.create(date=recurrence.next_date, title='Праздник')
+        created, skipped = materialize_recurring_orders()
+        assert (created, skipped) == (
+            (RECURRENCE_MATERIALIZE_DAYS - 1) // 7 - 1, 1
+        )
+        Order.objects.filter(pk=recurrence.template.pk).update(
+            cleaning_time='20:30'
+        )
+        OrderRecurrence.objects.filter(pk=recurrence.pk).update(
+            next_date=recurrence.next_date + timedelta(weeks=created + 1)
+        )
+        created, skipped = materialize_recurring_orders(
+            today=recurrence.next_date + timedelta(weeks=created + 1)
+        )
+        assert created == 0
+        assert skipped
+        return
+
+    def test_orders_follow_catalog_and_template(
+            self, client, services, cleaning_type,
+            django_capture_on_commit_callbacks) -> None:
+        """
+        Проверяет, что стоимость заказов рассчитывается по текущим ценам,
+        прошедшие пропущенные даты удаляются, а после отмены шаблонного
+        заказа регулярная уборка отключается.
+        """
+        recurrence: OrderRecurrence = self.create_recurrence(
+            client=client, services=services, cleaning_type=cleaning_type
+        )
+        template: Order = recurrence.template
+        recurrence.skipped_dates = ['2000-01-01']
+        recurrence.save()
+        with django_capture_on_commit_callbacks(execute=True):
+            services[0].price += 200
+            services[0].save()
+        created, _ = materialize_recurring_orders()
+        assert created
+        # INFO: услуга заказана в количестве 2, коэффициент набора 1.5.
+        assert set(
+            recurrence.orders.values_list('total_sum', flat=True)
+        ) == {template.total_sum + 200 * 2 * 1.5}
+        recurrence.refresh_from_db()
+        assert recurrence.skipped_dates == []
+        Order.objects.filter(pk=template.pk).update(
+            order_status=ORDER_CANCELLED_STATUS
+        )
+        assert materialize_recurring_orders(
+            today=recurrence.next_date
+        ) == (0, 0)
+        recurrence.refresh_from_db()
+        assert not recurrence.is_active
+        return
+
+
+@pytest.mark.django_db
+class TestOrderList():
+    """Производит тест получения списка заказов."""
+
+    def get_orders(self, client: APIClient) -> tuple[list[dict], int]:
+        """Возвращает список заказов и количество выполненных запросов."""
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/orders/')
+        assert response.status_code == 200, response.content
+        return response.json()['results'], len(context.captured_queries)
+
+    def test_queries_count_does_not_depend_on_orders(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что количество запросов при получении списка заказов
+        не зависит от количества заказов и услуг в них, а набор услуг
+        передается по id.
+        """
+        client.post(
+            '/api/orders/',
+            get_order_data(cleaning_type, services[:1], house=0),
+            format='json',
+        )
+        _, one_order_queries = self.get_orders(client=client)
+        client.post(
+            '/api/orders/',
+            get_order_data(cleaning_type, services, house=1),
+            format='json',
+        )
+        orders, two_orders_queries = self.get_orders(client=client)
+        assert one_order_queries == two_orders_queries
+        assert len(orders) == 2
+        for order in orders:
+            assert order['cleaning_type'] == cleaning_type.id
+            assert isinstance(order['user'], int)
+        return
+
+    def test_sparse_fields(self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что ?fields= ограничивает поля ответа и не загружает
+        связанные объекты, а ?expand= возвращает связанный объект целиком.
+        """
+        client.post(
+            '/api/orders/',
+            get_order_data(cleaning_type, services, house=0),
+            format='json',
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/orders/?fields=id,order_status')
+        assert response.status_code == 200, response.content
+        assert set(response.json()['results'][0]) == {'id', 'order_status'}
+        # INFO: страница заказов без услуг и адреса.
+        assert len(context.captured_queries) == 1
+        assert 'address' not in context.captured_queries[-1]['sql']
+        response = client.get(
+            '/api/orders/?fields=id,user,cleaning_type&expand=user'
+        )
+        order: dict[str, any] = response.json()['results'][0]
+        assert order['user']['email'] == ORDER_USER_DATA['email']
+        assert order['cleaning_type'] == cleaning_type.id
+        return
+
+    def test_keyset_pagination(self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что страницы заказов не пересекаются, вместе содержат
+        все заказы, а дальняя страница требует столько же запросов,
+        сколько первая.
+        """
+        client.post(
+            '/api/orders/',
+            get_order_data(cleaning_type, services[:1], house=0),
+            format='json',
+        )
+        order: Order = Order.objects.get()
+        fields: dict[str, any] = {
+            field.attname: getattr(order, field.attname)
+            for field in Order._meta.concrete_fields
+            if not field.primary_key
+        }
+        addresses: list[Address] = Address.objects.bulk_create(
+            Address(city='Москва', street='Тверская', house=house)
+            for house in range(1, 11)
+        )
+        # INFO: заказы в один день и одно время отличаются только id.
+        Order.objects.bulk_create(
+            Order(**{
+                **fields,
+                'address_id': address.id,
+                'cleaning_date': order.cleaning_date + timedelta(
+                    days=address.house % 3
+                ),
+                'cleaning_time': f'{8 + address.house % 2:02}:00',
+            })
+            for address in addresses
+        )
+        url: str = '/api/orders/?limit=3&fields=id'
+        pages: list[list[int]] = []
+        queries: set[int] = set()
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            assert response.status_code == 200, response.content
+            pages.append([order['id'] for order in response.json()['results']])
+            queries.add(len(context.captured_queries))
+            previous: Optional[str] = response.json()['previous']
+            url = response.json()['next']
+        assert len(queries) == 1
+        assert sum(pages, []) == list(
+            Order.objects.values_list('id', flat=True)
+        )
+        response = client.get(previous)
+        assert [
+            order['id'] for order in response.json()['results']
+        ] == pages[-2]
+        return
+
+    def test_invalid_cursor(self, client) -> None:
+        """
+        Проверяет, что курсор, не соответствующий сортировке заказов,
+        возвращает ошибку 404.
+        """
+        for position in ([], ['не дата', '10:00', 1], [None, None, None]):
+            cursor: str = urlsafe_b64encode(
+                json.dumps({'p': position}).encode()
+            ).decode()
+            response = client.get(f'/api/orders/?cursor={cursor}')
+            assert response.status_code == 404, response.content
+        return
+
+
+@pytest.mark.django_db
+class TestRatingAggregates():
+    """Производит тест агрегатов оценок отзывов."""
+
+    def get_histograms(self) -> list[tuple]:
+        """Возвращает счетчики всех агрегатов оценок."""
+        return sorted(
+            RatingAggregate.objects.values_list(
+                'source', 'cleaner', 'score_1', 'score_2', 'score_3',
+                'score_4', 'score_5',
+            ),
+            key=str,
+        )
+
+    def test_aggregates_follow_rating_changes(
+            self, client, services, cleaning_type) -> None:
+        """
+        Проверяет, что агрегаты оценок изменяются при создании, изменении
+        и удалении отзывов и совпадают с пересчитанными заново.
+        """
+        client.post(
+            '/api/orders/',
+            get_order_data(cleaning_type, services, house=0),
+            format='json',
+        )
+        order: Order = Order.objects.get()
+        assert order.cleaner is not None
+        Rating.objects.create(order=order, text='Отлично', score=5)
+        rating: Rating = Rating.objects.create(
+            order=order, text='Плохо', score=2,
+        )
+        Rating.objects.create(from_maps=True, text='Хорошо', score=3)
+        rating.score = 4
+        rating.save()
+        Rating.objects.filter(from_maps=True).delete()
+        response = APIClient().get('/api/ratings/summary/')
+        assert response.status_code == 200, response.content
+        summary: dict[str, dict] = response.json()
+        assert summary['total'] == summary['site'] == {
+            'count': 2,
+            'average': 4.5,
+            'histogram': {'1': 0, '2': 0, '3': 0, '4': 1, '5': 1},
+        }
+        assert summary['maps']['count'] == 0
+        assert summary['maps']['average'] is None
+        admin: APIClient = APIClient()
+        admin.force_authenticate(
+            User.objects.create(email='admin@email.com', is_staff=True)
+        )
+        response = admin.get('/api/ratings/cleaners/')
+        assert response.status_code == 200, response.content
+        assert [
+            (cleaner['cleaner'], cleaner['count'])
+            for cleaner in response.json()
+        ] == [(order.cleaner_id, 2)]
+        histograms: list[tuple] = self.get_histograms()
+        rebuild_rating_aggregates()
+        assert self.get_histograms() == histograms
+        return
+
+    def test_rating_save_is_counted_once(self, monkeypatch) -> None:
+        """
+        Проверяет, что сохранение отзыва обрабатывается сигналом один раз,
+        а оценки вне допустимого диапазона не учитываются.
+        """
+        cached: list[int] = []
+        monkeypatch.setattr(
+            'services.signals.update_cached_reviews',
+            lambda ratings: cached.extend(rating.pk for rating in ratings),
+        )
+        rating: Rating = Rating.objects.create(
+            from_maps=True, text='Хорошо', score=3,
+        )
+        assert cached == [rating.pk]
+        update_rating_aggregates(((RATING_SOURCE_MAPS, None, 0),))
+        assert self.get_histograms() == [
+            (RATING_SOURCE_MAPS, None, 0, 0, 1, 0, 0),
+        ]
+        return
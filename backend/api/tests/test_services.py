@@ -0,0 +1,389 @@
+from gzip import decompress
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+import json
+from pathlib import Path
+from smtplib import SMTPServerDisconnected
+from threading import Thread
+from typing import Iterator
+
+import pytest
+import requests
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.email_outbox import send_queued_emails
+from api.review_sources import import_reviews
+from api.utils import send_mail
+from cleanpro.app_data import (
+    SERVICES_ADDITIONAL, SERVICE_IMAGE_VARIANTS_SIZES,
+    SERVICE_IMAGE_VERSION_LEN,
+)
+from services.models import Measure, OutboxEmail, Rating, Service
+
+SERVICE_IMAGE_CONTENT: bytes = b'image content'
+YA_MAPS_FIXTURES: tuple[Path, ...] = (
+    Path(__file__).parent / 'fixtures' / 'yandex_maps_reviews.html',
+    Path(__file__).parent / 'fixtures' / 'yandex_maps_reviews_branch.html',
+)
+
+
+class ReviewsServer(ThreadingHTTPServer):
+    """Локальный сервер страницы отзывов."""
+
+    etag: str
+    requests: list[dict[str, str]]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> None:
+    cache.clear()
+    return
+
+
+@pytest.fixture
+def service(settings, tmp_path) -> Service:
+    settings.MEDIA_ROOT = tmp_path
+    return Service.objects.create(
+        title='Мытье окон',
+        price=100,
+        measure=Measure.objects.create(title='шт'),
+        image=SimpleUploadedFile('window.jpg', SERVICE_IMAGE_CONTENT),
+        service_type=SERVICES_ADDITIONAL,
+        cleaning_time=10,
+    )
+
+
+@pytest.mark.django_db
+class TestServiceImage():
+    """Производит тест представления изображений услуг."""
+
+    def get_service(self, query: str = '') -> dict[str, any]:
+        """Возвращает услугу из списка услуг."""
+        response = APIClient().get(f'/api/services/{query}')
+        assert response.status_code == 200, response.content
+        return response.json()[0]
+
+    def test_image_is_returned_by_url(self, service) -> None:
+        """
+        Проверяет, что изображение возвращается ссылкой с хэшем файла,
+        а размер и хэш изображения рассчитываются при сохранении услуги.
+        """
+        data: dict[str, any] = self.get_service()
+        assert data['image_size'] == len(SERVICE_IMAGE_CONTENT)
+        assert data['image_hash'] == service.image_hash
+        assert data['image'].endswith(
+            f'?v={service.image_hash[:SERVICE_IMAGE_VERSION_LEN]}'
+        )
+        return
+
+    def test_image_is_returned_in_base64_on_request(self, service) -> None:
+        """Проверяет, что изображение в base64 возвращается по запросу."""
+        data: dict[str, any] = self.get_service(query='?base64=true')
+        assert data['image'] == 'data:image/jpeg;base64,aW1hZ2UgY29udGVudA=='
+        return
+
+
+@pytest.mark.django_db
+class TestServiceImageVariants():
+    """Производит тест создания уменьшенных копий изображений услуг."""
+
+    def test_command_creates_variants(self, service) -> None:
+        """
+        Проверяет, что команда создает копии изображения всех размеров
+        в формате WebP, а API возвращает ссылки на них.
+        """
+        buffer: BytesIO = BytesIO()
+        Image.new('RGB', (1200, 800), 'white').save(buffer, format='JPEG')
+        service.image = SimpleUploadedFile('window.jpg', buffer.getvalue())
+        service.save()
+        call_command('create_service_image_variants', workers=2)
+        service.refresh_from_db()
+        assert set(service.image_variants) == set(
+            SERVICE_IMAGE_VARIANTS_SIZES
+        )
+        for size, max_side in SERVICE_IMAGE_VARIANTS_SIZES.items():
+            name: str = service.image_variants[size]['webp']
+            assert service.image_hash[:SERVICE_IMAGE_VERSION_LEN] in name
+            with default_storage.open(name) as file, Image.open(file) as image:
+                assert max(image.size) == max_side
+        data: dict[str, any] = APIClient().get('/api/services/').json()[0]
+        assert data['image_variants']['small']['webp'].endswith(
+            service.image_variants['small']['webp']
+        )
+        return
+
+
+@pytest.mark.django_db
+class TestCatalog():
+    """Производит тест получения снимка каталога."""
+
+    def test_not_modified_without_queries(
+            self, service, django_capture_on_commit_callbacks) -> None:
+        """
+        Проверяет, что запрос с актуальным ETag получает ответ 304
+        без запросов к базе данных, а изменение каталога меняет ETag.
+        """
+        client: APIClient = APIClient()
+        response = client.get('/api/catalog/')
+        assert response.status_code == 200
+        assert [
+            item['id'] for item in json.loads(response.content)['services']
+        ] == [service.id]
+        etag: str = response['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/catalog/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert not context.captured_queries
+        with django_capture_on_commit_callbacks(execute=True):
+            service.save()
+        response = client.get('/api/catalog/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+        return
+
+    def test_snapshot_urls_are_absolute(self, service, monkeypatch) -> None:
+        """
+        Проверяет, что ссылки на изображения в снимке каталога строятся
+        по адресу сайта и совпадают со ссылками списка услуг.
+        """
+        monkeypatch.setattr(
+            'api.catalog.CLEANPRO_BASE_URL', 'http://testserver'
+        )
+        client: APIClient = APIClient()
+        catalog: dict = json.loads(client.get('/api/catalog/').content)
+        services: list[dict] = client.get('/api/services/').json()
+        assert catalog['services'][0]['image'].startswith(
+            'http://testserver/media/'
+        )
+        assert catalog['services'][0]['image'] == services[0]['image']
+        return
+
+    def test_gzipped_snapshot(self, service) -> None:
+        """Проверяет, что снимок отдается сжатым по запросу клиента."""
+        response = APIClient().get(
+            '/api/catalog/', HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        assert response['Content-Encoding'] == 'gzip'
+        assert json.loads(decompress(response.content))['services']
+        return
+
+
+@pytest.mark.django_db
+class TestReviewsCache():
+    """Производит тест кэша отзывов."""
+
+    def get_ratings(self, url: str) -> tuple[dict[str, any], int]:
+        """
+        Возвращает страницу отзывов и количество выполненных запросов.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get(url)
+        assert response.status_code == 200, response.content
+        return response.json(), len(context.captured_queries)
+
+    def test_pages_are_served_from_cache(
+            self, django_capture_on_commit_callbacks) -> None:
+        """
+        Проверяет, что страницы отзывов читаются из кэша, а создание,
+        изменение и удаление отзыва изменяют кэш без его перестроения.
+        """
+        with django_capture_on_commit_callbacks(execute=True):
+            ratings: list[Rating] = [
+                Rating.objects.create(
+                    username=f'Гость {number}', text='Отлично', score=5,
+                )
+                for number in range(3)
+            ]
+        page, _ = self.get_ratings('/api/ratings/?limit=2')
+        assert [review['id'] for review in page['results']] == [
+            rating.id for rating in ratings[:0:-1]
+        ]
+        page, queries = self.get_ratings(page['next'])
+        assert [review['id'] for review in page['results']] == [ratings[0].id]
+        assert page['next'] is None and page['previous'] is not None
+        assert queries == 0
+        with django_capture_on_commit_callbacks(execute=True):
+            ratings[1].text = 'Хорошо'
+            ratings[1].save()
+            new_rating: Rating = Rating.objects.create(
+                username='Гость', text='Быстро', score=4,
+            )
+            ratings[2].delete()
+        page, queries = self.get_ratings('/api/ratings/')
+        assert queries == 0
+        assert [
+            (review['id'], review['text']) for review in page['results']
+        ] == [
+            (new_rating.id, 'Быстро'),
+            (ratings[1].id, 'Хорошо'),
+            (ratings[0].id, 'Отлично'),
+        ]
+        return
+
+
+@pytest.fixture
+def reviews_servers() -> Iterator[list[ReviewsServer]]:
+    """
+    Запускает локальные HTTP-серверы страниц отзывов двух филиалов.
+    Серверы отдают страницу частями и отвечают 304 на запрос
+    с актуальным ETag.
+    """
+    servers: list[ReviewsServer] = []
+    for fixture in YA_MAPS_FIXTURES:
+
+        class Handler(BaseHTTPRequestHandler):
+            html: bytes = fixture.read_bytes()
+
+            def do_GET(self) -> None:
+                server: ReviewsServer = self.server
+                server.requests.append(dict(self.headers))
+                if self.headers.get('If-None-Match') == server.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('ETag', server.etag)
+                self.send_header('Content-Length', str(len(self.html)))
+                self.end_headers()
+                for start in range(0, len(self.html), 100):
+                    self.wfile.write(self.html[start:start + 100])
+                    self.wfile.flush()
+                return
+
+            def log_message(self, *args) -> None:
+                return
+
+        server: ReviewsServer = ReviewsServer(('127.0.0.1', 0), Handler)
+        server.etag = '"v1"'
+        server.requests = []
+        Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.django_db
+class TestReviewSources():
+    """Производит тест загрузки отзывов со страниц отзывов."""
+
+    def get_pages(
+            self, servers: list[ReviewsServer]) -> list[tuple[str, str]]:
+        """Возвращает страницы отзывов локальных серверов."""
+        return [
+            ('yandex_maps', f'http://127.0.0.1:{server.server_port}/')
+            for server in servers
+        ]
+
+    def test_import_is_idempotent(self, reviews_servers) -> None:
+        """
+        Проверяет, что отзывы со страниц всех филиалов сохраняются один
+        раз, а неизмененные страницы запрашиваются условным запросом.
+        """
+        pages: list[tuple[str, str]] = self.get_pages(reviews_servers)
+        assert import_reviews(pages=pages) == 4
+        assert sorted(
+            Rating.objects.values_list('username', 'score', 'text')
+        ) == [
+            (
+                'Анна К.', 5,
+                'Убрали квартиру после ремонта за один день, всё блестит.',
+            ),
+            ('Мария Петровна', 3, 'Окна помыли отлично, а кухню не до конца.'),
+            ('Олег & Ко', 2, 'Офис убрали быстро, но пыль осталась.'),
+            ('Сергей', 4, 'Хорошо, но опоздали на полчаса.'),
+        ]
+        assert import_reviews(pages=pages) == 0
+        reviews_servers[0].etag = '"v2"'
+        assert import_reviews(pages=pages) == 0
+        assert Rating.objects.count() == 4
+        assert [
+            request.get('If-None-Match')
+            for request in reviews_servers[0].requests
+        ] == [None, '"v1"', '"v1"']
+        assert [
+            request.get('If-None-Match')
+            for request in reviews_servers[1].requests
+        ] == [None, '"v1"', '"v1"']
+        return
+
+    def test_failed_page_does_not_block_others(
+            self, reviews_servers) -> None:
+        """
+        Проверяет, что отзывы доступных страниц сохраняются, если
+        одну из страниц загрузить не удалось.
+        """
+        pages: list[tuple[str, str]] = self.get_pages(reviews_servers[:1])
+        reviews_servers[1].shutdown()
+        reviews_servers[1].server_close()
+        pages += self.get_pages(reviews_servers[1:])
+        with pytest.raises(requests.ConnectionError):
+            import_reviews(pages=pages)
+        assert Rating.objects.count() == 3
+        return
+
+
+@pytest.mark.django_db
+class TestEmailOutbox():
+    """Производит тест очереди исходящих писем."""
+
+    def test_email_is_sent_after_commit(
+            self, django_capture_on_commit_callbacks) -> None:
+        """
+        Проверяет, что письмо сохраняется в очередь одним запросом
+        и отправляется после фиксации транзакции.
+        """
+        with django_capture_on_commit_callbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                send_mail(subject='Тема', message='Текст', to=('a@b.com',))
+            assert len(queries) == 1
+            assert not mail.outbox
+        assert [
+            (message.subject, message.body, message.to)
+            for message in mail.outbox
+        ] == [('Тема', 'Текст', ['a@b.com'])]
+        assert not OutboxEmail.objects.exists()
+        return
+
+    def test_failed_email_is_retried(self, monkeypatch) -> None:
+        """
+        Проверяет, что неотправленное письмо остается в очереди
+        и отправляется при следующей попытке.
+        """
+        send_mail(subject='Тема', message='Текст', to=('a@b.com',))
+        send_mail(subject='Тема 2', message='Текст 2', to=('c@d.com',))
+
+        def send_messages(backend, messages) -> int:
+            if messages[0].to == ['a@b.com']:
+                raise SMTPServerDisconnected('Connection lost')
+            mail.outbox.extend(messages)
+            return len(messages)
+
+        with monkeypatch.context() as patch:
+            patch.setattr(EmailBackend, 'send_messages', send_messages)
+            assert send_queued_emails() == 2
+        assert [message.subject for message in mail.outbox] == ['Тема 2']
+        email: OutboxEmail = OutboxEmail.objects.get()
+        assert email.attempts == 1
+        assert email.next_attempt > timezone.now()
+        assert 'Connection lost' in email.error
+        assert send_queued_emails() == 0
+        OutboxEmail.objects.update(next_attempt=timezone.now())
+        assert send_queued_emails() == 1
+        assert [message.subject for message in mail.outbox] == [
+            'Тема 2', 'Тема',
+        ]
+        assert not OutboxEmail.objects.exists()
+        return
@@ -4,6 +4,7 @@ from rest_framework import routers
 from api.views import (
     TokenDestroySchemaView,
     TokenCreateSchemaView,
+    CatalogViewSet,
     CleaningTypeViewSet,
     MeasureViewSet,
     OrderViewSet,
@@ -16,6 +17,7 @@ app_name = 'api'
 
 router = routers.DefaultRouter()
 ROUTER_DATA = (
+    ('catalog', CatalogViewSet, 'catalog'),
     ('cleaning-types', CleaningTypeViewSet, 'cleaning-types'),
     ('measure', MeasureViewSet, 'measure'),
     ('orders', OrderViewSet, 'orders'),
@@ -4,17 +4,23 @@
 
 from datetime import date, datetime, time, timedelta
 import hashlib
+import json
 import random
 import string
+from typing import Iterator, Optional
 
-from django.core import mail
-from django.db.models import Q, QuerySet
+from django.db import IntegrityError
+from django.db.models import Exists, OuterRef, Q, QuerySet
+from django.utils import timezone
 
+from api.email_outbox import queue_email
+from api.work_calendar import SlotGrid, get_slot_grid, is_work_time
 from cleanpro.app_data import (
-    DEFAULT_FROM_EMAIL, PASS_ITERATIONS, SCHEDULE_WORK_START_H,
-    SCHEDULE_WORK_STOP_H, SECRET_SALT, USER_PASS_RAND_CYCLES,
+    BUSY_INTERVAL_EXCLUSION_CONSTRAINT,
+    PASS_ITERATIONS, ROUTE_TRAVEL_BUFFER_MIN,
+    SCHEDULE_CALENDAR_STREAM_CHUNK_DAYS, SECRET_SALT, USER_PASS_RAND_CYCLES,
 )
-from services.models import Order
+from services.models import CleanerBusyInterval, Holiday
 from users.models import Address, User
 
 
@@ -34,6 +40,14 @@ def create_password(email: str) -> str:
     return ''.join(pass_chars)
 
 
+def is_busy_interval_conflict(error: IntegrityError) -> bool:
+    """
+    Проверяет, что ошибка целостности вызвана пересечением интервалов
+    занятости уборщика.
+    """
+    return BUSY_INTERVAL_EXCLUSION_CONSTRAINT in str(error)
+
+
 def get_or_create_address(address_data) -> Address:
     """Получить или создать объект адреса."""
     address, _ = Address.objects.get_or_create(
@@ -49,20 +63,13 @@ def get_or_create_address(address_data) -> Address:
 
 def send_mail(subject: str, message: str, to: tuple[str]) -> None:
     """
-    Отправляет электронное сообщение списку пользователей в to.
+    Ставит в очередь электронное сообщение списку пользователей в to.
     Назначает subject темой письма и message текстом.
 
-    "backend=None" означает, что бекенд будет выбран согласно указанному
-    значению в settings.EMAIL_BACKEND.
-    """
-    with mail.get_connection(backend=None, fail_silently=False) as conn:
-        mail.EmailMessage(
-            subject=subject,
-            body=message,
-            from_email=DEFAULT_FROM_EMAIL,
-            to=to,
-            connection=conn
-        ).send(fail_silently=False)
+    Письмо сохраняется в транзакции запроса и отправляется задачей
+    send_queued_emails после ее фиксации (см. api.email_outbox).
+    """
+    queue_email(subject=subject, message=message, to=to)
     return
 
 
@@ -70,101 +77,166 @@ def get_available_cleaners(
         cleaning_date: date,
         cleaning_time: time,
         total_time: int,
-        order_set: QuerySet = None,
-        cleaning_end_time: time = None) -> QuerySet:
+        order_id: Optional[int] = None) -> QuerySet:
     """
     Получает данные об уборке (дата, время, продолжительность) и возвращает
     список пользователей, которые доступны для ее выполнения.
+
+    Занятость каждого уборщика проверяется одним поиском по индексу
+    интервалов занятости CleanerBusyInterval. Между заказами уборщика
+    должно оставаться не менее ROUTE_TRAVEL_BUFFER_MIN минут на дорогу.
+    Интервал занятости заказа order_id (переносимого заказа) не учитывается.
+
+    В нерабочий день (Holiday) и для уборки, выходящей за рабочие часы
+    дня (SCHEDULE_WORK_HOURS), доступных уборщиков нет. Через эту функцию
+    проходит любое назначение уборщика, поэтому рабочий календарь
+    соблюдается не только при показе доступного времени.
     """
-    if cleaning_end_time is None:
-        cleaning_end_time: time = (
-            datetime.combine(cleaning_date, cleaning_time) +
-            timedelta(minutes=total_time)
-        ).time()
-    if order_set is None:
-        order_set: QuerySet = Order.objects.filter(cleaning_date=cleaning_date)
-    overlapping_orders: QuerySet = order_set.filter(
-        Q(
-            cleaning_time__gte=cleaning_time,
-            cleaning_time__lt=cleaning_end_time,
-        ) |
-        Q(
-            cleaning_time_end__gt=cleaning_time,
-            cleaning_time_end__lte=cleaning_end_time,
-        ) |
-        Q(
-            cleaning_time__lte=cleaning_time,
-            cleaning_time_end__gte=cleaning_end_time,
-        ) |
-        Q(
-            cleaning_time__gte=cleaning_time,
-            cleaning_time_end__lte=cleaning_end_time,
-        )
-    )
-    all_cleaners: QuerySet = User.objects.filter(
+    if not is_work_time(
+        cleaning_date=cleaning_date,
+        cleaning_time=cleaning_time,
+        total_time=total_time,
+    ):
+        return User.objects.none()
+    buffer: timedelta = timedelta(minutes=ROUTE_TRAVEL_BUFFER_MIN)
+    start: datetime = timezone.make_aware(
+        datetime.combine(cleaning_date, cleaning_time)
+    ) - buffer
+    end: datetime = start + timedelta(minutes=total_time) + buffer * 2
+    return User.objects.filter(
         is_cleaner=True,
     ).filter(
         Q(on_vacation_from__isnull=True) |
         Q(on_vacation_from__gt=cleaning_date) |
         Q(on_vacation_to__lt=cleaning_date)
+    ).exclude(
+        Exists(Holiday.objects.filter(date=cleaning_date))
+    ).exclude(
+        Exists(
+            CleanerBusyInterval.objects.filter(
+                cleaner=OuterRef('pk'),
+                end__gt=start,
+                start__lt=end,
+            ).exclude(
+                order_id=order_id,
+            )
+        )
     )
-    busy_cleaners: QuerySet = overlapping_orders.values_list(
-        'cleaner',
-        flat=True,
-    )
-    available_cleaners: QuerySet = all_cleaners.exclude(pk__in=busy_cleaners)
-    return available_cleaners
 
 
 def get_available_time_json(cleaning_date: date, total_time: int) -> dict:
     """
-    Возвращает словарь, где для каждого времени кратного 30 минутам
-    указана возможность бронирования заказа с указанной продолжительностью
-    в казанный день. Если указано True - заказ возможно оформить,
-    Если указано False - заказ оформить нельзя.
+    Возвращает словарь, где для каждого слота рабочего календаря
+    (см. api.work_calendar) указана возможность бронирования заказа
+    с указанной продолжительностью в указанный день. Если указано True -
+    заказ возможно оформить, если указано False - заказ оформить нельзя.
+
+    Занятость уборщиков берется из кэша, а при его отсутствии загружается
+    фиксированным количеством запросов вне зависимости от количества
+    слотов и уборщиков.
 
-    Формат ответа: {"00:00": False, "00:30": False, ... "23:30": False}
+    Формат ответа при шаге слотов 30 минут:
+    {"00:00": False, "00:30": False, ... "23:30": False}
     """
-    response_data: dict[str, bool] = schedule_generate_bool(value=False)
-    order_set: QuerySet = Order.objects.filter(cleaning_date=cleaning_date)
+    grid: SlotGrid = get_slot_grid()
     if cleaning_date < date.today():
-        return response_data
-    for current_time in response_data:
-        hour: int = int(current_time[:2])
-        if hour < SCHEDULE_WORK_START_H:
-            continue
-        minute: int = int(current_time[-2:])
-        cleaning_time = time(hour=hour, minute=minute)
-        cleaning_end_time: time = (
-            datetime.combine(cleaning_date, cleaning_time) +
-            timedelta(minutes=total_time)
-        ).time()
-        # TODO: сделать через datetime.
-        if cleaning_end_time.hour > SCHEDULE_WORK_STOP_H:
-            break
-        available_cleaners: QuerySet = get_available_cleaners(
-            cleaning_date=cleaning_date,
-            cleaning_time=cleaning_time,
+        return grid.get_empty_schedule()
+    free_runs: dict[date, dict[int, int]] = grid.get_free_runs(
+        dates=[cleaning_date]
+    )
+    return grid.fill_schedule(
+        cleaning_date=cleaning_date,
+        free_runs=free_runs[cleaning_date],
+        total_time=total_time,
+    )
+
+
+def iter_available_calendar(
+        date_from: date,
+        date_to: date,
+        total_time: int,
+        chunk_days: Optional[int] = None
+        ) -> Iterator[tuple[date, dict[str, bool]]]:  # noqa E125
+    """
+    Последовательно возвращает пары (день, график) для каждого дня
+    в диапазоне от date_from до date_to включительно. Формат графика
+    совпадает с ответом get_available_time_json.
+
+    Диапазон обрабатывается частями по chunk_days дней (по умолчанию -
+    целиком): дни части читаются из кэша одним запросом, отсутствующие
+    в кэше дни рассчитываются по заказам, уборщикам, их отпускам
+    и нерабочим дням, загруженным один раз на всю часть. Графики части
+    возвращаются до загрузки следующей части.
+    """
+    grid: SlotGrid = get_slot_grid()
+    today: date = date.today()
+    dates: list[date] = [
+        date_from + timedelta(days=day)
+        for day in range((date_to - date_from).days + 1)
+    ]
+    chunk_days: int = chunk_days or len(dates)
+    for offset in range(0, len(dates), chunk_days):
+        chunk: list[date] = dates[offset:offset + chunk_days]
+        future_dates: list[date] = [
+            cleaning_date for cleaning_date in chunk
+            if cleaning_date >= today
+        ]
+        free_runs: dict[date, dict[int, int]] = {}
+        if future_dates:
+            free_runs = grid.get_free_runs(dates=future_dates)
+        for cleaning_date in chunk:
+            if cleaning_date not in free_runs:
+                yield cleaning_date, grid.get_empty_schedule()
+                continue
+            yield cleaning_date, grid.fill_schedule(
+                cleaning_date=cleaning_date,
+                free_runs=free_runs[cleaning_date],
+                total_time=total_time,
+            )
+
+
+def get_available_calendar_json(
+        date_from: date, date_to: date, total_time: int) -> dict:
+    """
+    Возвращает словарь, где для каждого дня в диапазоне от date_from
+    до date_to включительно указан график доступного времени.
+
+    Формат ответа: {"2023-11-12": {"00:00": False, ... "23:30": False}, ...}
+    """
+    return {
+        cleaning_date.isoformat(): schedule
+        for cleaning_date, schedule in iter_available_calendar(
+            date_from=date_from,
+            date_to=date_to,
             total_time=total_time,
-            order_set=order_set,
-            cleaning_end_time=cleaning_end_time,
         )
-        if available_cleaners.exists():
-            response_data[current_time] = True
-    return response_data
+    }
 
 
-HOURS_IN_DAY: int = 24
-AVAILABLE_MINUTES: tuple[int] = (0, 30)
+def stream_available_calendar_json(
+        date_from: date, date_to: date, total_time: int) -> Iterator[str]:
+    """
+    Возвращает график доступного времени по дням в формате NDJSON:
+    каждая строка содержит график одного дня. Дни рассчитываются частями
+    по SCHEDULE_CALENDAR_STREAM_CHUNK_DAYS дней, и графики части
+    отдаются клиенту до расчета следующих дней.
+
+    Формат строки: {"2023-11-12": {"00:00": false, ... "23:30": false}}
+    """
+    for cleaning_date, schedule in iter_available_calendar(
+        date_from=date_from,
+        date_to=date_to,
+        total_time=total_time,
+        chunk_days=SCHEDULE_CALENDAR_STREAM_CHUNK_DAYS,
+    ):
+        yield json.dumps({cleaning_date.isoformat(): schedule}) + '\n'
 
 
 def schedule_generate_bool(value: any = False):
     """
-    Генерирует пустой словарь с графиком времени уборок.
-    Формат: {"00:00": value, "00:30": value, ... "23:30": value}
+    Генерирует пустой словарь с графиком времени уборок по сетке слотов
+    рабочего календаря.
+    Формат при шаге слотов 30 минут:
+    {"00:00": value, "00:30": value, ... "23:30": value}
     """
-    schedule_bool: dict[str, any] = {}
-    for hour in range(HOURS_IN_DAY):
-        for minute in AVAILABLE_MINUTES:
-            schedule_bool[f'{hour:02}:{minute:02}'] = value
-    return schedule_bool
+    return get_slot_grid().get_empty_schedule(value=value)
@@ -1,27 +1,43 @@
 # TODO: аннотировать типы данных. Везде. Абсолютно.
 # TODO: Сделать хорошие docstring. Везде.
 
+import re
+from typing import Optional
+
 from django.db.models import QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
 from django.contrib.auth import authenticate
 from django.shortcuts import get_object_or_404
 from django_filters import rest_framework as filters
 from rest_framework import permissions, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.utils.serializer_helpers import ReturnDict
 from drf_spectacular.utils import extend_schema_view, extend_schema
 from djoser.views import TokenCreateView, TokenDestroyView
 
+from api.batch import create_orders_batch
+from api.catalog import (
+    CatalogSnapshot, get_catalog_etag, get_catalog_snapshot,
+    is_catalog_not_modified,
+)
 from api.filters import FilterService
+from api.idempotency import idempotent
+from api.pagination import KeysetPagination
 from api.permissions import (
     IsAdminOrReadOnly,
     IsCurrentUserOrAdmin,
     IsOwnerOrAdmin,
     IsOwnerAbleToPay,
 )
+from api.pricing import get_catalog_revision
+from api.rating_aggregates import get_rating_summary
+from api.reviews import get_cached_reviews_page
+from api.sparse_fields import SparseFieldsViewMixin
 from api.serializers import (
     AdminOrderPatchSerializer,
+    CleanerRatingAggregateSerializer,
+    CleaningGetCalendarSerializer,
     CleaningGetTimeSerializer,
     CreateCleaningTypeSerializer,
     CreateServiceSerializer,
@@ -29,22 +45,31 @@ from api.serializers import (
     GetCleaningTypeSerializer,
     GetServiceSerializer,
     MeasureSerializer,
+    OrderBatchSerializer,
     OrderGetSerializer,
+    OrderListSerializer,
     OrderPostSerializer,
+    OrderQuoteSerializer,
     OrderRatingSerializer,
     OwnerOrderPatchSerializer,
     PasswordConfirmSerializer,
+    RatingAggregateSerializer,
     RatingSerializer,
     UserSerializer,
     UserRegisterSerializer,
 )
-from api.utils import create_password, get_available_time_json, send_mail
+from api.utils import (
+    create_password, get_available_calendar_json, get_available_time_json,
+    send_mail, stream_available_calendar_json,
+)
 from cleanpro.app_data import (
     EMAIL_CONFIRM_EMAIL_SUBJECT, EMAIL_CONFIRM_EMAIL_TEXT,
     ORDER_ACCEPTED_STATUS, ORDER_CANCELLED_STATUS, ORDER_FINISHED_STATUS,
+    PAGINATION_CURSOR_PARAM, PAGINATION_LIMIT_PARAM, RATING_SOURCE_SITE,
     SERVICES_ADDITIONAL,
 )
 from .schemas_views import (
+    CATALOG_SCHEMA,
     CLEANING_TYPES_SCHEMA,
     TOKEN_DESTROY_SCHEMA,
     TOKEN_CREATE_SCHEMA,
@@ -54,17 +79,66 @@ from .schemas_views import (
     ORDER_SCHEMA,
     USER_SCHEMA,
 )
-from services.models import CleaningType, Measure, Order, Rating, Service
-# from services.signals import get_cached_reviews
+from services.models import (
+    CleaningType, Measure, Order, Rating, RatingAggregate, Service,
+)
 from users.models import User
 
 
+GZIP_ACCEPTED = re.compile(r'\bgzip\b')
+
+
+@extend_schema_view(**CATALOG_SCHEMA)
+class CatalogViewSet(viewsets.ViewSet):
+    """Снимок каталога услуг, наборов услуг и единиц измерения."""
+
+    # INFO: аутентификация по токену выполняет запрос к базе данных,
+    #       а снимок каталога одинаков для всех пользователей.
+    authentication_classes = ()
+    permission_classes = (permissions.AllowAny,)
+
+    def list(self, request):
+        """
+        Получить снимок каталога. Запрос с актуальным заголовком
+        If-None-Match получает ответ 304 без тела.
+        """
+        revision: int = get_catalog_revision()
+        if is_catalog_not_modified(
+            if_none_match=request.headers.get('If-None-Match', ''),
+            revision=revision,
+        ):
+            response: HttpResponse = HttpResponse(
+                status=status.HTTP_304_NOT_MODIFIED
+            )
+        else:
+            snapshot: CatalogSnapshot = get_catalog_snapshot(
+                revision=revision
+            )
+            if GZIP_ACCEPTED.search(
+                request.headers.get('Accept-Encoding', '')
+            ):
+                response = HttpResponse(
+                    snapshot.gzipped, content_type='application/json'
+                )
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(
+                    snapshot.content, content_type='application/json'
+                )
+        response['ETag'] = get_catalog_etag(revision=revision)
+        # INFO: клиент хранит снимок, но проверяет его актуальность
+        #       при каждом запросе.
+        response['Cache-Control'] = 'no-cache'
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+
 # TODO: Метод PUT требует все поля. Исправить.
 @extend_schema_view(**CLEANING_TYPES_SCHEMA)
-class CleaningTypeViewSet(viewsets.ModelViewSet):
+class CleaningTypeViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """Работа с наборами услуг."""
 
-    queryset = CleaningType.objects.prefetch_related('service').all()
+    queryset = CleaningType.objects.all()
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
     http_method_names = ('get', 'post', 'put')
@@ -77,7 +151,7 @@ class CleaningTypeViewSet(viewsets.ModelViewSet):
 
 
 @extend_schema_view(**MEASURE_SCHEMA)
-class MeasureViewSet(viewsets.ModelViewSet):
+class MeasureViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """Работа с единицами измерения услуг."""
 
     queryset = Measure.objects.all()
@@ -88,10 +162,11 @@ class MeasureViewSet(viewsets.ModelViewSet):
 
 
 @extend_schema_view(**ORDER_SCHEMA)
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """Работа с заказами."""
 
     http_method_names = ('get', 'post', 'put',)
+    pagination_class = KeysetPagination
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -102,22 +177,30 @@ class OrderViewSet(viewsets.ModelViewSet):
             self.permission_classes = (IsOwnerOrAdmin,)
         elif self.action == 'pay':
             self.permission_classes = (IsOwnerAbleToPay,)
-        elif self.action == 'get_available_time':
+        elif self.action in (
+            'get_available_time', 'get_available_calendar', 'quote',
+        ):
             self.permission_classes = (permissions.AllowAny,)
         return super().get_permissions()
 
     def get_queryset(self):
+        # INFO: связи, которые нужны полям ответа, загружаются
+        #       в filter_queryset (см. api.sparse_fields).
         if not self.request.user.is_staff:
-            return Order.objects.select_related(
-                'user',
-                'address',
-            ).filter(
-                user=self.request.user,
-            )
-        else:
-            return Order.objects.select_related('user', 'address',).all()
+            return Order.objects.filter(user=self.request.user)
+        return Order.objects.all()
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        """
+        Создать заказ. Повторный запрос с тем же заголовком
+        Idempotency-Key возвращает ответ на первый запрос.
+        """
+        return super().create(request, *args, **kwargs)
 
     def get_serializer_class(self):
+        if self.action == 'list':
+            return OrderListSerializer
         if self.request.method == 'GET':
             return OrderGetSerializer
         if self.request.method == 'POST':
@@ -201,23 +284,156 @@ class OrderViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK,
         )
 
+    @action(
+        detail=False,
+        methods=('post',),
+        url_path='get_available_calendar',
+    )
+    def get_available_calendar(self, request):
+        """
+        Получить список доступных часов для бронирования заказа
+        на каждый день из диапазона дат.
+
+        При указании stream=true ответ отдается построчно в формате NDJSON
+        по мере расчета каждого дня.
+        """
+        serializer: serializers = CleaningGetCalendarSerializer(
+            data=request.data,
+        )
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        calendar_kwargs: dict[str, any] = {
+            'date_from': serializer.validated_data['date_from'],
+            'date_to': serializer.validated_data['date_to'],
+            'total_time': serializer.validated_data['total_time'],
+        }
+        if serializer.validated_data['stream']:
+            return StreamingHttpResponse(
+                streaming_content=stream_available_calendar_json(
+                    **calendar_kwargs
+                ),
+                content_type='application/x-ndjson',
+                status=status.HTTP_200_OK,
+            )
+        return Response(
+            data=get_available_calendar_json(**calendar_kwargs),
+            status=status.HTTP_200_OK,
+        )
+
+    @action(
+        detail=False,
+        methods=('post',),
+        url_path='batch',
+    )
+    @idempotent
+    def batch(self, request):
+        """
+        Создать пакет заказов. Заказы с ошибками не создаются
+        и не прерывают создание остальных заказов пакета.
+        """
+        serializer: serializers = OrderBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        results: list[dict] = create_orders_batch(
+            user=request.user,
+            orders_data=serializer.validated_data['orders'],
+        )
+        created: int = sum('id' in result for result in results)
+        return Response(
+            data={'created': created, 'results': results},
+            status=(
+                status.HTTP_201_CREATED if created else
+                status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+    @action(
+        detail=False,
+        methods=('post',),
+        url_path='quote',
+    )
+    def quote(self, request):
+        """
+        Рассчитать стоимость и продолжительность заказа.
+        При создании заказа используется тот же расчет.
+        """
+        serializer: serializers = OrderQuoteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
+
 
 @extend_schema_view(**RATING_SCHEMA)
-class RatingViewSet(viewsets.ModelViewSet):
+class RatingViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """Список отзывов."""
 
     queryset = Rating.objects.all()
     permission_classes = (IsAdminOrReadOnly,)
     serializer_class = RatingSerializer
     http_method_names = ('get', 'patch',)
-    pagination_class = LimitOffsetPagination
+    pagination_class = KeysetPagination
+
+    def list(self, request, *args, **kwargs):
+        """
+        Получить список отзывов. Страницы списка без параметров отбора
+        и выбора полей читаются из кэша отзывов (см. api.reviews).
+        """
+        if set(request.query_params) <= {
+                PAGINATION_CURSOR_PARAM, PAGINATION_LIMIT_PARAM}:
+            page: Optional[list[dict]] = self.paginator.paginate_cached(
+                request=request,
+                model=Rating,
+                ordering=Rating._meta.ordering,
+                get_page=get_cached_reviews_page,
+            )
+            if page is not None:
+                return self.get_paginated_response(page)
+        return super().list(request, *args, **kwargs)
 
-    # INFO: временно отключено кэширование
-    # # TODO: Сделать пагинацию.
-    # def list(self, request, *args, **kwargs):
-    #     cached_reviews: list[dict] = get_cached_reviews()
-    #     page = self.paginate_queryset(cached_reviews)
-    #     return Response(page)
+    @action(
+        detail=False,
+        methods=('get',),
+        url_path='summary',
+        permission_classes=(permissions.AllowAny,),
+    )
+    def summary(self, request):
+        """
+        Получить количество отзывов, среднюю оценку и распределение оценок
+        всего и по источникам отзывов (см. api.rating_aggregates).
+        """
+        return Response(
+            data={
+                source: RatingAggregateSerializer(aggregate).data
+                for source, aggregate in get_rating_summary().items()
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @action(
+        detail=False,
+        methods=('get',),
+        url_path='cleaners',
+        permission_classes=(permissions.IsAdminUser,),
+        pagination_class=None,
+    )
+    def cleaners(self, request):
+        """Получить оценки отзывов на сайте по уборщикам."""
+        serializer = CleanerRatingAggregateSerializer(
+            RatingAggregate.objects.filter(
+                cleaner__isnull=False, source=RATING_SOURCE_SITE,
+            ).order_by('cleaner'),
+            many=True,
+        )
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
 
     def perform_create(self, serializer):
         order_id: int = self.kwargs.get('order_id')
@@ -228,10 +444,10 @@ class RatingViewSet(viewsets.ModelViewSet):
 
 # TODO: Метод PUT требует всех полей. Исправить.
 @extend_schema_view(**SERVICE_SCHEMA)
-class ServiceViewSet(viewsets.ModelViewSet):
+class ServiceViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """Работа с услугами."""
 
-    queryset = Service.objects.select_related('measure').all()
+    queryset = Service.objects.all()
     pagination_class = None
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (filters.DjangoFilterBackend,)
@@ -265,10 +481,10 @@ class TokenDestroySchemaView(TokenDestroyView):
 # TODO: НЕ ВАЛИДИРУЕТСЯ ПОЧТА!!!
 # TODO: метод PUT требует все поля. Исправить.
 @extend_schema_view(**USER_SCHEMA)
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """Работа с пользователями."""
 
-    queryset = User.objects.select_related('address').all()
+    queryset = User.objects.all()
     http_method_names = ('get', 'post', 'put',)
 
     def get_serializer_class(self):
@@ -293,21 +509,20 @@ class UserViewSet(viewsets.ModelViewSet):
         detail=True,
         methods=('get',),
         url_path='orders',
+        pagination_class=KeysetPagination,
     )
     def orders(self, request, pk):
         """Возвращает список заказов авторизированного пользователя."""
-        queryset = Order.objects.filter(
-            user=pk,
-        ).select_related(
-            'user',
-            'cleaning_type',
-            'address',
+        queryset = self.optimize_queryset(
+            queryset=Order.objects.filter(user=pk),
+            serializer_class=OrderListSerializer,
         )
         page = self.paginate_queryset(queryset)
-        serializer = OrderGetSerializer(
+        serializer = OrderListSerializer(
             page,
             many=True,
-            context={'request': request}
+            context={'request': request},
+            **self.get_sparse_fields(serializer_class=OrderListSerializer),
         )
         return self.get_paginated_response(serializer.data)
 
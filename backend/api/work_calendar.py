@@ -0,0 +1,161 @@
+"""
+Рабочий календарь компании: сетка слотов графика доступного времени
+и рабочие часы по дням недели.
+
+Шаг слотов задается SCHEDULE_SLOT_MINUTES, рабочие часы -
+SCHEDULE_WORK_HOURS, нерабочие дни - моделью Holiday (учитываются
+при расчете занятости в api.availability и при выборе свободных
+уборщиков в api.utils.get_available_cleaners). Рабочие часы проверяются
+при показе доступного времени и при каждом бронировании (is_work_time).
+
+Сетка слотов (SlotGrid) строится один раз для каждой конфигурации
+календаря и переиспользуется всеми запросами: подписи слотов
+и их рабочие интервалы не пересчитываются при каждом обращении.
+"""
+
+from datetime import date, time
+from functools import lru_cache
+
+from api.availability import (
+    MINUTES_IN_DAY, MINUTES_IN_HOUR, get_cached_free_runs, time_to_minutes,
+)
+from cleanpro.app_data import SCHEDULE_SLOT_MINUTES, SCHEDULE_WORK_HOURS
+
+WorkHours = tuple[tuple[int, tuple[str, str]], ...]
+
+
+def parse_minutes(value: str) -> int:
+    """Возвращает количество минут от начала суток для времени "ЧЧ:ММ"."""
+    hours, minutes = value.split(':')
+    result: int = int(hours) * MINUTES_IN_HOUR + int(minutes)
+    if not 0 <= result <= MINUTES_IN_DAY:
+        raise ValueError(f'Некорректное время рабочего календаря: {value}')
+    return result
+
+
+class SlotGrid:
+    """
+    Сетка слотов графика доступного времени.
+
+    Атрибуты:
+        - slot_minutes (int) - шаг слотов в минутах
+        - starts (tuple[int]) - минуты начала всех слотов суток
+        - labels (tuple[str]) - подписи всех слотов суток "ЧЧ:ММ"
+        - signature (str) - подпись сетки для ключей кэша
+
+    Методы:
+        - get_empty_schedule - график {"ЧЧ:ММ": value} для всех слотов суток
+        - get_free_runs - свободные окна слотов сетки для указанных дней
+        - fill_schedule - график доступного времени для дня
+        - is_work_interval - проверка интервала на рабочие часы дня
+    """
+
+    def __init__(self, slot_minutes: int, work_hours: WorkHours):
+        if slot_minutes <= 0 or MINUTES_IN_DAY % slot_minutes:
+            raise ValueError(
+                f'Сутки не делятся на слоты по {slot_minutes} минут.'
+            )
+        self.slot_minutes: int = slot_minutes
+        self.starts: tuple[int] = tuple(
+            range(0, MINUTES_IN_DAY, slot_minutes)
+        )
+        self.labels: tuple[str] = tuple(
+            f'{start // MINUTES_IN_HOUR:02}:{start % MINUTES_IN_HOUR:02}'
+            for start in self.starts
+        )
+        self.signature: str = str(slot_minutes)
+        self._work_slots: dict[int, tuple[tuple[str, int], ...]] = {}
+        self._work_starts: dict[int, int] = {}
+        self._work_stops: dict[int, int] = {}
+        for weekday, (work_start, work_stop) in work_hours:
+            work_start: int = parse_minutes(work_start)
+            work_stop: int = parse_minutes(work_stop)
+            self._work_slots[weekday] = tuple(
+                (label, start)
+                for label, start in zip(self.labels, self.starts)
+                if work_start <= start < work_stop
+            )
+            self._work_starts[weekday] = work_start
+            self._work_stops[weekday] = work_stop
+
+    def get_empty_schedule(self, value: any = False) -> dict[str, any]:
+        """
+        Возвращает график для всех слотов суток.
+        Формат: {"00:00": value, "00:30": value, ... "23:30": value}
+        """
+        return dict.fromkeys(self.labels, value)
+
+    def get_free_runs(self, dates: list[date]) -> dict[date, dict[int, int]]:
+        """
+        Возвращает максимальную продолжительность свободного окна
+        для каждого слота сетки каждого дня из dates (см.
+        api.availability.get_cached_free_runs).
+        """
+        return get_cached_free_runs(
+            dates=dates,
+            starts=self.starts,
+            signature=self.signature,
+        )
+
+    def fill_schedule(
+            self,
+            cleaning_date: date,
+            free_runs: dict[int, int],
+            total_time: int) -> dict[str, bool]:
+        """
+        Возвращает график доступного времени для дня cleaning_date
+        в формате {"ЧЧ:ММ": bool}: слот доступен, если заказ
+        продолжительностью total_time минут начинается и заканчивается
+        в рабочие часы дня и помещается в свободное окно free_runs слота.
+        """
+        schedule: dict[str, bool] = self.get_empty_schedule()
+        weekday: int = cleaning_date.weekday()
+        work_stop: int = self._work_stops.get(weekday, 0)
+        for label, start in self._work_slots.get(weekday, ()):
+            if start + total_time > work_stop:
+                break
+            if free_runs.get(start, 0) >= total_time:
+                schedule[label] = True
+        return schedule
+
+    def is_work_interval(
+            self, cleaning_date: date, start: int, duration: int) -> bool:
+        """
+        Проверяет, что интервал длительностью duration минут,
+        начинающийся на минуте start, целиком приходится на рабочие
+        часы дня cleaning_date.
+        """
+        weekday: int = cleaning_date.weekday()
+        if weekday not in self._work_starts:
+            return False
+        return (
+            self._work_starts[weekday] <= start and
+            start + duration <= self._work_stops[weekday]
+        )
+
+
+@lru_cache
+def get_slot_grid(
+        slot_minutes: int = SCHEDULE_SLOT_MINUTES,
+        work_hours: WorkHours = tuple(sorted(SCHEDULE_WORK_HOURS.items()))
+        ) -> SlotGrid:  # noqa E125
+    """
+    Возвращает сетку слотов для конфигурации рабочего календаря,
+    по умолчанию - из SCHEDULE_SLOT_MINUTES и SCHEDULE_WORK_HOURS.
+    Сетка строится один раз для каждой конфигурации.
+    """
+    return SlotGrid(slot_minutes=slot_minutes, work_hours=work_hours)
+
+
+def is_work_time(
+        cleaning_date: date, cleaning_time: time, total_time: int) -> bool:
+    """
+    Проверяет, что уборка продолжительностью total_time минут начинается
+    и заканчивается в рабочие часы дня cleaning_date. Нерабочие дни
+    (Holiday) не проверяются.
+    """
+    return get_slot_grid().is_work_interval(
+        cleaning_date=cleaning_date,
+        start=time_to_minutes(cleaning_time),
+        duration=total_time,
+    )
@@ -13,15 +13,108 @@ load_dotenv(os.path.join(BASE_DIR, '.env'), verbose=True)
 
 CLEANPRO_HOST: str = os.getenv('CLEANPRO_HOST')
 CLEANPRO_HOST_IP: str = os.getenv('CLEANPRO_HOST_IP')
+# INFO: адрес сайта для абсолютных ссылок в ответах, которые сериализуются
+#       без запроса и общие для всех клиентов (снимок каталога, api.catalog).
+CLEANPRO_BASE_URL: str = os.getenv(
+    'CLEANPRO_BASE_URL', f'https://{CLEANPRO_HOST}' if CLEANPRO_HOST else '',
+)
 
 CLEANPRO_YA_MAPS_ID: str = os.getenv('CLEANPRO_YA_MAPS_ID')
+# INFO: id организаций всех филиалов на Я.Картах через запятую.
+CLEANPRO_YA_MAPS_IDS: list[str] = [
+    ya_maps_id.strip() for ya_maps_id in os.getenv(
+        'CLEANPRO_YA_MAPS_IDS', CLEANPRO_YA_MAPS_ID or ''
+    ).split(',') if ya_maps_id.strip()
+]
 
-CLEANPRO_YA_MAPS_URL: str = (
-    f'https://yandex.ru/maps-reviews-widget/{CLEANPRO_YA_MAPS_ID}?comments'
-)
+# INFO: страницы отзывов в формате (источник, URL), доступные источники
+#       перечислены в api.review_sources.REVIEW_SOURCES.
+REVIEW_SOURCE_PAGES: list[tuple[str, str]] = [
+    (
+        'yandex_maps',
+        f'https://yandex.ru/maps-reviews-widget/{ya_maps_id}?comments',
+    )
+    for ya_maps_id in CLEANPRO_YA_MAPS_IDS
+]
 
 SCHEDULE_WORK_START_H: str = 9
 SCHEDULE_WORK_STOP_H: str = 21
+# INFO: рабочие часы по дням недели в формате {день недели: (начало, конец)},
+#       0 - понедельник. Дни недели, отсутствующие в словаре, - выходные.
+#       Конец рабочего дня указывается не позже "24:00".
+SCHEDULE_WORK_HOURS: dict[int, tuple[str, str]] = {
+    weekday: (
+        f'{SCHEDULE_WORK_START_H:02}:00', f'{SCHEDULE_WORK_STOP_H:02}:00'
+    )
+    for weekday in range(7)
+}
+# INFO: шаг слотов графика в минутах, сутки должны делиться на него нацело.
+SCHEDULE_SLOT_MINUTES: int = 30
+
+SCHEDULE_CALENDAR_MAX_DAYS: int = 31
+# INFO: потоковый график рассчитывается и отдается частями по столько дней.
+SCHEDULE_CALENDAR_STREAM_CHUNK_DAYS: int = 7
+
+# INFO: доступные стратегии перечислены в api.assignment.ASSIGNMENT_STRATEGIES
+CLEANER_ASSIGNMENT_STRATEGY: str = os.getenv(
+    'CLEANER_ASSIGNMENT_STRATEGY', 'route_aware'
+)
+
+# INFO: время в пути уборщика между заказами в минутах.
+ROUTE_TRAVEL_BUFFER_SAME_STREET: int = 15
+ROUTE_TRAVEL_BUFFER_SAME_CITY: int = 45
+ROUTE_TRAVEL_BUFFER_OTHER_CITY: int = 120
+# INFO: минимальное время в пути между любыми адресами, на него расширяются
+#       интервалы занятости уборщиков при расчете доступного времени.
+ROUTE_TRAVEL_BUFFER_MIN: int = ROUTE_TRAVEL_BUFFER_SAME_STREET
+
+# INFO: параметры постраничного вывода по ключу (см. api.pagination).
+PAGINATION_CURSOR_PARAM: str = 'cursor'
+PAGINATION_LIMIT_PARAM: str = 'limit'
+PAGINATION_MAX_LIMIT: int = 100
+# INFO: ?count=approximate добавляет в ответ оценку количества объектов
+#       по статистике планировщика PostgreSQL.
+PAGINATION_COUNT_PARAM: str = 'count'
+PAGINATION_COUNT_APPROXIMATE: str = 'approximate'
+
+# INFO: услуги набора услуг с этими единицами измерения оплачиваются
+#       за каждую комнату или санузел заказа, остальные - один раз
+#       за заказ (см. api.pricing).
+PRICE_MEASURE_ROOM: str = 'комната'
+PRICE_MEASURE_BATHROOM: str = 'санузел'
+
+# INFO: номер ревизии каталога услуг и наборов услуг, по нему процессы
+#       перестраивают таблицу цен при изменении каталога.
+CATALOG_REVISION_CACHED_KEY: str = 'catalog_revision_cached_key'
+CATALOG_SNAPSHOT_CACHED_KEY: str = 'catalog_snapshot_cached_key'
+# INFO: снимок хранится под ключом своей ревизии, срок жизни нужен только
+#       для удаления из Redis снимков устаревших ревизий.
+CATALOG_SNAPSHOT_CACHE_TIMEOUT: int = 60 * 60 * 24 * 7
+
+# INFO: повторные запросы с тем же заголовком Idempotency-Key получают
+#       сохраненный ответ первого успешного запроса.
+IDEMPOTENCY_KEY_HEADER: str = 'Idempotency-Key'
+IDEMPOTENCY_KEY_MAX_LEN: int = 255
+IDEMPOTENCY_CACHED_KEY: str = 'idempotency_cached_key'
+IDEMPOTENCY_CACHE_TIMEOUT: int = 60 * 60 * 24
+# INFO: время жизни блокировки ключа в секундах: блокировка освобождается,
+#       даже если обработчик первого запроса завершился аварийно.
+IDEMPOTENCY_LOCK_TIMEOUT: int = 30
+
+# INFO: заказы регулярных уборок создаются на столько дней вперед.
+RECURRENCE_MATERIALIZE_DAYS: int = 28
+
+AVAILABLE_TIME_CACHED_KEY: str = 'available_time_cached_key'
+# INFO: сброс кэша производится при изменении данных, срок жизни нужен
+#       только для удаления из Redis записей устаревших версий.
+AVAILABLE_TIME_CACHE_TIMEOUT: int = 60 * 60 * 24 * 7
+AVAILABLE_TIME_WARM_UP_DAYS: int = 31
+# INFO: при изменении отпуска большей длительности кэш сбрасывается целиком.
+AVAILABLE_TIME_CACHE_MAX_DAYS: int = 366
+# INFO: начиная с этого количества уборщиков с различной занятостью
+#       свободные окна рассчитываются NumPy, если он установлен.
+#       Значение получено командой benchmark_available_time.
+AVAILABLE_TIME_NUMPY_MIN_CLEANERS: int = 2
 
 
 """Database settings."""
@@ -58,6 +151,8 @@ DATABASE_SQLITE: dict[str, dict[str, any]] = {
 
 ADMIN_LIST_PER_PAGE: int = 15
 
+BUSY_INTERVAL_EXCLUSION_CONSTRAINT: str = 'busy_interval_no_overlap'
+
 ADDRESS_CITY_MAX_LEN: int = 50
 ADDRESS_STREET_MAX_LEN: int = 50
 ADDRESS_HOUSE_MAX_VAL: int = 999
@@ -70,6 +165,10 @@ CLEANING_TIME_MINUTE_MIN: int = 1
 CLEANING_TYPE_TITLE_MAX_LEN: int = 25
 CLEANING_TYPE_COEF_MIN_VAL: int = 1
 
+HOLIDAY_TITLE_MAX_LEN: int = 60
+
+IDEMPOTENCY_KEY_HASH_LEN: int = 64
+
 MEASURE_TITLE_MAX_LEN: int = 25
 
 ORDER_ACCEPTED_STATUS: str = 'accepted'
@@ -82,11 +181,47 @@ ORDER_STATUS_CHOICES: list[tuple[str]] = (
     (ORDER_FINISHED_STATUS, 'Завершен'),
     (ORDER_CANCELLED_STATUS, 'Отменен'),
 )
+ORDER_ASSIGNMENT_REASON_MAX_LEN: int = 256
+ORDER_BATCH_MAX_SIZE: int = 100
 ORDER_COMMENT_MAX_LEN: int = 512
 ORDER_TOTAL_SUM_MIN_VAL: int = 1
 ORDER_TOTAL_TIME_MIN_VAL: int = 1
 
+RECURRENCE_INTERVAL_CHOICES: tuple[tuple[int, str]] = (
+    (1, 'Еженедельно'),
+    (2, 'Раз в две недели'),
+)
+
+RATING_SCORES: tuple[int, ...] = (1, 2, 3, 4, 5)
+RATING_SOURCE_SITE: str = 'site'
+RATING_SOURCE_MAPS: str = 'maps'
+RATING_SOURCE_CHOICES: tuple[tuple[str, str]] = (
+    (RATING_SOURCE_SITE, 'Сайт'),
+    (RATING_SOURCE_MAPS, 'Я.Карты'),
+)
+RATING_SOURCE_MAX_LEN: int = 4
+RATING_CONTENT_HASH_LEN: int = 64
+RATING_AVERAGE_PRECISION: int = 2
+
+# INFO: заголовки ETag и Last-Modified последней загруженной страницы
+#       отзывов для условного запроса (см. api.review_sources).
+REVIEW_SOURCE_VALIDATORS_CACHED_KEY: str = 'review_source_validators_key'
+REVIEW_IMPORT_LOCK_CACHED_KEY: str = 'review_import_lock_cached_key'
+REVIEW_IMPORT_LOCK_TIMEOUT: int = 60 * 10
+# INFO: страницы отзывов загружаются параллельно не более чем
+#       в REVIEW_SOURCE_MAX_WORKERS потоков.
+REVIEW_SOURCE_MAX_WORKERS: int = 8
+REVIEW_SOURCE_CONNECT_TIMEOUT: int = 5
+REVIEW_SOURCE_READ_TIMEOUT: int = 30
+REVIEW_SOURCE_CHUNK_SIZE: int = 16 * 1024
+
 REVIEW_CACHED_KEY: str = 'review_cached_key'
+# INFO: отзывы хранятся в кэше сегментами по диапазонам id, изменение
+#       отзыва перезаписывает только его сегмент (см. api.reviews).
+REVIEW_CACHE_SEGMENT_SIZE: int = 100
+REVIEW_CACHE_TIMEOUT: int = 60 * 60 * 24 * 7
+REVIEW_CACHE_LOCK_TIMEOUT: int = 10
+REVIEW_CACHE_LOCK_POLL_INTERVAL: float = 0.05
 
 SERVICES_ADDITIONAL: str = 'additional'
 SERVICES_MAIN: str = 'main'
@@ -97,6 +232,31 @@ SERVICE_TYPE: list[tuple[str]] = [
 SERVICE_TYPE_MAX_LEN: int = 11
 SERVICE_PRICE_MIN_VAL: int = 60
 SERVICE_TITLE_MAX_LEN: int = 60
+SERVICE_IMAGE_HASH_LEN: int = 64
+# INFO: длина хэша изображения в параметре версии ссылки на изображение.
+SERVICE_IMAGE_VERSION_LEN: int = 12
+# INFO: изображения услуг возвращаются в base64 только при указании
+#       параметра запроса ?base64=true, иначе - ссылкой на /media/.
+SERVICE_IMAGE_BASE64_PARAM: str = 'base64'
+SERVICE_IMAGE_VARIANTS_PATH: str = 'service_photo/variants/'
+# INFO: максимальная сторона уменьшенных копий изображений услуг в пикселях.
+SERVICE_IMAGE_VARIANTS_SIZES: dict[str, int] = {
+    'small': 160,
+    'medium': 480,
+}
+# INFO: AVIF создается, только если Pillow поддерживает его сохранение
+#       (например, с установленным pillow-avif-plugin).
+SERVICE_IMAGE_VARIANTS_FORMATS: dict[str, str] = {
+    'jpeg': 'JPEG',
+    'webp': 'WEBP',
+    'avif': 'AVIF',
+}
+SERVICE_IMAGE_VARIANTS_QUALITY: int = 80
+
+# INFO: параметры запроса для выбора полей ответа: ?fields=id,order_status
+#       и ?expand=user,cleaning_type (см. api.sparse_fields).
+SPARSE_EXPAND_PARAM: str = 'expand'
+SPARSE_FIELDS_PARAM: str = 'fields'
 
 USER_NAME_MAX_LEN: int = 30
 # Do not change, Django hash password with big length!
@@ -111,6 +271,14 @@ USER_FULL_EMAIL_MAX_LEN: int = 80
 
 EMAIL_CODE_LENGTH: int = 8
 
+# INFO: письма отправляются из очереди пакетами через одно соединение
+#       с SMTP-сервером. Неотправленное письмо повторяется через
+#       EMAIL_OUTBOX_RETRY_DELAY * 2 ** (номер попытки - 1) секунд.
+EMAIL_OUTBOX_BATCH_SIZE: int = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+EMAIL_OUTBOX_RETRY_DELAY: int = 60
+EMAIL_OUTBOX_SUBJECT_MAX_LEN: int = 255
+
 DEFAULT_FROM_EMAIL: str = os.getenv('DEFAULT_FROM_EMAIL')
 
 PASSWORD_RESET_LINK: str = None
@@ -180,6 +348,12 @@ EMAIL_TIMEOUT: int = os.getenv('EMAIL_TIMEOUT')
 if EMAIL_TIMEOUT is not None:
     EMAIL_TIMEOUT: int = int(EMAIL_TIMEOUT)
 
+# INFO: бекенд отправки писем, например
+#       django.core.mail.backends.locmem.EmailBackend для тестов.
+#       По умолчанию письма сохраняются в файлы при DEBUG=True
+#       и отправляются через SMTP-сервер при DEBUG=False.
+EMAIL_BACKEND: str = os.getenv('EMAIL_BACKEND')
+
 
 """Security data."""
 
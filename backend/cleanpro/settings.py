@@ -8,6 +8,7 @@ from cleanpro.app_data import (
     BASE_DIR,
     CLEANPRO_HOST, CLEANPRO_HOST_IP,
     DEFAULT_FROM_EMAIL,
+    EMAIL_BACKEND,
     EMAIL_HOST, EMAIL_PORT, EMAIL_HOST_USER, EMAIL_HOST_PASSWORD,
     EMAIL_USE_TLS, EMAIL_USE_SSL, EMAIL_SSL_CERTFILE,
     EMAIL_SSL_KEYFILE, EMAIL_TIMEOUT,
@@ -28,13 +29,29 @@ DEBUG: bool = False
 CELERY_TIMEZONE = 'Europe/Moscow'
 
 CELERY_BEAT_SCHEDULE = {
-    'parse_yandex_maps': {
-        'task': 'services.tasks.parse_yandex_maps',
+    'fetch_reviews': {
+        'task': 'services.tasks.fetch_reviews',
         'schedule': (
             timedelta(minutes=1) if DEBUG else
             crontab(minute=1, hour=0)
         ),
     },
+    'warm_up_available_time': {
+        'task': 'services.tasks.warm_up_available_time',
+        'schedule': crontab(minute=5, hour=0),
+    },
+    'delete_expired_idempotency_keys': {
+        'task': 'services.tasks.delete_expired_idempotency_keys',
+        'schedule': crontab(minute=10, hour=0),
+    },
+    'create_recurring_orders': {
+        'task': 'services.tasks.create_recurring_orders',
+        'schedule': crontab(minute=15, hour=0),
+    },
+    'send_queued_emails': {
+        'task': 'services.tasks.send_queued_emails',
+        'schedule': timedelta(minutes=1),
+    },
 }
 
 CELERY_TASK_TRACK_STARTED = True
@@ -109,8 +126,11 @@ WSGI_APPLICATION = 'cleanpro.wsgi.application'
 
 DEFAULT_FROM_EMAIL = DEFAULT_FROM_EMAIL
 
-if DEBUG:
-    EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+if EMAIL_BACKEND is not None:
+    EMAIL_BACKEND: str = EMAIL_BACKEND
+elif DEBUG:
     EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 else:
     EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
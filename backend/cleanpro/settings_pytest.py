@@ -6,3 +6,11 @@ DATABASES = DATABASE_SQLITE
 SECRET_KEY = 'test_secret_key'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media_test')  # noqa F405
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+CELERY_TASK_ALWAYS_EAGER = True
@@ -2,8 +2,8 @@ from django.contrib import admin
 
 from cleanpro.app_data import ADMIN_LIST_PER_PAGE
 from services.models import (
-    CleaningType, Measure, Order, Rating, Service,
-    ServicesInCleaningType, ServicesInOrder
+    CleaningType, Holiday, Measure, Order, OrderRecurrence, OutboxEmail,
+    Rating, RatingAggregate, Service, ServicesInCleaningType, ServicesInOrder
 )
 from users.models import User
 
@@ -75,6 +75,36 @@ class CleaningTypeAdmin(admin.ModelAdmin):
     services_list.short_description = 'Список сервисов'
 
 
+@admin.register(Holiday)
+class HolidayAdmin(admin.ModelAdmin):
+    """
+    Переопределяет административный интерфейс Django для модели Holiday.
+
+    Атрибуты:
+        - list_display (tuple) - список полей для отображения в интерфейсе:
+            - ID нерабочего дня (pk)
+            - дата (date)
+            - название (title)
+        - list_editable (tuple) - список полей для изменения в интерфейсе:
+            - название (title)
+        - search_fields (tuple) - список полей для поиска объектов:
+            - название (title)
+        - list_per_page (int) - количество объектов на одной странице
+    """
+    list_display = (
+        'pk',
+        'date',
+        'title',
+    )
+    list_editable = (
+        'title',
+    )
+    search_fields = (
+        'title',
+    )
+    list_per_page = ADMIN_LIST_PER_PAGE
+
+
 @admin.register(Measure)
 class MeasureAdmin(admin.ModelAdmin):
     """
@@ -139,6 +169,7 @@ class OrderAdmin(OrderAdmin):
             - ID заказа (pk)
             - ID заказчика (user)
             - ID уборщика (cleaner)
+            - причина назначения уборщика (cleaner_assignment_reason)
             - статус заказа (order_status)
             - статус оплаты (pay_status)
             - суммарное время работ (total_time)
@@ -184,6 +215,7 @@ class OrderAdmin(OrderAdmin):
         'pk',
         'user',
         'cleaner',
+        'cleaner_assignment_reason',
         'order_status',
         'pay_status',
         'total_time',
@@ -228,6 +260,42 @@ class OrderAdmin(OrderAdmin):
     services_list.short_description = 'Список сервисов'
 
 
+@admin.register(OrderRecurrence)
+class OrderRecurrenceAdmin(admin.ModelAdmin):
+    """
+    Переопределяет административный интерфейс Django для модели
+    OrderRecurrence.
+
+    Атрибуты:
+        - list_display (tuple) - список полей для отображения в интерфейсе:
+            - ID регулярной уборки (pk)
+            - шаблонный заказ (template)
+            - период (interval_weeks)
+            - дата следующего заказа (next_date)
+            - дата окончания (end_date)
+            - активна (is_active)
+            - пропущенные даты (skipped_dates)
+        - list_editable (tuple) - список полей для изменения в интерфейсе:
+            - дата окончания (end_date)
+            - активна (is_active)
+        - list_per_page (int) - количество объектов на одной странице
+    """
+    list_display = (
+        'pk',
+        'template',
+        'interval_weeks',
+        'next_date',
+        'end_date',
+        'is_active',
+        'skipped_dates',
+    )
+    list_editable = (
+        'end_date',
+        'is_active',
+    )
+    list_per_page = ADMIN_LIST_PER_PAGE
+
+
 @admin.register(Rating)
 class RatingAdmin(admin.ModelAdmin):
     """
@@ -278,6 +346,85 @@ class RatingAdmin(admin.ModelAdmin):
     list_per_page = ADMIN_LIST_PER_PAGE
 
 
+@admin.register(RatingAggregate)
+class RatingAggregateAdmin(admin.ModelAdmin):
+    """
+    Переопределяет административный интерфейс Django для модели
+    RatingAggregate. Счетчики изменяются только при записи отзывов
+    и командой rebuild_rating_aggregates.
+
+    Атрибуты:
+        - list_display (tuple) - список полей для отображения в интерфейсе:
+            - источник отзывов (source)
+            - уборщик (cleaner)
+            - количество отзывов (count)
+            - средняя оценка (average)
+        - list_filter (tuple) - список фильтров:
+            - источник отзывов (source)
+        - readonly_fields (tuple) - список полей только для чтения
+        - list_per_page (int) - количество объектов на одной странице
+    """
+    list_display = (
+        'source',
+        'cleaner',
+        'count',
+        'average',
+    )
+    list_filter = (
+        'source',
+    )
+    readonly_fields = (
+        'source',
+        'cleaner',
+        'score_1',
+        'score_2',
+        'score_3',
+        'score_4',
+        'score_5',
+    )
+    list_per_page = ADMIN_LIST_PER_PAGE
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    """
+    Переопределяет административный интерфейс Django для модели
+    OutboxEmail. Отправленные письма удаляются из очереди, поэтому
+    в интерфейсе отображаются письма, ожидающие отправки или
+    не отправленные за EMAIL_OUTBOX_MAX_ATTEMPTS попыток.
+
+    Атрибуты:
+        - list_display (tuple) - список полей для отображения в интерфейсе:
+            - ID письма (pk)
+            - тема (subject)
+            - получатели (to)
+            - количество попыток (attempts)
+            - дата следующей попытки (next_attempt)
+            - дата создания (created)
+        - search_fields (tuple) - список полей для поиска объектов:
+            - тема (subject)
+        - readonly_fields (tuple) - список полей только для чтения
+        - list_per_page (int) - количество объектов на одной странице
+    """
+    list_display = (
+        'pk',
+        'subject',
+        'to',
+        'attempts',
+        'next_attempt',
+        'created',
+    )
+    search_fields = (
+        'subject',
+    )
+    readonly_fields = (
+        'attempts',
+        'error',
+        'created',
+    )
+    list_per_page = ADMIN_LIST_PER_PAGE
+
+
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
     """
@@ -1,5 +1,5 @@
 from django.apps import AppConfig
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_migrate
 
 
 class ServiceConfig(AppConfig):
@@ -7,11 +7,13 @@ class ServiceConfig(AppConfig):
     verbose_name = 'Услуги'
 
     def ready(self) -> None:
-        from services.signals import post_save_receiver
+        # INFO: импорт модуля регистрирует обработчики сигналов
+        #       с декоратором receiver.
+        from services.signals import create_btree_gist_extension
 
-        post_save.connect(
-            receiver=post_save_receiver,
-            dispatch_uid='update_cached_reviews',
+        pre_migrate.connect(
+            receiver=create_btree_gist_extension,
+            sender=self,
         )
 
         return super().ready()
@@ -0,0 +1,144 @@
+"""
+Команда для сравнения расчета свободных окон уборщиков на битовых масках
+(get_free_runs_bitmask) и матричными операциями NumPy
+(get_free_runs_matrix) в зависимости от количества уборщиков.
+
+Занятость уборщиков генерируется в памяти с фиксированным seed, база
+данных не используется. Для каждого количества уборщиков проверяется,
+что оба способа дают одинаковый результат, и выводится медианное время
+расчета. Количество уборщиков, начиная с которого NumPy быстрее на всех
+последующих замерах, задается в AVAILABLE_TIME_NUMPY_MIN_CLEANERS.
+
+Вызов команды осуществляется из папки с manage.py файлом:
+python manage.ru benchmark_available_time
+"""
+
+from random import Random
+from statistics import median
+from time import perf_counter
+from typing import Callable
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.availability import (
+    MINUTES_IN_DAY, get_free_runs_bitmask, get_free_runs_matrix,
+    interval_mask, np,
+)
+from cleanpro.app_data import (
+    AVAILABLE_TIME_NUMPY_MIN_CLEANERS, SCHEDULE_WORK_START_H,
+    SCHEDULE_WORK_STOP_H,
+)
+
+BENCHMARK_DURATIONS: tuple[int] = (60, 90, 120, 180, 240)
+BENCHMARK_ORDERS_PER_CLEANER: int = 3
+BENCHMARK_SLOT_MINUTES: int = 30
+
+
+def generate_masks(cleaners_count: int, seed: int) -> list[int]:
+    """Генерирует битовые маски занятости уборщиков за день."""
+    random: Random = Random(seed)
+    masks: list[int] = []
+    for _ in range(cleaners_count):
+        mask: int = 0
+        for _ in range(random.randint(1, BENCHMARK_ORDERS_PER_CLEANER)):
+            mask |= interval_mask(
+                start=random.randrange(
+                    SCHEDULE_WORK_START_H * 60,
+                    SCHEDULE_WORK_STOP_H * 60,
+                    5,
+                ),
+                duration=random.choice(BENCHMARK_DURATIONS),
+            )
+        masks.append(mask)
+    return masks
+
+
+def measure(
+        function: Callable,
+        masks: list[int],
+        starts: list[int],
+        repeat: int) -> tuple[float, dict[int, int]]:
+    """
+    Возвращает медианное время расчета в мс и результат расчета.
+    Как и в DayAvailability, расчет ведется по различным маскам.
+    """
+    timings: list[float] = []
+    for _ in range(repeat):
+        started: float = perf_counter()
+        free_runs: dict[int, int] = function(
+            masks=set(masks), starts=starts
+        )
+        timings.append((perf_counter() - started) * 1000)
+    return median(timings), free_runs
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bitmask and NumPy available time computation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            type=int,
+            default=[1, 5, 10, 25, 50, 100, 200, 500, 1000],
+            help='Cleaners count for each benchmark run.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Computations made by each method for each size.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of cleaners busy masks generator.',
+        )
+
+    def handle(self, *args: any, **options: any):
+        if np is None:
+            raise CommandError('NumPy is not installed.')
+        starts: list[int] = list(
+            range(0, MINUTES_IN_DAY, BENCHMARK_SLOT_MINUTES)
+        )
+        self.stdout.write(
+            'cleaners'.rjust(10) + 'bitmask'.rjust(12) + 'numpy'.rjust(12)
+        )
+        crossover: int = None
+        try:
+            for size in options['sizes']:
+                masks: list[int] = generate_masks(
+                    cleaners_count=size, seed=options['seed']
+                )
+                bitmask_time, bitmask_runs = measure(
+                    function=get_free_runs_bitmask,
+                    masks=masks,
+                    starts=starts,
+                    repeat=options['repeat'],
+                )
+                numpy_time, numpy_runs = measure(
+                    function=get_free_runs_matrix,
+                    masks=masks,
+                    starts=starts,
+                    repeat=options['repeat'],
+                )
+                if bitmask_runs != numpy_runs:
+                    raise ValueError(f'results differ for {size} cleaners')
+                if numpy_time >= bitmask_time:
+                    crossover = None
+                elif crossover is None:
+                    crossover = size
+                self.stdout.write(
+                    str(size).rjust(10) +
+                    f'{bitmask_time:.3f} ms'.rjust(12) +
+                    f'{numpy_time:.3f} ms'.rjust(12)
+                )
+        except Exception as err:
+            raise CommandError(f'Exception has occurred: {err}')
+        self.stdout.write(
+            f'NumPy is faster from: {crossover} cleaners '
+            f'(AVAILABLE_TIME_NUMPY_MIN_CLEANERS = '
+            f'{AVAILABLE_TIME_NUMPY_MIN_CLEANERS})'
+        )
+        return
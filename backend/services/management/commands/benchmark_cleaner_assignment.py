@@ -0,0 +1,164 @@
+"""
+Команда для сравнения скорости стратегий назначения уборщиков
+в зависимости от количества уборщиков.
+
+Тестовые уборщики, адреса и заказы создаются в транзакции, которая
+откатывается после замеров, поэтому команда не изменяет данные в базе.
+
+Вызов команды осуществляется из папки с manage.py файлом:
+python manage.ru benchmark_cleaner_assignment
+"""
+
+from datetime import date, time, timedelta
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import QuerySet
+
+from api.assignment import ASSIGNMENT_STRATEGIES
+from api.utils import get_available_cleaners
+from services.models import Address, CleaningType, Order
+from users.models import User
+
+BENCHMARK_CITIES: tuple[str] = ('Москва', 'Санкт-Петербург')
+BENCHMARK_STREETS: tuple[str] = ('Ленина', 'Мира', 'Садовая', 'Невский')
+BENCHMARK_CLEANING_TIME: time = time(hour=20)
+BENCHMARK_TOTAL_TIME: int = 120
+
+
+def create_benchmark_data(
+        cleaners_count: int,
+        orders_per_cleaner: int,
+        cleaning_date: date) -> list[int]:
+    """
+    Создает тестовых уборщиков и их заказы в день уборки и накануне.
+    Возвращает id созданных уборщиков.
+    """
+    prefix: str = f'benchmark_{cleaners_count}'
+    cleaners: list[User] = User.objects.bulk_create(
+        User(email=f'{prefix}_cleaner_{i}@email.com', is_cleaner=True)
+        for i in range(cleaners_count)
+    )
+    addresses: list[Address] = Address.objects.bulk_create(
+        Address(
+            city=BENCHMARK_CITIES[i % len(BENCHMARK_CITIES)],
+            street=BENCHMARK_STREETS[i % len(BENCHMARK_STREETS)],
+            house=i + 1,
+        )
+        for i in range(cleaners_count)
+    )
+    cleaning_type: CleaningType = CleaningType.objects.create(
+        title=prefix, coefficient=1
+    )
+    orders: list[Order] = []
+    for i, cleaner in enumerate(cleaners):
+        for j in range(orders_per_cleaner):
+            orders.append(
+                Order(
+                    cleaner=cleaner,
+                    total_sum=1000,
+                    total_time=60 * (1 + (i + j) % 3),
+                    cleaning_type=cleaning_type,
+                    rooms_number=1,
+                    bathrooms_number=1,
+                    address=addresses[(i + j) % len(addresses)],
+                    cleaning_date=cleaning_date - timedelta(days=j % 2),
+                    cleaning_time=time(hour=9 + j % 8, minute=i % 60),
+                )
+            )
+    # INFO: bulk_create не создает интервалы занятости, поэтому
+    #       в BENCHMARK_CLEANING_TIME свободны все тестовые уборщики.
+    Order.objects.bulk_create(orders)
+    return [cleaner.id for cleaner in cleaners]
+
+
+def benchmark_strategies(
+        cleaners_count: int,
+        orders_per_cleaner: int,
+        repeat: int) -> dict[str, float]:
+    """
+    Замеряет медианное время выбора уборщика каждой стратегией в мс.
+    Созданные тестовые данные удаляются откатом транзакции.
+    """
+    cleaning_date: date = date.today() + timedelta(days=1)
+    address_data: dict[str, str] = {
+        'city': BENCHMARK_CITIES[0],
+        'street': BENCHMARK_STREETS[0],
+    }
+    results: dict[str, float] = {}
+    with transaction.atomic():
+        cleaners_ids: list[int] = create_benchmark_data(
+            cleaners_count=cleaners_count,
+            orders_per_cleaner=orders_per_cleaner,
+            cleaning_date=cleaning_date,
+        )
+        for name, strategy_class in ASSIGNMENT_STRATEGIES.items():
+            strategy = strategy_class()
+            timings: list[float] = []
+            for _ in range(repeat):
+                cleaners: QuerySet = get_available_cleaners(
+                    cleaning_date=cleaning_date,
+                    cleaning_time=BENCHMARK_CLEANING_TIME,
+                    total_time=BENCHMARK_TOTAL_TIME,
+                ).filter(id__in=cleaners_ids)
+                started: float = perf_counter()
+                strategy.choose(
+                    cleaning_date=cleaning_date,
+                    cleaning_time=BENCHMARK_CLEANING_TIME,
+                    total_time=BENCHMARK_TOTAL_TIME,
+                    address_data=address_data,
+                    cleaners=cleaners,
+                )
+                timings.append((perf_counter() - started) * 1000)
+            results[name] = median(timings)
+        transaction.set_rollback(True)
+    return results
+
+
+class Command(BaseCommand):
+    help = 'Benchmark cleaner assignment strategies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            type=int,
+            default=[10, 50, 100, 500],
+            help='Cleaners count for each benchmark run.',
+        )
+        parser.add_argument(
+            '--orders-per-cleaner',
+            type=int,
+            default=4,
+            help='Orders created for each cleaner.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Choices made by each strategy for each size.',
+        )
+
+    def handle(self, *args: any, **options: any):
+        names: list[str] = list(ASSIGNMENT_STRATEGIES)
+        self.stdout.write(
+            'cleaners'.rjust(10) + ''.join(name.rjust(14) for name in names)
+        )
+        try:
+            for size in options['sizes']:
+                results: dict[str, float] = benchmark_strategies(
+                    cleaners_count=size,
+                    orders_per_cleaner=options['orders_per_cleaner'],
+                    repeat=options['repeat'],
+                )
+                self.stdout.write(
+                    str(size).rjust(10) + ''.join(
+                        f'{results[name]:.2f} ms'.rjust(14)
+                        for name in names
+                    )
+                )
+        except Exception as err:
+            raise CommandError(f'Exception has occurred: {err}')
+        return
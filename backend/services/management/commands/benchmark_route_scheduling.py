@@ -0,0 +1,127 @@
+"""
+Команда для сравнения планирования маршрутов уборщиков с учетом адресов
+(api.routing.schedule_day) и без него на синтетических днях.
+
+Заказы генерируются в памяти с фиксированным seed, база данных
+не используется. Для каждого дня выводится время работы планировщика,
+суммарное время в пути и количество нераспределенных заказов.
+Для сравнения заказы по времени начала назначаются первому уборщику,
+который успевает до них доехать.
+
+Вызов команды осуществляется из папки с manage.py файлом:
+python manage.ru benchmark_route_scheduling
+"""
+
+from random import Random
+from time import perf_counter
+from typing import Callable
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.routing import (
+    CleanerRoute, DaySchedule, RouteStop, get_location, schedule_day,
+)
+
+BENCHMARK_DAYS: tuple[tuple[int, int]] = (
+    (100, 25),
+    (300, 70),
+    (600, 140),
+)
+BENCHMARK_CITIES_COUNT: int = 2
+BENCHMARK_STREETS_COUNT: int = 10
+BENCHMARK_DURATIONS: tuple[int] = (60, 90, 120, 180)
+BENCHMARK_WORK_START_MINUTE: int = 8 * 60
+BENCHMARK_WORK_STOP_MINUTE: int = 20 * 60
+BENCHMARK_SLOT_MINUTES: int = 30
+
+
+def generate_day(orders_count: int, seed: int) -> list[RouteStop]:
+    """Генерирует заказы синтетического дня."""
+    random: Random = Random(seed)
+    stops: list[RouteStop] = []
+    slots: range = range(
+        BENCHMARK_WORK_START_MINUTE,
+        BENCHMARK_WORK_STOP_MINUTE,
+        BENCHMARK_SLOT_MINUTES,
+    )
+    for order_id in range(1, orders_count + 1):
+        start: int = random.choice(slots)
+        stops.append(
+            RouteStop(
+                order_id=order_id,
+                start=start,
+                end=start + random.choice(BENCHMARK_DURATIONS),
+                location=get_location(
+                    city=f'city_{random.randrange(BENCHMARK_CITIES_COUNT)}',
+                    street=(
+                        f'street_{random.randrange(BENCHMARK_STREETS_COUNT)}'
+                    ),
+                ),
+            )
+        )
+    return stops
+
+
+def schedule_day_first_fit(
+        stops: list[RouteStop], cleaners_ids: list[int]) -> DaySchedule:
+    """
+    Назначает заказы по времени начала первому уборщику, который
+    успевает до них доехать, без учета близости адресов.
+    """
+    routes: dict[int, CleanerRoute] = {
+        cleaner_id: CleanerRoute(cleaner_id=cleaner_id)
+        for cleaner_id in cleaners_ids
+    }
+    unassigned: list[RouteStop] = []
+    for stop in sorted(stops):
+        for route in routes.values():
+            if route.get_insertion_cost(stop) is not None:
+                route.insert(stop)
+                break
+        else:
+            unassigned.append(stop)
+    return DaySchedule(routes=routes, unassigned=unassigned)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark route-aware scheduling on synthetic days.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of synthetic days generator.',
+        )
+
+    def handle(self, *args: any, **options: any):
+        solvers: dict[str, Callable] = {
+            'first_fit': schedule_day_first_fit,
+            'route_aware': schedule_day,
+        }
+        self.stdout.write(
+            'orders'.rjust(8) + 'cleaners'.rjust(10) + 'solver'.rjust(13) +
+            'time'.rjust(12) + 'travel'.rjust(10) + 'unassigned'.rjust(12)
+        )
+        try:
+            for orders_count, cleaners_count in BENCHMARK_DAYS:
+                stops: list[RouteStop] = generate_day(
+                    orders_count=orders_count, seed=options['seed']
+                )
+                for name, solver in solvers.items():
+                    started: float = perf_counter()
+                    schedule: DaySchedule = solver(
+                        stops, list(range(1, cleaners_count + 1))
+                    )
+                    elapsed: float = (perf_counter() - started) * 1000
+                    self.stdout.write(
+                        str(orders_count).rjust(8) +
+                        str(cleaners_count).rjust(10) +
+                        name.rjust(13) +
+                        f'{elapsed:.1f} ms'.rjust(12) +
+                        str(schedule.travel_minutes).rjust(10) +
+                        str(len(schedule.unassigned)).rjust(12)
+                    )
+        except Exception as err:
+            raise CommandError(f'Exception has occurred: {err}')
+        return
@@ -0,0 +1,72 @@
+"""
+Команда для создания уменьшенных копий изображений услуг
+(см. api.images), у которых копии еще не созданы, а с флагом --all -
+для всех изображений услуг.
+
+Изображения обрабатываются в пуле из --workers процессов: процессы только
+уменьшают и кодируют изображения, а чтение и сохранение файлов и запись
+в базу данных выполняются в основном процессе. Для услуг без размера
+и хэша изображения они также рассчитываются.
+
+Вызов команды осуществляется из папки с manage.py файлом:
+python manage.ru create_service_image_variants --workers 4
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q, QuerySet
+
+from api.images import read_image, render_image_variants, save_image_variants
+from api.pricing import invalidate_price_table
+from services.models import Service
+
+
+class Command(BaseCommand):
+    help = 'Create thumbnails and WebP/AVIF variants of services images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recreate variants of all images.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Number of worker processes.',
+        )
+
+    def handle(self, *args: any, **options: any):
+        try:
+            services: QuerySet = Service.objects.exclude(
+                Q(image='') | Q(image__isnull=True)
+            )
+            if not options['all']:
+                services = services.filter(image_variants={})
+            services: list[Service] = list(services)
+            for service in services:
+                service.update_image_metadata()
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                variants = pool.map(
+                    render_image_variants,
+                    (read_image(service) for service in services),
+                )
+                for service, service_variants in zip(services, variants):
+                    service.image_variants = save_image_variants(
+                        image_hash=service.image_hash,
+                        variants=service_variants,
+                    )
+            # INFO: bulk_update не вызывает сигнал post_save.
+            Service.objects.bulk_update(
+                services,
+                fields=('image_size', 'image_hash', 'image_variants'),
+            )
+            # INFO: ссылки на копии входят в снимок каталога.
+            invalidate_price_table()
+        except Exception as err:
+            raise CommandError(f'Exception has occurred: {err}')
+        self.stdout.write(f'Services images processed: {len(services)}')
+        return
@@ -47,6 +47,8 @@ def return_service_object(data: dict) -> Service:
         file_name: str = f'{import_img_path}{title}.jpg'
         image: File = File(open(file_name, 'rb'))
         service.image.save(file_name, image, save=False)
+        # INFO: bulk_create не вызывает Service.save().
+        service.update_image_metadata()
     except FileNotFoundError:
         pass
     except ValidationError as err:
@@ -0,0 +1,94 @@
+"""
+Команда для пакетного создания заказов корпоративного клиента из csv
+или json файла (см. api.batch.create_orders_batch).
+
+Формат json файла - список заказов в формате запроса
+POST /api/orders/batch/. Столбцы csv файла (разделитель ";"):
+cleaning_type;services;rooms_number;bathrooms_number;city;street;house;
+entrance;floor;apartment;cleaning_date;cleaning_time;comment
+Услуги указываются в формате "id:количество" через запятую: 1:2,5:1.
+
+Для каждого заказа выводится id созданного заказа либо его ошибки.
+
+Вызов команды осуществляется из папки с manage.py файлом:
+python manage.ru import_orders --file orders.csv --user client@email.com
+"""
+
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.batch import ADDRESS_FIELDS, create_orders_batch
+from cleanpro.app_data import ORDER_BATCH_MAX_SIZE
+from users.models import User
+
+CSV_DELIMITER: str = ';'
+
+
+def parse_csv_row(row: dict[str, str]) -> dict[str, any]:
+    """Возвращает заказ в формате запроса по строке csv файла."""
+    order: dict[str, any] = {
+        field: value for field, value in row.items()
+        if field not in ADDRESS_FIELDS and value != ''
+    }
+    order['address'] = {
+        field: row[field] for field in ADDRESS_FIELDS
+        if row.get(field, '') != ''
+    }
+    order['services'] = [
+        dict(zip(('id', 'amount'), service.split(':')))
+        for service in row.get('services', '').split(',') if service
+    ]
+    return order
+
+
+def load_orders(file_name: str) -> list[dict[str, any]]:
+    """Загружает заказы из csv или json файла."""
+    with open(file_name, encoding='utf-8') as file:
+        if file_name.endswith('.json'):
+            return json.load(file)
+        return [
+            parse_csv_row(row)
+            for row in csv.DictReader(file, delimiter=CSV_DELIMITER)
+        ]
+
+
+class Command(BaseCommand):
+    help = 'Create a batch of orders from csv or json file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            required=True,
+            help='Path to csv or json file with orders.',
+        )
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Email of the user who places the orders.',
+        )
+
+    def handle(self, *args: any, **options: any):
+        try:
+            user: User = User.objects.get(email=options['user'])
+            orders: list[dict[str, any]] = load_orders(options['file'])
+            created: int = 0
+            for start in range(0, len(orders), ORDER_BATCH_MAX_SIZE):
+                for result in create_orders_batch(
+                    user=user,
+                    orders_data=orders[start:start + ORDER_BATCH_MAX_SIZE],
+                ):
+                    row: int = start + result['row'] + 1
+                    if 'id' in result:
+                        created += 1
+                        self.stdout.write(
+                            f'Row {row}: order {result["id"]}, '
+                            f'total_sum {result["total_sum"]}'
+                        )
+                    else:
+                        self.stdout.write(f'Row {row}: {result["errors"]}')
+        except Exception as err:
+            raise CommandError(f'Exception has occurred: {err}')
+        self.stdout.write(f'Orders created: {created} of {len(orders)}')
+        return
@@ -0,0 +1,65 @@
+"""
+Команда для заполнения интервалов занятости уборщиков (CleanerBusyInterval)
+по существующим заказам.
+
+Интервалы поддерживаются при сохранении заказов, команда нужна для
+первичного заполнения и восстановления таблицы.
+
+Вызов команды осуществляется из папки с manage.py файлом:
+python manage.ru init_busy_intervals
+"""
+
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.availability import invalidate_available_time
+from cleanpro.app_data import ORDER_CANCELLED_STATUS
+from services.models import CleanerBusyInterval, Order
+
+
+@transaction.atomic
+def rebuild_busy_intervals() -> int:
+    """
+    Пересоздает интервалы занятости для всех неотмененных заказов
+    с назначенным уборщиком. Возвращает количество созданных интервалов.
+    """
+    CleanerBusyInterval.objects.all().delete()
+    orders = Order.objects.filter(
+        cleaner__isnull=False,
+    ).exclude(
+        order_status=ORDER_CANCELLED_STATUS,
+    ).values_list('id', 'cleaner_id', 'cleaning_date', 'cleaning_time',
+                  'total_time')
+    intervals: list[CleanerBusyInterval] = []
+    for order_id, cleaner_id, cleaning_date, cleaning_time, total_time in (
+        orders.iterator()
+    ):
+        start: datetime = timezone.make_aware(
+            datetime.combine(cleaning_date, cleaning_time)
+        )
+        intervals.append(
+            CleanerBusyInterval(
+                order_id=order_id,
+                cleaner_id=cleaner_id,
+                start=start,
+                end=start + timedelta(minutes=total_time),
+            )
+        )
+    CleanerBusyInterval.objects.bulk_create(intervals)
+    invalidate_available_time()
+    return len(intervals)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild cleaners busy intervals from orders.'
+
+    def handle(self, *args: any, **options: any):
+        try:
+            count: int = rebuild_busy_intervals()
+        except Exception as err:
+            raise CommandError(f'Exception has occurred: {err}')
+        self.stdout.write(f'Busy intervals created: {count}')
+        return
@@ -7,8 +7,8 @@ python manage.ru init_reviews_cache
 
 from django.core.management.base import BaseCommand, CommandError
 
-from services.tasks import parse_yandex_maps
-from services.signals import update_cached_reviews
+from api.reviews import build_reviews_cache
+from services.tasks import fetch_reviews
 
 
 class Command(BaseCommand):
@@ -16,8 +16,8 @@ class Command(BaseCommand):
 
     def handle(self, *args: any, **options: any):
         try:
-            parse_yandex_maps()
-            update_cached_reviews()
+            fetch_reviews()
+            build_reviews_cache()
         except Exception as err:
             raise CommandError(f'Exception has occurred: {err}')
         return
@@ -0,0 +1,133 @@
+"""
+Команда для офлайн-планирования маршрутов уборщиков на день.
+
+Перераспределяет неотмененные заказы дня между доступными уборщиками
+с учетом адресов (см. api.routing.schedule_day) и выводит суммарное время
+в пути до и после планирования. Без флага --apply данные не изменяются,
+план с нераспределенными заказами не сохраняется.
+
+Вызов команды осуществляется из папки с manage.py файлом:
+python manage.ru plan_cleaners_routes --date 2024-01-31 --apply
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.availability import get_cleaners_ids, invalidate_available_time
+from api.routing import (
+    CleanerRoute, DaySchedule, RouteStop, load_day_stops, schedule_day,
+)
+from services.models import CleanerBusyInterval, Order
+
+
+def get_current_travel_minutes(
+        stops: list[tuple[RouteStop, int]]) -> int:
+    """Возвращает суммарное время в пути по текущим назначениям."""
+    routes: dict[int, CleanerRoute] = {}
+    for stop, cleaner_id in stops:
+        if cleaner_id is None:
+            continue
+        routes.setdefault(
+            cleaner_id, CleanerRoute(cleaner_id=cleaner_id)
+        ).insert(stop)
+    return sum(route.travel_minutes for route in routes.values())
+
+
+@transaction.atomic
+def apply_day_schedule(
+        cleaning_date: date,
+        schedule: DaySchedule,
+        stops: list[tuple[RouteStop, int]]) -> int:
+    """
+    Сохраняет новые назначения уборщиков и их интервалы занятости.
+    Возвращает количество заказов, у которых сменился уборщик.
+
+    Интервалы перемещаемых заказов удаляются до назначения новых
+    уборщиков, чтобы промежуточные состояния не нарушали ограничение
+    на пересечение интервалов.
+    """
+    assignments: dict[int, int] = schedule.assignments
+    changed: dict[int, RouteStop] = {
+        stop.order_id: stop for stop, cleaner_id in stops
+        if stop.order_id in assignments
+        and assignments[stop.order_id] != cleaner_id
+    }
+    CleanerBusyInterval.objects.filter(order_id__in=changed).delete()
+    intervals: list[CleanerBusyInterval] = []
+    for order_id, stop in changed.items():
+        Order.objects.filter(pk=order_id).update(
+            cleaner_id=assignments[order_id],
+            cleaner_assignment_reason='plan_cleaners_routes',
+        )
+        start: datetime = timezone.make_aware(
+            datetime.combine(cleaning_date, time.min) +
+            timedelta(minutes=stop.start)
+        )
+        intervals.append(
+            CleanerBusyInterval(
+                order_id=order_id,
+                cleaner_id=assignments[order_id],
+                start=start,
+                end=start + timedelta(minutes=stop.end - stop.start),
+            )
+        )
+    CleanerBusyInterval.objects.bulk_create(intervals)
+    invalidate_available_time(dates=(cleaning_date,))
+    return len(changed)
+
+
+class Command(BaseCommand):
+    help = 'Plan cleaners routes for a day using orders addresses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            required=True,
+            help='Cleaning date in YYYY-MM-DD format.',
+        )
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Save planned assignments.',
+        )
+
+    def handle(self, *args: any, **options: any):
+        cleaning_date: date = options['date']
+        try:
+            stops: list[tuple[RouteStop, int]] = load_day_stops(
+                cleaning_date=cleaning_date
+            )
+            schedule: DaySchedule = schedule_day(
+                stops=(stop for stop, _ in stops),
+                cleaners_ids=get_cleaners_ids(cleaning_date=cleaning_date),
+            )
+            self.stdout.write(
+                f'Orders: {len(stops)}, '
+                f'unassigned: {len(schedule.unassigned)}\n'
+                f'Travel minutes: {get_current_travel_minutes(stops)} -> '
+                f'{schedule.travel_minutes}'
+            )
+            if schedule.unassigned:
+                self.stdout.write(
+                    'Orders without feasible route: ' + ', '.join(
+                        str(stop.order_id) for stop in schedule.unassigned
+                    )
+                )
+            if options['apply'] and schedule.unassigned:
+                # INFO: прежние уборщики нераспределенных заказов могли
+                #       получить пересекающиеся с ними заказы.
+                raise ValueError('plan has orders without feasible route')
+            if options['apply']:
+                changed: int = apply_day_schedule(
+                    cleaning_date=cleaning_date,
+                    schedule=schedule,
+                    stops=stops,
+                )
+                self.stdout.write(f'Orders reassigned: {changed}')
+        except Exception as err:
+            raise CommandError(f'Exception has occurred: {err}')
+        return
@@ -0,0 +1,24 @@
+"""
+Команда для пересчета агрегатов оценок отзывов (см. api.rating_aggregates)
+по всем отзывам: после загрузки отзывов в обход сигналов или изменения
+уборщиков завершенных заказов.
+
+Вызов команды осуществляется из папки с manage.py файлом:
+python manage.ru rebuild_rating_aggregates
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.rating_aggregates import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Rebuild rating aggregates from all ratings.'
+
+    def handle(self, *args: any, **options: any):
+        try:
+            aggregates: int = rebuild_rating_aggregates()
+        except Exception as err:
+            raise CommandError(f'Exception has occurred: {err}')
+        self.stdout.write(f'Rating aggregates rebuilt: {aggregates}')
+        return
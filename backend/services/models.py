@@ -2,19 +2,36 @@
 #       совпадает с валидацией на сервере!
 
 from datetime import datetime, timedelta
+from hashlib import sha256
+from typing import Optional
 
 from django.conf import settings
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import (
+    DateTimeRangeField, RangeBoundary, RangeOperators,
+)
+from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.utils import timezone
 
 from cleanpro.app_data import (
     CLEANING_TIME_MINUTE_MIN,
     CLEANING_TYPE_TITLE_MAX_LEN, CLEANING_TYPE_COEF_MIN_VAL,
+    EMAIL_OUTBOX_SUBJECT_MAX_LEN,
+    HOLIDAY_TITLE_MAX_LEN,
+    IDEMPOTENCY_KEY_HASH_LEN,
     MEASURE_TITLE_MAX_LEN,
-    ORDER_COMMENT_MAX_LEN, ORDER_STATUS_CHOICES, ORDER_TOTAL_SUM_MIN_VAL,
+    BUSY_INTERVAL_EXCLUSION_CONSTRAINT,
+    ORDER_ASSIGNMENT_REASON_MAX_LEN,
+    ORDER_CANCELLED_STATUS, ORDER_COMMENT_MAX_LEN, ORDER_STATUS_CHOICES,
+    ORDER_TOTAL_SUM_MIN_VAL,
     ORDER_TOTAL_TIME_MIN_VAL,
-    SERVICE_PRICE_MIN_VAL, SERVICE_TITLE_MAX_LEN, SERVICE_TYPE,
-    SERVICE_TYPE_MAX_LEN,
+    RATING_AVERAGE_PRECISION, RATING_CONTENT_HASH_LEN, RATING_SCORES,
+    RATING_SOURCE_CHOICES, RATING_SOURCE_MAX_LEN,
+    RECURRENCE_INTERVAL_CHOICES,
+    SERVICE_IMAGE_HASH_LEN, SERVICE_PRICE_MIN_VAL, SERVICE_TITLE_MAX_LEN,
+    SERVICE_TYPE, SERVICE_TYPE_MAX_LEN,
 )
 from users.models import Address
 
@@ -65,6 +82,24 @@ class Service(models.Model):
         null=True,
         blank=True,
     )
+    image_size = models.PositiveIntegerField(
+        verbose_name='Размер изображения в байтах',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    image_hash = models.CharField(
+        verbose_name='Хэш изображения',
+        max_length=SERVICE_IMAGE_HASH_LEN,
+        blank=True,
+        editable=False,
+    )
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии изображения',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     service_type = models.CharField(
         verbose_name='Тип услуги',
         choices=SERVICE_TYPE,
@@ -88,6 +123,38 @@ class Service(models.Model):
     def __str__(self):
         return self.title
 
+    def update_image_metadata(self) -> None:
+        """
+        Рассчитывает размер и хэш нового изображения услуги или
+        изображения, для которого они еще не рассчитаны. При изменении
+        изображения сбрасывает его уменьшенные копии.
+        """
+        if not self.image:
+            self.image_size, self.image_hash = None, ''
+            self.image_variants = {}
+            return
+        if self.image._committed and self.image_hash:
+            return
+        image_hash = sha256()
+        for chunk in self.image.chunks():
+            image_hash.update(chunk)
+        self.image_size = self.image.size
+        if self.image_hash != image_hash.hexdigest():
+            # INFO: копии нового изображения создаются задачей
+            #       create_service_image_variants.
+            self.image_variants = {}
+        self.image_hash = image_hash.hexdigest()
+        return
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет услугу с метаданными изображения, чтобы не читать файл
+        изображения при каждом ответе API.
+        """
+        self.update_image_metadata()
+        super().save(*args, **kwargs)
+        return
+
 
 class CleaningType(models.Model):
     """Модель наборов услуг."""
@@ -160,6 +227,13 @@ class Order(models.Model):
         blank=True,
         null=True,
     )
+    cleaner_assignment_reason = models.CharField(
+        verbose_name='Причина назначения уборщика',
+        max_length=ORDER_ASSIGNMENT_REASON_MAX_LEN,
+        default=None,
+        blank=True,
+        null=True,
+    )
     total_sum = models.IntegerField(
         verbose_name='Сумма',
         validators=[
@@ -262,6 +336,14 @@ class Order(models.Model):
         blank=True,
         null=True,
     )
+    recurrence = models.ForeignKey(
+        verbose_name='Регулярная уборка',
+        to='OrderRecurrence',
+        related_name='orders',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+    )
 
     class Meta:
         constraints = [
@@ -270,21 +352,209 @@ class Order(models.Model):
                 name='unique_address_cleaning',
             ),
         ]
-        ordering = ('-cleaning_date', '-cleaning_time',)
+        # INFO: индексы совпадают с сортировкой заказов, по ним выполняется
+        #       постраничный вывод по ключу (см. api.pagination).
+        indexes = [
+            models.Index(
+                fields=('-cleaning_date', '-cleaning_time', '-id'),
+                name='order_cleaning_desc_idx',
+            ),
+            models.Index(
+                fields=('user', '-cleaning_date', '-cleaning_time', '-id'),
+                name='order_user_cleaning_desc_idx',
+            ),
+        ]
+        ordering = ('-cleaning_date', '-cleaning_time', '-id',)
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
 
     def __str__(self):
         return f"Заказ № {self.id}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает загруженную из базы данных дату уборки, чтобы при
+        переносе заказа сбросить кэш доступного времени и для прежнего дня.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_cleaning_date = instance.__dict__.get(
+            'cleaning_date'
+        )
+        return instance
+
+    def clean(self):
+        """
+        Проверяет, что назначенный уборщик свободен во время уборки.
+        """
+        if any(
+            value is None for value in (
+                self.cleaner_id, self.cleaning_date, self.cleaning_time,
+                self.total_time,
+            )
+        ) or self.order_status == ORDER_CANCELLED_STATUS:
+            return
+        start, end = self.get_cleaning_period()
+        if CleanerBusyInterval.objects.filter(
+            cleaner_id=self.cleaner_id,
+            end__gt=start,
+            start__lt=end,
+        ).exclude(order_id=self.pk).exists():
+            raise ValidationError(
+                {'cleaner': 'Уборщик занят в указанное время.'}
+            )
+        return
+
+    def get_cleaning_period(self) -> tuple[datetime, datetime]:
+        """Возвращает время начала и окончания уборки."""
+        time_start: datetime = timezone.make_aware(
+            datetime.combine(
+                date=self.cleaning_date,
+                time=self.cleaning_time,
+            )
+        )
+        return time_start, time_start + timedelta(minutes=self.total_time)
+
     def save(self, *args, **kwargs):
-        time_start: datetime = datetime.combine(
-            date=self.cleaning_date,
-            time=self.cleaning_time,
+        """
+        Сохраняет заказ и его интервал занятости уборщика в одной транзакции.
+
+        В PostgreSQL при пересечении интервала с другим заказом уборщика
+        вызывает IntegrityError: изменения заказа при этом откатываются.
+        """
+        time_start, time_end = self.get_cleaning_period()
+        self.cleaning_time_end = timezone.localtime(time_end).time()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.update_busy_interval(start=time_start, end=time_end)
+
+    def update_busy_interval(self, start: datetime, end: datetime) -> None:
+        """
+        Обновляет интервал занятости уборщика заказа: удаляет его, если
+        уборщик не назначен или заказ отменен, иначе - создает или
+        переносит на указанное время.
+        """
+        if self.cleaner_id is None or (
+            self.order_status == ORDER_CANCELLED_STATUS
+        ):
+            CleanerBusyInterval.objects.filter(order=self).delete()
+            return
+        CleanerBusyInterval.objects.update_or_create(
+            order=self,
+            defaults={
+                'cleaner_id': self.cleaner_id,
+                'start': start,
+                'end': end,
+            },
         )
-        time_end = time_start + timedelta(minutes=self.total_time)
-        self.cleaning_time_end = time_end.time()
-        super().save(*args, **kwargs)
+        return
+
+
+class TsTzRange(models.Func):
+    """Функция PostgreSQL для построения диапазона временных меток."""
+
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
+
+class PostgresExclusionConstraint(ExclusionConstraint):
+    """
+    Исключающее ограничение, которое создается и проверяется только
+    в PostgreSQL.
+
+    Ограничение объявляется в модели для любой базы данных, поэтому
+    миграции не зависят от базы данных, на которой они созданы.
+    В остальных базах данных (SQLite в DEBUG и тестах) операции миграций
+    с ограничением не выполняют SQL.
+    """
+
+    def constraint_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().constraint_sql(model, schema_editor)
+
+    def create_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().create_sql(model, schema_editor)
+
+    def remove_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().remove_sql(model, schema_editor)
+
+    def validate(self, model, instance, exclude=None, using=DEFAULT_DB_ALIAS):
+        if connections[using].vendor != 'postgresql':
+            return
+        super().validate(model, instance, exclude=exclude, using=using)
+        return
+
+
+class CleanerBusyInterval(models.Model):
+    """
+    Модель интервала занятости уборщика.
+
+    Денормализованная копия времени уборки назначенного заказа, которая
+    поддерживается при сохранении заказа: одна запись на каждый заказ
+    с назначенным уборщиком, кроме отмененных. Составной индекс позволяет
+    проверить занятость уборщика одним поиском по индексу.
+
+    В PostgreSQL пересечение интервалов одного уборщика запрещено
+    исключающим ограничением на диапазоне [start, end), поэтому
+    параллельные заказы не могут занять одного уборщика дважды.
+    """
+
+    cleaner = models.ForeignKey(
+        verbose_name='Уборщик',
+        to=settings.AUTH_USER_MODEL,
+        related_name='busy_intervals',
+        on_delete=models.CASCADE,
+    )
+    order = models.OneToOneField(
+        verbose_name='Заказ',
+        to=Order,
+        related_name='busy_interval',
+        on_delete=models.CASCADE,
+    )
+    start = models.DateTimeField(
+        verbose_name='Начало уборки',
+    )
+    end = models.DateTimeField(
+        verbose_name='Окончание уборки',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('cleaner', 'end', 'start'),
+                name='busy_interval_cleaner_idx',
+            ),
+            models.Index(
+                fields=('start', 'end'),
+                name='busy_interval_start_idx',
+            ),
+        ]
+        # INFO: исключающие ограничения поддерживаются только PostgreSQL,
+        #       в SQLite (DEBUG и тесты) пересечения проверяются
+        #       только при подборе уборщика.
+        constraints = [
+            PostgresExclusionConstraint(
+                name=BUSY_INTERVAL_EXCLUSION_CONSTRAINT,
+                expressions=(
+                    (
+                        TsTzRange('start', 'end', RangeBoundary()),
+                        RangeOperators.OVERLAPS,
+                    ),
+                    ('cleaner', RangeOperators.EQUAL),
+                ),
+            ),
+        ]
+        ordering = ('start',)
+        verbose_name = 'Интервал занятости уборщика'
+        verbose_name_plural = 'Интервалы занятости уборщиков'
+
+    def __str__(self):
+        return f'{self.cleaner} занят с {self.start} по {self.end}'
 
 
 class ServicesInOrder(models.Model):
@@ -317,6 +587,71 @@ class ServicesInOrder(models.Model):
         verbose_name_plural = 'Услуги в заказах'
 
 
+class OrderRecurrence(models.Model):
+    """
+    Модель регулярной уборки.
+
+    Заказы регулярной уборки создаются задачей materialize_recurring_orders
+    по образцу шаблонного заказа с периодом interval_weeks недель.
+    Поле next_date хранит дату следующего еще не созданного заказа, поэтому
+    задача обрабатывает только регулярные уборки, для которых наступил
+    срок создания заказов. Даты, на которые не нашлось свободного уборщика
+    или заказ на адрес и время уже существует, сохраняются в skipped_dates
+    до наступления этих дат. После отмены шаблонного заказа регулярная
+    уборка отключается.
+    """
+
+    template = models.OneToOneField(
+        Order,
+        verbose_name='Шаблонный заказ',
+        related_name='recurrence_template',
+        on_delete=models.CASCADE,
+    )
+    interval_weeks = models.PositiveSmallIntegerField(
+        verbose_name='Период',
+        choices=RECURRENCE_INTERVAL_CHOICES,
+        default=RECURRENCE_INTERVAL_CHOICES[0][0],
+    )
+    next_date = models.DateField(
+        verbose_name='Дата следующего заказа',
+        db_index=True,
+        blank=True,
+    )
+    end_date = models.DateField(
+        verbose_name='Дата окончания',
+        blank=True,
+        null=True,
+    )
+    is_active = models.BooleanField(
+        verbose_name='Активна',
+        default=True,
+    )
+    skipped_dates = models.JSONField(
+        verbose_name='Пропущенные даты',
+        default=list,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'Регулярная уборка'
+        verbose_name_plural = 'Регулярные уборки'
+
+    def __str__(self):
+        return f'Регулярная уборка по заказу № {self.template_id}'
+
+    def save(self, *args, **kwargs):
+        """
+        Устанавливает дату следующего заказа новой регулярной уборки:
+        через период после шаблонного заказа.
+        """
+        if self.next_date is None:
+            self.next_date = self.template.cleaning_date + timedelta(
+                weeks=self.interval_weeks
+            )
+        super().save(*args, **kwargs)
+        return
+
+
 class Rating(models.Model):
     """Модель отзывов заказов
 
@@ -369,6 +704,15 @@ class Rating(models.Model):
             MaxValueValidator(5, 'Укажите оценку от 1 до 5.'),
         ),
     )
+    # INFO: заполняется только для отзывов с Я.Карт (см. api.yandex_maps).
+    content_hash = models.CharField(
+        verbose_name='Хэш отзыва с Я.Карт',
+        max_length=RATING_CONTENT_HASH_LEN,
+        unique=True,
+        blank=True,
+        null=True,
+        editable=False,
+    )
 
     class Meta:
         constraints = [
@@ -385,13 +729,236 @@ class Rating(models.Model):
         """
         Добавляет значение поля username для пользователей,
         которые оставили отзыв на сайте к заказу.
+
+        Сохранение выполняется в транзакции вместе с обновлением
+        агрегатов оценок в сигнале post_save (см. api.rating_aggregates).
         """
         if self.user:
             self.username = self.user.username
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
         return
 
     def __str__(self):
         return (
             f'Отзыв {self.username} с оценкой {self.score} от {self.pub_date}.'
         )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает загруженные из базы данных источник, заказ и оценку,
+        чтобы при их изменении вычесть прежнюю оценку из агрегатов.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rating = instance.get_aggregate_state()
+        return instance
+
+    def get_aggregate_state(self) -> tuple:
+        """
+        Возвращает поля, от которых зависит вклад отзыва в агрегаты
+        оценок: с Я.Карт ли отзыв, id заказа и оценку.
+        """
+        return (
+            self.__dict__.get('from_maps'),
+            self.__dict__.get('order_id'),
+            self.__dict__.get('score'),
+        )
+
+
+class RatingAggregate(models.Model):
+    """
+    Модель агрегата оценок отзывов: количество отзывов с каждой оценкой
+    по источнику отзывов, а для отзывов на сайте - также по уборщику.
+
+    Запись без уборщика содержит все отзывы источника. Счетчики
+    изменяются в транзакции записи отзыва (см. api.rating_aggregates)
+    и пересчитываются командой rebuild_rating_aggregates.
+    """
+
+    source = models.CharField(
+        verbose_name='Источник отзывов',
+        max_length=RATING_SOURCE_MAX_LEN,
+        choices=RATING_SOURCE_CHOICES,
+    )
+    cleaner = models.ForeignKey(
+        verbose_name='Уборщик',
+        to=settings.AUTH_USER_MODEL,
+        related_name='rating_aggregates',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+    )
+    score_1 = models.IntegerField(verbose_name='Оценок 1', default=0)
+    score_2 = models.IntegerField(verbose_name='Оценок 2', default=0)
+    score_3 = models.IntegerField(verbose_name='Оценок 3', default=0)
+    score_4 = models.IntegerField(verbose_name='Оценок 4', default=0)
+    score_5 = models.IntegerField(verbose_name='Оценок 5', default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('source',),
+                condition=models.Q(cleaner__isnull=True),
+                name='unique_source_rating_aggregate',
+            ),
+            models.UniqueConstraint(
+                fields=('source', 'cleaner'),
+                condition=models.Q(cleaner__isnull=False),
+                name='unique_source_cleaner_rating_aggregate',
+            ),
+        ]
+        verbose_name = 'Агрегат оценок'
+        verbose_name_plural = 'Агрегаты оценок'
+
+    def __str__(self):
+        return f'Оценки {self.source} {self.cleaner_id or ""}'.strip()
+
+    @property
+    def histogram(self) -> dict[int, int]:
+        """Возвращает количество отзывов с каждой оценкой."""
+        return {
+            score: getattr(self, f'score_{score}') for score in RATING_SCORES
+        }
+
+    @property
+    def count(self) -> int:
+        """Возвращает количество отзывов."""
+        return sum(self.histogram.values())
+
+    @property
+    def average(self) -> Optional[float]:
+        """Возвращает среднюю оценку либо None, если отзывов нет."""
+        count: int = self.count
+        if not count:
+            return None
+        return round(
+            sum(score * amount for score, amount in self.histogram.items())
+            / count,
+            RATING_AVERAGE_PRECISION,
+        )
+
+
+class Holiday(models.Model):
+    """
+    Модель нерабочего дня компании.
+
+    В нерабочий день бронирование уборок недоступно независимо
+    от рабочих часов дня недели (SCHEDULE_WORK_HOURS).
+    """
+
+    date = models.DateField(
+        verbose_name='Дата',
+        unique=True,
+    )
+    title = models.CharField(
+        verbose_name='Название',
+        max_length=HOLIDAY_TITLE_MAX_LEN,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ('date',)
+        verbose_name = 'Нерабочий день'
+        verbose_name_plural = 'Нерабочие дни'
+
+    def __str__(self):
+        return f'{self.date} {self.title}'.strip()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает загруженную из базы данных дату, чтобы при ее изменении
+        сбросить кэш доступного времени и для прежнего дня.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_date = instance.__dict__.get('date')
+        return instance
+
+
+class IdempotencyKey(models.Model):
+    """
+    Модель сохраненного ответа на запрос с заголовком Idempotency-Key.
+
+    Основное хранилище ответов - кэш, записи модели используются, если
+    ответ отсутствует в кэше. Ключ - хэш пользователя, метода, пути запроса
+    и значения заголовка, отпечаток - хэш тела запроса.
+    """
+
+    key = models.CharField(
+        verbose_name='Ключ',
+        max_length=IDEMPOTENCY_KEY_HASH_LEN,
+        unique=True,
+    )
+    fingerprint = models.CharField(
+        verbose_name='Отпечаток запроса',
+        max_length=IDEMPOTENCY_KEY_HASH_LEN,
+    )
+    status_code = models.PositiveSmallIntegerField(
+        verbose_name='Код ответа',
+    )
+    response = models.JSONField(
+        verbose_name='Ответ',
+        null=True,
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата создания',
+        auto_now_add=True,
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+
+    def __str__(self):
+        return self.key
+
+
+class OutboxEmail(models.Model):
+    """
+    Модель электронного письма в очереди на отправку.
+
+    Письмо сохраняется в транзакции запроса и отправляется задачей
+    send_queued_emails после фиксации транзакции. Отправленные письма
+    удаляются, неотправленные повторяются с увеличивающейся задержкой,
+    а после EMAIL_OUTBOX_MAX_ATTEMPTS попыток остаются в таблице
+    без даты следующей попытки.
+    """
+
+    subject = models.CharField(
+        verbose_name='Тема',
+        max_length=EMAIL_OUTBOX_SUBJECT_MAX_LEN,
+    )
+    body = models.TextField(
+        verbose_name='Текст',
+    )
+    to = models.JSONField(
+        verbose_name='Получатели',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Количество попыток',
+        default=0,
+    )
+    next_attempt = models.DateTimeField(
+        verbose_name='Дата следующей попытки',
+        default=timezone.now,
+        null=True,
+        db_index=True,
+    )
+    error = models.TextField(
+        verbose_name='Ошибка последней попытки',
+        blank=True,
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата создания',
+        auto_now_add=True,
+    )
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Письма в очереди'
+
+    def __str__(self):
+        return f'{self.subject} ({", ".join(self.to)})'
@@ -2,39 +2,131 @@
 Перечень Django-signals приложения Service.
 """
 
-from django.core.cache import cache
-from django.db.models import QuerySet
-from django.db.models.signals import post_save
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from api.serializers import RatingSerializer
-from cleanpro.app_data import REVIEW_CACHED_KEY
-from services.models import Rating
+from api.availability import invalidate_available_time
+from api.pricing import invalidate_price_table
+from api.rating_aggregates import apply_rating_change
+from api.reviews import delete_cached_reviews, update_cached_reviews
+from services.models import (
+    CleaningType, Holiday, Measure, Order, Rating, Service,
+    ServicesInCleaningType,
+)
 
 
-def get_cached_reviews():
+@receiver(signal=post_save, sender=Rating)
+def post_save_receiver(sender, instance, created, **kwargs):
     """
-    Возвращает кеши отзывов.
+    Получает сигнал post_save и обновляет отзыв в кэше отзывов.
     """
-    return cache.get(REVIEW_CACHED_KEY)
+    update_cached_reviews(ratings=(instance,))
+    return
 
 
-def update_cached_reviews():
+@receiver(signal=post_delete, sender=Rating)
+def rating_post_delete_receiver(sender, instance, **kwargs):
+    """Удаляет отзыв из кэша отзывов и вычитает его из агрегатов оценок."""
+    delete_cached_reviews(rating_ids=(instance.pk,))
+    apply_rating_change(rating=instance, deleted=True)
+    return
+
+
+@receiver(signal=post_save, sender=Rating)
+def rating_aggregates_post_save_receiver(sender, instance, **kwargs):
     """
-    Обновляет кэш отзывов.
+    Изменяет агрегаты оценок на разницу между прежним и новым
+    состоянием отзыва в транзакции сохранения отзыва.
     """
-    reviews: QuerySet = Rating.objects.all()
-    serializer = RatingSerializer(reviews, many=True)
-    cache.set(REVIEW_CACHED_KEY, serializer.data)
+    apply_rating_change(rating=instance)
     return
 
 
-# TODO: надо также реализовать кэш на любое изменение объектов модели.
-@receiver(signal=post_save, sender=Rating)
-def post_save_receiver(sender, instance, created, **kwargs):
+@receiver(signal=post_save, sender=Order)
+def order_post_save_receiver(sender, instance, created, **kwargs):
+    """
+    Сбрасывает кэш доступного времени для дня уборки заказа, а при переносе
+    заказа - также для прежнего дня.
+    """
+    invalidate_available_time(
+        dates=(
+            instance.cleaning_date,
+            getattr(instance, '_loaded_cleaning_date', None),
+        ),
+    )
+    instance._loaded_cleaning_date = instance.cleaning_date
+    return
+
+
+@receiver(signal=post_delete, sender=Order)
+def order_post_delete_receiver(sender, instance, **kwargs):
+    """Сбрасывает кэш доступного времени для дня уборки удаленного заказа."""
+    invalidate_available_time(dates=(instance.cleaning_date,))
+    return
+
+
+@receiver(signal=post_save, sender=Holiday)
+def holiday_post_save_receiver(sender, instance, created, **kwargs):
+    """
+    Сбрасывает кэш доступного времени для нерабочего дня, а при переносе
+    нерабочего дня - также для прежней даты.
+    """
+    invalidate_available_time(
+        dates=(instance.date, getattr(instance, '_loaded_date', None)),
+    )
+    instance._loaded_date = instance.date
+    return
+
+
+@receiver(signal=post_delete, sender=Holiday)
+def holiday_post_delete_receiver(sender, instance, **kwargs):
+    """Сбрасывает кэш доступного времени для удаленного нерабочего дня."""
+    invalidate_available_time(dates=(instance.date,))
+    return
+
+
+@receiver(signal=post_save, sender=CleaningType)
+@receiver(signal=post_delete, sender=CleaningType)
+@receiver(signal=post_save, sender=Service)
+@receiver(signal=post_delete, sender=Service)
+@receiver(signal=post_save, sender=Measure)
+@receiver(signal=post_delete, sender=Measure)
+@receiver(signal=post_save, sender=ServicesInCleaningType)
+@receiver(signal=post_delete, sender=ServicesInCleaningType)
+def catalog_change_receiver(sender, instance, **kwargs):
+    """
+    Сбрасывает таблицу цен и снимок каталога при изменении или удалении
+    услуги, набора услуг, услуги в наборе или единицы измерения.
+    """
+    invalidate_price_table()
+    return
+
+
+@receiver(signal=post_save, sender=Service)
+def service_image_receiver(sender, instance, **kwargs):
+    """
+    Запускает создание уменьшенных копий нового изображения услуги
+    после фиксации транзакции.
+    """
+    if not instance.image or instance.image_variants:
+        return
+    # INFO: services.tasks импортирует этот модуль.
+    from services.tasks import create_service_image_variants
+    transaction.on_commit(
+        lambda: create_service_image_variants.delay(service_id=instance.pk)
+    )
+    return
+
+
+def create_btree_gist_extension(sender, using, **kwargs):
     """
-    Получает сигнал post_save и направляет на соответствующий обработчик.
+    Получает сигнал pre_migrate и создает в PostgreSQL расширение btree_gist,
+    необходимое для исключающего ограничения интервалов занятости уборщиков.
     """
-    if isinstance(instance, Rating):
-        update_cached_reviews()
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
     return
@@ -2,64 +2,89 @@
 Список задач для Celery.
 """
 
-from datetime import datetime, timedelta
-import requests
+from datetime import date, timedelta
 
-from bs4 import BeautifulSoup
-from bs4.element import Tag, ResultSet
 from celery import shared_task
-from django.core.exceptions import ValidationError
-from django.db.models import QuerySet
-from rest_framework import status
+from django.utils import timezone
 
-from cleanpro.app_data import CLEANPRO_YA_MAPS_URL
-from services.models import Rating
-from services.signals import update_cached_reviews
+from api.email_outbox import send_queued_emails as send_outbox_emails
+from api.images import create_image_variants
+from api.recurrence import materialize_recurring_orders
+from api.review_sources import import_reviews
+from api.work_calendar import get_slot_grid
+from cleanpro.app_data import (
+    AVAILABLE_TIME_WARM_UP_DAYS, IDEMPOTENCY_CACHE_TIMEOUT,
+)
+from services.models import IdempotencyKey, Service
 
 
 @shared_task
-def parse_yandex_maps():
-    response: requests = requests.get(CLEANPRO_YA_MAPS_URL)
-    if not response.status_code == status.HTTP_200_OK:
-        raise Exception(
-            f'Указан неверный URL отзыва: "{CLEANPRO_YA_MAPS_URL}"'
-        )
-    soup: BeautifulSoup = BeautifulSoup(response.text, features="html.parser")
-    if not soup:
-        raise Exception('Отзывы отсутствуют.')
-    all_comment_elements: ResultSet = soup.find_all('div', class_='comment')
-    all_comments: QuerySet = Rating.objects.all()
-    new_comments: list[Rating] = []
-    for comment in all_comment_elements:
-        text: str = comment.find('p', class_='comment__text').text.strip()
-        if all_comments.filter(text=text).exists():
-            break
-        username: str = comment.find('p', class_='comment__name').text.strip()
-        stars_ul: Tag = comment.find('ul', class_='stars-list')
-        stars: ResultSet = stars_ul.find_all('li', class_='stars-list__star')
-        full_stars: list[Tag] = [
-            star for star in stars if
-            '_empty' not in star.get('class') and
-            '_half' not in star.get('class')
-        ]
-        try:
-            new_comments.append(
-                Rating(
-                    username=username,
-                    from_maps=True,
-                    # INFO: на картах просто указывается что-то вроде
-                    #       "1 января" без указания года. Чтобы не
-                    #       усложнять логику - данная задача запускается
-                    #       разв сутки в 00:00 (UTC+3) и записывает
-                    #       "вчерашние" отзывы.
-                    pub_date=datetime.now() - timedelta(days=1),
-                    text=text,
-                    score=len(full_stars),
-                )
-            )
-        except ValidationError:
-            continue
-    if new_comments:
-        Rating.objects.bulk_create(new_comments)
-        update_cached_reviews()
+def fetch_reviews():
+    """
+    Загружает новые отзывы со всех страниц отзывов
+    (см. api.review_sources.import_reviews).
+    """
+    import_reviews()
+    return
+
+
+@shared_task
+def warm_up_available_time():
+    """
+    Рассчитывает и сохраняет в кэш доступное время для бронирования
+    на AVAILABLE_TIME_WARM_UP_DAYS дней вперед. Уже закэшированные дни
+    не пересчитываются.
+    """
+    today: date = date.today()
+    get_slot_grid().get_free_runs(
+        dates=[
+            today + timedelta(days=day)
+            for day in range(AVAILABLE_TIME_WARM_UP_DAYS)
+        ],
+    )
+    return
+
+
+@shared_task
+def create_recurring_orders():
+    """
+    Создает заказы регулярных уборок на RECURRENCE_MATERIALIZE_DAYS дней
+    вперед (см. api.recurrence.materialize_recurring_orders).
+    """
+    materialize_recurring_orders()
+    return
+
+
+@shared_task
+def delete_expired_idempotency_keys():
+    """
+    Удаляет сохраненные ответы на запросы с заголовком Idempotency-Key,
+    срок хранения которых в кэше истек.
+    """
+    IdempotencyKey.objects.filter(
+        created__lt=timezone.now() - timedelta(
+            seconds=IDEMPOTENCY_CACHE_TIMEOUT
+        ),
+    ).delete()
+    return
+
+
+@shared_task
+def send_queued_emails():
+    """
+    Отправляет письма из очереди исходящих писем
+    (см. api.email_outbox.send_queued_emails).
+    """
+    send_outbox_emails()
+    return
+
+
+@shared_task
+def create_service_image_variants(service_id: int):
+    """
+    Создает уменьшенные копии изображения услуги (см. api.images).
+    """
+    service: Service = Service.objects.filter(pk=service_id).first()
+    if service is not None:
+        create_image_variants(service=service)
     return
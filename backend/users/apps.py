@@ -1,5 +1,4 @@
 from django.apps import AppConfig
-from django.db.models.signals import post_save
 
 
 class UsersConfig(AppConfig):
@@ -7,10 +6,8 @@ class UsersConfig(AppConfig):
     verbose_name = 'Пользователи'
 
     def ready(self) -> None:
-        from .signals import post_save_receiver
+        # INFO: импорт модуля регистрирует обработчики сигналов
+        #       с декоратором receiver.
+        from . import signals  # noqa: F401
 
-        post_save.connect(
-            receiver=post_save_receiver,
-            dispatch_uid='update_cached_reviews',
-        )
         return super().ready()
@@ -9,6 +9,7 @@ from django.db.models import QuerySet
 from django.core.management.base import BaseCommand, CommandError
 from django.core.exceptions import ValidationError
 
+from api.availability import invalidate_available_time
 from api.utils import create_password
 from users.models import User
 
@@ -53,6 +54,8 @@ def create_cleaners(count: int) -> None:
             # TODO: Подключить логгер
             print(f'Уборщик №{i} не был добавлен: {err}')
     User.objects.bulk_create(new_cleaners)
+    if new_cleaners:
+        invalidate_available_time()
     return
 
 
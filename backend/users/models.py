@@ -1,6 +1,8 @@
 # TODO: при релизе проверить, что валидация на клиенте
 #       совпадает с валидацией на сервере!
 
+from datetime import date
+
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator
@@ -186,3 +188,24 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.email
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает загруженные из базы данных статус уборщика и даты
+        отпуска, чтобы при их изменении сбросить кэш доступного времени.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_schedule = instance.get_schedule_state()
+        return instance
+
+    def get_schedule_state(self) -> tuple[bool, date, date]:
+        """
+        Возвращает данные, влияющие на график уборщика:
+        статус уборщика, начало и конец отпуска.
+        """
+        return (
+            self.__dict__.get('is_cleaner'),
+            self.__dict__.get('on_vacation_from'),
+            self.__dict__.get('on_vacation_to'),
+        )
@@ -2,12 +2,18 @@
 Перечень Django-signals приложения Users.
 """
 
-from django.db.models.signals import post_save
+from datetime import date, timedelta
+from typing import Optional
+
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 
+from api.availability import invalidate_available_time
 from api.utils import send_mail
-from cleanpro.app_data import EMAIL_REGISTER_SUBJECT, EMAIL_REGISTER_TEXT
+from cleanpro.app_data import (
+    AVAILABLE_TIME_CACHE_MAX_DAYS, EMAIL_REGISTER_SUBJECT, EMAIL_REGISTER_TEXT,
+)
 from users.models import User
 
 
@@ -28,6 +34,67 @@ def post_save_receiver(sender, instance, created, **kwargs):
     """
     Получает сигнал post_save и направляет на соответствующий обработчик.
     """
-    if isinstance(instance, User):
-        sent_register_email(user=instance)
+    sent_register_email(user=instance)
+    return
+
+
+def get_vacation_dates(
+        vacation_from: date, vacation_to: date) -> Optional[list[date]]:
+    """
+    Возвращает список дней отпуска, начиная с сегодняшнего.
+    Возвращает None, если отпуск не ограничен по времени или
+    длится дольше AVAILABLE_TIME_CACHE_MAX_DAYS дней.
+    """
+    if vacation_from is None:
+        return []
+    if vacation_to is None:
+        return None
+    vacation_from: date = max(vacation_from, date.today())
+    days: int = (vacation_to - vacation_from).days + 1
+    if days > AVAILABLE_TIME_CACHE_MAX_DAYS:
+        return None
+    return [vacation_from + timedelta(days=day) for day in range(days)]
+
+
+def invalidate_cleaner_schedule(user: User) -> None:
+    """
+    Сбрасывает кэш доступного времени, если изменился статус уборщика
+    или даты его отпуска: для дней прежнего и нового отпуска, либо
+    полностью при изменении статуса уборщика.
+    """
+    loaded_state: tuple = getattr(user, '_loaded_schedule', None)
+    state: tuple = user.get_schedule_state()
+    user._loaded_schedule = state
+    if loaded_state == state or (loaded_state is None and not user.is_cleaner):
+        return
+    if loaded_state is None or loaded_state[0] != state[0]:
+        invalidate_available_time()
+        return
+    loaded_dates: list[date] = get_vacation_dates(*loaded_state[1:])
+    dates: list[date] = get_vacation_dates(*state[1:])
+    if loaded_dates is None or dates is None:
+        invalidate_available_time()
+        return
+    invalidate_available_time(dates=loaded_dates + dates)
+    return
+
+
+@receiver(signal=post_save, sender=User)
+def cleaner_post_save_receiver(sender, instance, created, **kwargs):
+    """
+    Получает сигнал post_save и сбрасывает кэш доступного времени
+    при изменении графика уборщика.
+    """
+    invalidate_cleaner_schedule(user=instance)
+    return
+
+
+@receiver(signal=post_delete, sender=User)
+def cleaner_post_delete_receiver(sender, instance, **kwargs):
+    """
+    Получает сигнал post_delete и сбрасывает кэш доступного времени
+    при удалении уборщика.
+    """
+    if instance.is_cleaner:
+        invalidate_available_time()
     return